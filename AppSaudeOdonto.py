@@ -1,227 +1,36 @@
+"""
+Interface das faturas Porto Seguro Saúde/Odonto.
+
+O motor de extração fica em extrator_faturas; aqui só entra o customtkinter, para a janela abrir na
+hora. pandas/pdfplumber são carregados em segundo plano assim que a janela aparece (carregamento).
+"""
 import os
-import re
-import itertools
-import pdfplumber
-import pandas as pd
+import multiprocessing
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 
-# ---------------------- UTILIDADES ----------------------------
-def to_float(s: str | None) -> float | None:
-    if not s: return None
-    return float(s.replace(".", "").replace(",", "."))
-
-# ---------------------- EXPRESSÕES REGULARES - SAÚDE ----------------------------
-RE_HEADER_SAUDE = re.compile(r"""
-    ^\s*
-    (?:(?P<seguro>\d{8})\s+)?             
-    (?P<dep>\d{1,2})\s+                   
-    (?P<nome>[A-ZÀ-Ü][^\d\n]+?)           
-    \s*
-    (?P<reg_func>\d{4,7})?                
-    \s+
-    (?P<idade>\d{1,3})\s+                 
-    (?P<parentesco>Titular|Conjuge|Filh[oa])
-    """, re.MULTILINE | re.VERBOSE
-)
-
-RE_HEADER_SAUDE_ALT = re.compile(r"""
-    ^\s*
-    (?:(?P<seguro>\d{7,9})\s+)?             
-    (?P<dep>\d{1,2})\s+                   
-    (?P<nome>[A-ZÀ-Üa-zà-ü\s\.'\-]+?)           
-    \s*
-    (?P<reg_func>\d{4,8})?                
-    \s+
-    (?P<idade>\d{1,3})\s+                 
-    (?P<parentesco>Titular|Conjuge|Filh[oa]|filho|filha)
-    """, re.MULTILINE | re.VERBOSE
-)
-
-VAL = r"(?P<val>\d[\d\.]*,\d{2})"
-RE_VALS_SAUDE = {
-    "premio_base": re.compile(r"Prêmio\s+Base\s*" + VAL),
-    #"desc_copart": re.compile(r"(Desc(?:onto)?\s+por\s+Co[- ]?Part(?:\.|icipação)?\s*\(-?\))?\s*" + VAL),
-    "total_copart": re.compile(r"Total\s+Co[- ]?Part\.\s*R?\$?\s*" + VAL),
-    "consultas": re.compile(r"CONSULTAS[^\d]*" + VAL),
-    "exames": re.compile(r"EXAMES[^\d]*" + VAL),
-    "pronto_socorro": re.compile(r"PRONTO[-\s]?SOCORRO[^\d]*" + VAL),
-    "pro_rata": re.compile(r"Pro[-\s]?Rata[^\d]*" + VAL),
-    "iof": re.compile(r"\bIOF\s*" + VAL),
-    "total_dep": re.compile(r"TOTAL\s+DO\s+DEP\.\s*" + VAL),
-}
-
-def extrair_tabela_seguro(txt: str) -> str | None:
-    padroes = [
-        r"Seguro\s+Dep",
-        r"Seguro\s*:\s*Dep",
-        r"N[oº]?\s*Seguro\s+Dep"
-    ]
-    for padrao in padroes:
-        if re.search(padrao, txt):
-            return re.split(padrao, txt, maxsplit=1)[-1]
-    return None
-
-# ---------------------- PROCESSAMENTO SAÚDE ----------------------------
-def processar_saude(pdf_path: str) -> pd.DataFrame:
-    blocos = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for pg in pdf.pages:
-            txt = pg.extract_text() or ""
-            tbl = extrair_tabela_seguro(txt)
-            if tbl:
-                blocos.append(tbl)
-
-    registros = []
-    for texto in blocos:
-        matches = list(RE_HEADER_SAUDE.finditer(texto))
-        if not matches:
-            matches = list(RE_HEADER_SAUDE_ALT.finditer(texto))
-
-        total_matches = list(re.finditer(r"TOTAL\.\s*(\d[\d\.]*,\d{2})", texto))
-
-        for m, nxt in zip(matches, itertools.chain(matches[1:], [None])):
-            d = m.groupdict()
-            corpo = texto[m.end(): nxt.start() if nxt else len(texto)]
-
-            # ── NOVO: extrair nome do Plano da primeira linha do corpo
-            linhas = [l for l in corpo.splitlines() if l.strip()]
-            d['plano'] = linhas[0].strip() if linhas else None
-
-            for campo, rx in RE_VALS_SAUDE.items():
-                mm = rx.search(corpo)
-                d[campo] = to_float(mm["val"]) if mm else None
-
-            if d.get("iof") is None:
-                mm_all = re.findall(RE_VALS_SAUDE["iof"], corpo)
-                if mm_all:
-                    d["iof"] = max(map(to_float, mm_all))
-            d["_start"] = m.start()
-            registros.append(d)
-
-        for tm in total_matches:
-            total_val = to_float(tm.group(1))
-            candidatos = [r for r in registros if r.get("parentesco","") == "Titular" and r["_start"] < tm.start()]
-            if candidatos:
-                candidatos[-1]["_total"] = total_val
-
-    df = pd.DataFrame(registros)
-    if df.empty:
-        return df
-
-    df["seguro"] = df["seguro"].ffill().astype(str)
-    df["dep"] = df["dep"].astype(int)
-    df["idade"] = df["idade"].astype(int)
-    df["plano"] = df["plano"].astype(str)
-
-    df["total_familiar"] = df.get("_total")
-    if df["total_familiar"].isnull().all():
-        total_agrupado = df.groupby(["seguro"]).agg({"total_dep": "sum"}).reset_index()
-        df = df.merge(total_agrupado, on="seguro", suffixes=("","_agrupado"))
-        df["total_familiar"] = df["total_dep_agrupado"]
-        df.drop(columns=["total_dep_agrupado"], inplace=True)
-
-    df.drop(columns=["_start","_total"], errors="ignore", inplace=True)
-
-    num_cols = [c for c in df.columns if c not in {"seguro","dep","nome","idade","parentesco","reg_func","plano"}]
-    df[num_cols] = df[num_cols].fillna(0.0).infer_objects()
-    df.columns = [col.capitalize().replace("_"," ") for col in df.columns]
+from tarefas import FilaTarefas, formatar_eta
+from carregamento import Carregamento, iniciar_apos_abrir
 
-    return df.sort_values(["Seguro","Dep"])
+MODULOS_MOTOR = ["extrator_faturas", "escritores", "cache_extracao", "servico_extracao"]
 
-# ---------------------- EXPRESSÕES ODONTO ----------------------------
-RE_ODONTO_SEGURO = re.compile(r"""
-    ^\s*
-    (?P<num>\d{1,6})\s+
-    (?P<nome>[A-ZÀ-Ü][^\d\n]+?)\s+
-    (?P<matricula>\d+)\s+
-    (?P<cpf>\d{3}\.\d{3}\.\d{3}-\d{2})\s+
-    (?P<plano>[A-ZÀ-Ü\s\/\-]+(?:DOC)?(?:\s+\d{1,2})?)\s+
-    (?P<tp>[TD])\s+
-    (?P<id>\d+)\s+
-    (?:(?P<dependencia>Conjuge|Filh[oa]|Enteada?)\s+)?
-    (?P<dt_inclusao>\d{2}/\d{2}/\d{4})\s+
-    (?P<rubrica>(Total|Mensalidades?)\s+[\wÀ-Ü\s\-\/]+?)\s+
-    (?P<valor>\d[\d\.]*,\d{2})
-    (?:\s+(?P<valor_total>\d[\d\.]*,\d{2}))?
-    \s*$
-""", re.MULTILINE | re.VERBOSE)
-
-RE_ODONTO = re.compile(r"""
-    ^\s*
-    (?P<num>\d+)\s+
-    (?P<nome>[^0-9\n]+?)\s*(?P<matricula>\d+)\s+
-    (?P<cpf>\d{3}\.\d{3}\.\d{3}-\d{2})\s+
-    (?P<plano>.+?)(?=\s+[TD]\s+\d+)\s+
-    (?P<tp>[TD])\s+
-    (?P<id>\d+)\s+
-    (?:(?P<dependencia>Conjuge|Filh[oa])\s+)?
-    (?P<dt_inclusao>\d{2}/\d{2}/\d{4})\s+
-    (?P<rubrica>.+?)\s+
-    (?P<valor>\d[\d\.]*,\d{2})
-    (?:\s+(?P<valor_total>\d[\d\.]*,\d{2}))?
-""", re.MULTILINE | re.VERBOSE)
-
-RE_IOF = re.compile(r"Cobran[çc]a de IOF[^\d]*(?P<iof>\d[\d\.]*,\d{2})")
-
-def processar_odonto(pdf_path: str) -> pd.DataFrame:
-    registros = []
-    with pdfplumber.open(pdf_path) as pdf:
-        texto = "\n".join(page.extract_text() or "" for page in pdf.pages)
-
-    texto = re.sub(
-        r'([A-ZÀ-Üa-zà-ü])\n(?=\d{3}\.\d{3}\.\d{3}-\d{2})',
-        r'\1 ',
-        texto
-    )
-
-    detalhes = list(RE_ODONTO_SEGURO.finditer(texto))
-    if not detalhes:
-        detalhes = list(RE_ODONTO.finditer(texto))
-
-    if not detalhes:
-        raise ValueError("❌ Nenhum dado encontrado no PDF Odonto.")
-
-    for idx, m in enumerate(detalhes):
-        d = m.groupdict()
-        inicio = m.end()
-        fim = detalhes[idx + 1].start() if idx + 1 < len(detalhes) else len(texto)
-        snippet = texto[inicio:fim]
-        mi = RE_IOF.search(snippet)
-        d["iof"] = to_float(mi.group("iof")) if mi else 0.0
-        registros.append(d)
-
-    df = pd.DataFrame(registros)
-    if df.empty:
-        return df
-
-    df["num"] = df["num"].astype(int)
-    df["matricula"] = df["matricula"].astype(int)
-    df["id"] = df["id"].astype(int)
-    df["Dt Inclusão"] = pd.to_datetime(df["dt_inclusao"], dayfirst=True).dt.date
-    df["Valor"] = df["valor"].map(to_float)
-    df["Valor Total"] = df["valor_total"].map(to_float)
-    df["IOF"] = df["iof"].astype(float)
-    df["Tp"] = df["tp"].map({"T": "Titular", "D": "Dependente"})
-    df["Dependência"] = df["dependencia"].fillna("Titular")
-
-    df.rename(columns={
-        "num": "N° Beneficiário", "nome": "Nome", "matricula": "Matrícula",    
-        "cpf": "CPF", "plano": "Plano", "rubrica": "Rubrica", "id": "Id"
-    }, inplace=True)
-
-    cols = [
-        "N° Beneficiário", "Nome", "Matrícula", "CPF", "Plano", "Tp", "Id",
-        "Dependência", "Dt Inclusão", "Rubrica", "Valor", "Valor Total", "IOF"
-    ]
-    return df[cols].sort_values("N° Beneficiário")
+def __getattr__(nome: str):
+    """Compatibilidade: `from AppSaudeOdonto import processar_fatura` continua valendo; o motor só é
+    importado quando alguém pede um nome dele."""
+    if not nome.startswith("__"):
+        import extrator_faturas
+        if hasattr(extrator_faturas, nome):
+            return getattr(extrator_faturas, nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 # ---------------------- INTERFACE UNIFICADA ----------------------------
+NOMES_TIPO = {"saude": "Saúde", "odonto": "Odonto"}
+
 class InterfaceApp(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.title("Igarapé Digital – PDF to Excel - Anderson Marinho")
-        self.geometry("520x360")
+        self.geometry("520x420")
         ctk.set_appearance_mode("System")
         ctk.set_default_color_theme("blue")
 
@@ -229,53 +38,100 @@ class InterfaceApp(ctk.CTk):
         ctk.CTkButton(self, text="📥 Importar Saúde", command=lambda: self.executar("saude")).pack(pady=8)
         ctk.CTkButton(self, text="📥 Importar Odonto", command=lambda: self.executar("odonto")).pack(pady=8)
 
-        self.progress = ctk.CTkProgressBar(self, mode="indeterminate")
-        self.progress.pack(pady=20)
-        self.progress.stop()
-        self.progress.pack_forget()
+        self.painel = ctk.CTkFrame(self, fg_color="transparent")
+        self.progress = ctk.CTkProgressBar(self.painel, mode="determinate", width=360)
+        self.progress.set(0)
+        self.progress.pack(pady=(10, 4))
+        self.lbl_status = ctk.CTkLabel(self.painel, text="")
+        self.lbl_status.pack()
+        self.btn_cancelar = ctk.CTkButton(self.painel, text="Cancelar", width=100, command=self.cancelar)
+        self.btn_cancelar.pack(pady=6)
 
         ctk.CTkLabel(self, text="CustomerThink | Igarapé Digital | Github-Advmarinho", font=("Arial", 12)).pack(side="bottom", pady=15)
 
+        self.cache = None
+        self.servico = None
+        self.carga = Carregamento(MODULOS_MOTOR, preparar=self.preparar_motor)
+        self.fila = FilaTarefas(self, self.tratar_evento)
+        iniciar_apos_abrir(self, self.carga)
+
+    def preparar_motor(self):
+        """Roda na thread de carga, depois das importações: nada de widgets aqui."""
+        from cache_extracao import abrir_cache
+        from servico_extracao import ClienteServico
+        self.cache = abrir_cache()
+        # com o serviço de extração no ar (servico_extracao.py servir), a interface só envia e recebe
+        servico = ClienteServico()
+        self.servico = servico if servico.disponivel() else None
+
     def mostrar_progresso(self):
-        self.progress.pack(pady=20)
-        self.progress.start()
+        self.painel.pack(pady=10)
 
     def esconder_progresso(self):
-        self.progress.stop()
-        self.progress.pack_forget()
+        self.progress.set(0)
+        self.painel.pack_forget()
 
     def executar(self, tipo):
-        self.mostrar_progresso()
-        self.after(100, lambda: self.processar_e_salvar(tipo))
-
-    def processar_e_salvar(self, tipo):
+        """Pede o PDF e o destino e põe a importação na fila; a interface segue livre enquanto roda."""
         path = filedialog.askopenfilename(filetypes=[("PDF files", "*.pdf")])
         if not path:
-            self.esconder_progresso()
+            return
+        nome_padrao = os.path.splitext(os.path.basename(path))[0] + f"_{tipo}.xlsx"
+        save_path = filedialog.asksaveasfilename(defaultextension=".xlsx",
+                                                 initialfile=nome_padrao,
+                                                 filetypes=self.carga.modulo("escritores").TIPOS_ARQUIVO,
+                                                 title="Salvar como")
+        if not save_path:
             return
 
-        try:
-            df = processar_saude(path) if tipo == "saude" else processar_odonto(path)
-            if df.empty:
-                raise ValueError("Nenhum dado encontrado no PDF.")
-
-            nome_padrao = os.path.splitext(os.path.basename(path))[0] + f"_{tipo}.xlsx"
-            save_path = filedialog.asksaveasfilename(defaultextension=".xlsx",
-                                                     initialfile=nome_padrao,
-                                                     filetypes=[("Excel files", "*.xlsx")],
-                                                     title="Salvar como")
-            if not save_path:
-                self.esconder_progresso()
-                return
-
-            df.to_excel(save_path, index=False)
-            messagebox.showinfo("Sucesso", f"Excel salvo com sucesso:\n{save_path}")
-        except Exception as e:
-            messagebox.showerror("Erro", str(e))
-        finally:
+        descricao = f"{NOMES_TIPO[tipo]}: {os.path.basename(path)}"
+        self.fila.adicionar(descricao, self.processar_e_salvar, path, tipo, save_path)
+        self.mostrar_progresso()
+        if self.fila.em_execucao:
+            self.lbl_status.configure(text=f"{self.fila.em_execucao} – {self.fila.pendentes} na fila")
+
+    def cancelar(self):
+        self.fila.cancelar_atual()
+
+    def processar_e_salvar(self, path, tipo, save_path, progresso=None):
+        """Roda na thread de trabalho: nada de widgets ou diálogos aqui."""
+        self.carga.aguardar()
+        from extrator_faturas import processar_fatura, PROCESSOS_PADRAO
+        from escritores import salvar
+        if self.servico:
+            def acompanhar(descricao):
+                if progresso:
+                    progresso(*(descricao["progresso"] or (0, 1)))
+            self.servico.extrair(path, save_path, tipo, ao_consultar=acompanhar)
+            return save_path
+        df = processar_fatura(path, tipo, PROCESSOS_PADRAO, self.cache, progresso)
+        if df.empty:
+            raise ValueError("Nenhum dado encontrado no PDF.")
+        salvar(df, save_path)
+        return save_path
+
+    def tratar_evento(self, evento, descricao, dados):
+        fila = f" – {self.fila.pendentes} na fila" if self.fila.pendentes else ""
+        if evento == "inicio":
+            self.progress.set(0)
+            self.lbl_status.configure(text=f"{descricao}{fila}")
+        elif evento == "progresso":
+            feitas, total, eta = dados
+            self.progress.set(feitas / total if total else 1)
+            self.lbl_status.configure(text=f"{descricao} – página {feitas}/{total} – restam {formatar_eta(eta)}{fila}")
+        elif evento == "ok":
+            messagebox.showinfo("Sucesso", f"Arquivo salvo com sucesso:\n{dados}")
+        elif evento == "erro":
+            messagebox.showerror("Erro", f"{descricao}\n{dados}")
+        elif evento == "cancelado":
+            self.progress.set(0)
+            self.lbl_status.configure(text=f"{descricao} – cancelado{fila}")
+
+        if evento in ("ok", "erro") and not self.fila.pendentes and not self.fila.em_execucao:
             self.esconder_progresso()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = InterfaceApp()
     app.mainloop()
     
@@ -1,16 +1,29 @@
-import customtkinter as ctk
-from tkinter import filedialog, messagebox
-import cv2
-import pytesseract
+"""
+Interface do OCR de documentos de RH.
+
+O motor (OpenCV, Tesseract, pdf2image) fica em motor_ocr e é carregado em segundo plano assim que a
+janela aparece; aqui só entra o customtkinter.
+"""
 import os
 import re
-import numpy as np
-import pandas as pd
-from pdf2image import convert_from_path
-from PIL import Image
+import multiprocessing
+import customtkinter as ctk
+from tkinter import filedialog, messagebox
+
+from tarefas import FilaTarefas, formatar_eta
+from carregamento import Carregamento, iniciar_apos_abrir
 
-pytesseract.pytesseract.tesseract_cmd = r"/usr/bin/tesseract"
+MODULOS_MOTOR = ["motor_ocr", "escritores", "indice_documentos"]
 
+def __getattr__(nome: str):
+    """Compatibilidade: `import OCR_Documentos_RH as ocr; ocr.iterar_ocr(...)` continua valendo."""
+    if not nome.startswith("__"):
+        import motor_ocr
+        if hasattr(motor_ocr, nome):
+            return getattr(motor_ocr, nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+# ---------------------- INTERFACE ----------------------------
 class OCRDinamicoApp(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -26,9 +39,26 @@ class OCRDinamicoApp(ctk.CTk):
         ctk.CTkButton(botoes, text="Selecionar Arquivo", command=self.select_file).pack(side="left", padx=5)
         ctk.CTkButton(botoes, text="Extrair Dados", command=self.extract_adaptive).pack(side="left", padx=5)
         ctk.CTkButton(botoes, text="Exportar Excel", command=self.export_excel).pack(side="left", padx=5)
+        ctk.CTkButton(botoes, text="Indexar Pasta", command=self.select_folder).pack(side="left", padx=5)
+        ctk.CTkButton(botoes, text="Cancelar", width=90, command=self.cancelar).pack(side="left", padx=5)
         self.lbl_path = ctk.CTkLabel(botoes, text="Nenhum arquivo selecionado")
         self.lbl_path.pack(side="left", padx=20)
 
+        consulta = ctk.CTkFrame(self, fg_color="transparent")
+        consulta.pack(fill="x", padx=10, pady=(8, 0))
+        self.entry_consulta = ctk.CTkEntry(consulta, placeholder_text="CPF, RG ou texto para buscar no índice")
+        self.entry_consulta.pack(side="left", fill="x", expand=True, padx=5)
+        self.entry_consulta.bind("<Return>", lambda _: self.consultar_indice())
+        ctk.CTkButton(consulta, text="Consultar Índice", command=self.consultar_indice).pack(side="left", padx=5)
+
+        andamento = ctk.CTkFrame(self, fg_color="transparent")
+        andamento.pack(fill="x", padx=10, pady=(8, 0))
+        self.progress = ctk.CTkProgressBar(andamento, mode="determinate")
+        self.progress.set(0)
+        self.progress.pack(side="left", fill="x", expand=True, padx=5)
+        self.lbl_status = ctk.CTkLabel(andamento, text="", width=360, anchor="w")
+        self.lbl_status.pack(side="left", padx=5)
+
         tabs = ctk.CTkTabview(self)
         tabs.pack(fill="both", expand=True, padx=10, pady=10)
         self.tab_ocr = tabs.add("Texto OCR Bruto")
@@ -41,6 +71,15 @@ class OCRDinamicoApp(ctk.CTk):
         self.txt_result.pack(fill="both", expand=True, padx=10, pady=10)
 
         self.file_path = None
+        self.cache = None
+        self.carga = Carregamento(MODULOS_MOTOR, preparar=self.preparar_motor)
+        self.fila = FilaTarefas(self, self.tratar_evento)
+        iniciar_apos_abrir(self, self.carga)
+
+    def preparar_motor(self):
+        """Roda na thread de carga, depois das importações: nada de widgets aqui."""
+        from cache_extracao import abrir_cache
+        self.cache = abrir_cache()
 
     def select_file(self):
         path = filedialog.askopenfilename(title="Escolha o PDF ou imagem",
@@ -49,50 +88,82 @@ class OCRDinamicoApp(ctk.CTk):
             self.file_path = path
             self.lbl_path.configure(text=os.path.basename(path))
 
-    def preprocess_image(self, img):
-        gray = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2GRAY)
-        denoised = cv2.fastNlMeansDenoising(gray, h=10)
-        _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        return binary
+    def select_folder(self):
+        """Põe uma pasta inteira de documentos na fila: OCR em paralelo e gravação no índice."""
+        pasta = filedialog.askdirectory(title="Escolha a pasta com os documentos")
+        if pasta:
+            self.fila.adicionar(f"Pasta {os.path.basename(pasta) or pasta}", self.indexar_pasta, pasta)
+
+    def indexar_pasta(self, pasta, progresso=None):
+        """Roda na thread de trabalho: nada de widgets aqui."""
+        self.carga.aguardar()
+        from motor_ocr import PROCESSOS_PADRAO
+        from indice_documentos import IndiceDocumentos, indexar
+        with IndiceDocumentos() as indice:
+            resumo = indexar([pasta], indice, PROCESSOS_PADRAO, self.cache.pasta if self.cache else None,
+                             progresso=progresso)
+            resumo["campos"] = indice.campos_da_pasta(pasta)
+        return resumo
 
-    def extract_text_from_images(self):
-        ext = os.path.splitext(self.file_path)[1].lower()
+    def preprocess_image(self, img):
+        return self.carga.modulo("motor_ocr").preprocessar_imagem(img)
+
+    def extract_text_from_images(self, file_path=None, progresso=None):
+        """Roda na thread de trabalho quando chamado pela fila: nada de widgets aqui."""
+        file_path = file_path or self.file_path
+        self.carga.aguardar()
+        from motor_ocr import PROCESSOS_PADRAO, contar_paginas, iterar_ocr
+        total = contar_paginas(file_path)
         pages = []
-        pil_imgs = convert_from_path(self.file_path, dpi=400) if ext == ".pdf" else [Image.open(self.file_path)]
-
-        for pil in pil_imgs:
-            proc = self.preprocess_image(pil)
-            text = pytesseract.image_to_string(proc, lang='por', config='--psm 3')
-            pages.append(text)
-        return pages
+        for texto in iterar_ocr(file_path, PROCESSOS_PADRAO, self.cache):
+            pages.append(texto)
+            if progresso:
+                progresso(len(pages), total)
+        return file_path, pages
 
     def gerar_regex_dinamico(self, texto_ocr):
-        texto = texto_ocr.upper().replace('\n', ' ')
-        resultados = {}
-        padroes = {
-            "CPF": r"(\d{3}\.\d{3}\.\d{3}-\d{2})",
-            "RG": r"(\d{1,2}\.\d{3}\.\d{3}-[\dX])",
-            "Data Nascimento": r"(\d{2}/\d{2}/\d{4})",
-            "Nome": r"NOME[:\-]?\s*([A-ZÀ-Ú\s]+)",
-            "Órgão Expedidor": r"ÓRGÃO EXPEDIDOR[:\-]?\s*([A-ZÀ-Ú\s]+)",
-            "Filiação": r"FILIAÇÃO[:\-]?\s*([A-ZÀ-Ú\s]+)"
-        }
-        for campo, padrao in padroes.items():
-            match = re.search(padrao, texto)
-            if match:
-                resultados[campo] = match.group(1).strip()
-        return resultados
+        return self.carga.modulo("indice_documentos").extrair_campos(texto_ocr)
 
     def extract_adaptive(self):
+        """Põe o arquivo selecionado na fila de OCR; vários arquivos podem ser enfileirados."""
         if not self.file_path:
             messagebox.showwarning("Aviso", "Selecione um arquivo primeiro.")
             return
-
+        self.fila.adicionar(os.path.basename(self.file_path), self.extract_text_from_images, self.file_path)
+        if self.fila.em_execucao:
+            self.lbl_status.configure(text=f"{self.fila.em_execucao} – {self.fila.pendentes} na fila")
+
+    def cancelar(self):
+        self.fila.cancelar_atual()
+
+    def tratar_evento(self, evento, descricao, dados):
+        fila = f" – {self.fila.pendentes} na fila" if self.fila.pendentes else ""
+        if evento == "inicio":
+            self.progress.set(0)
+            self.lbl_status.configure(text=f"{descricao}{fila}")
+        elif evento == "progresso":
+            feitas, total, eta = dados
+            self.progress.set(feitas / total if total else 1)
+            self.lbl_status.configure(text=f"{descricao} – página {feitas}/{total} – restam {formatar_eta(eta)}{fila}")
+        elif evento == "ok":
+            self.progress.set(1)
+            self.lbl_status.configure(text=f"{descricao} – concluído{fila}")
+            if isinstance(dados, dict):
+                self.mostrar_indexacao(dados)
+            else:
+                self.mostrar_resultado(*dados)
+        elif evento == "erro":
+            self.lbl_status.configure(text=f"{descricao} – erro{fila}")
+            messagebox.showerror("Erro", f"{descricao}\n{dados}")
+        elif evento == "cancelado":
+            self.progress.set(0)
+            self.lbl_status.configure(text=f"{descricao} – cancelado{fila}")
+
+    def mostrar_resultado(self, file_path, paginas_texto):
         self.txt_ocr.delete("0.0", "end")
         self.txt_result.delete("0.0", "end")
         self.dados_extraidos.clear()
 
-        paginas_texto = self.extract_text_from_images()
         all_ocr, campos_texto = [], []
 
         for idx, texto in enumerate(paginas_texto, 1):
@@ -100,7 +171,7 @@ class OCRDinamicoApp(ctk.CTk):
             resultados = self.gerar_regex_dinamico(texto)
 
             resultado_formatado = [f"--- Página {idx} ---"]
-            resultado_dict = {"Arquivo": os.path.basename(self.file_path), "Página": idx}
+            resultado_dict = {"Arquivo": os.path.basename(file_path), "Página": idx}
 
             for campo, valor in resultados.items():
                 resultado_formatado.append(f"{campo}: {valor}")
@@ -112,17 +183,51 @@ class OCRDinamicoApp(ctk.CTk):
         self.txt_ocr.insert("0.0", "\n\n".join(all_ocr))
         self.txt_result.insert("0.0", "\n\n".join(campos_texto))
 
+    def mostrar_tabela(self, df, titulo):
+        """Linhas do índice na aba de campos; ficam prontas para exportar."""
+        self.txt_result.delete("0.0", "end")
+        self.dados_extraidos = df.fillna("").to_dict("records")
+        linhas = [titulo]
+        for registro in self.dados_extraidos:
+            linhas.append(" | ".join(f"{k}: {v}" for k, v in registro.items() if v != ""))
+        self.txt_result.insert("0.0", "\n".join(linhas))
+
+    def mostrar_indexacao(self, resumo):
+        titulo = (f"{resumo['indexados']} documentos indexados ({resumo['paginas']} páginas), {resumo['copias']} cópias, "
+                  f"{resumo['pulados']} já indexados em {resumo['segundos']:.1f}s")
+        for falha in resumo["falhas"]:
+            titulo += f"\nFalha em {os.path.basename(falha['arquivo'])}: {falha['erro']}"
+        self.mostrar_tabela(resumo["campos"], titulo + "\n")
+
+    def consultar_indice(self):
+        """CPF ou RG vão direto à chave do índice; qualquer outro texto é buscado no OCR das páginas."""
+        consulta = self.entry_consulta.get().strip()
+        if not consulta:
+            return
+        indice_documentos = self.carga.modulo("indice_documentos")
+        with indice_documentos.IndiceDocumentos() as indice:
+            if re.fullmatch(r"\d{3}\.?\d{3}\.?\d{3}-?\d{2}", consulta):
+                df, titulo = indice.por_cpf(consulta), f"Documentos com o CPF {consulta}"
+            elif re.fullmatch(r"\d{1,2}\.?\d{3}\.?\d{3}-?[\dXx]", consulta):
+                df, titulo = indice.por_rg(consulta), f"Documentos com o RG {consulta}"
+            else:
+                df, titulo = indice.buscar(consulta), f"Páginas com \"{consulta}\""
+        self.mostrar_tabela(df, f"{titulo}: {len(df)}\n")
+
     def export_excel(self):
         if not self.dados_extraidos:
             messagebox.showwarning("Nada a exportar", "Execute a extração primeiro.")
             return
         caminho = filedialog.asksaveasfilename(defaultextension=".xlsx",
-                                               filetypes=[("Planilha Excel", "*.xlsx")])
+                                               filetypes=self.carga.modulo("escritores").TIPOS_ARQUIVO)
         if caminho:
+            import pandas as pd
+            from escritores import salvar
             df = pd.DataFrame(self.dados_extraidos)
-            df.to_excel(caminho, index=False)
+            salvar(df, caminho)
             messagebox.showinfo("Sucesso", f"Exportado com sucesso:\n{caminho}")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = OCRDinamicoApp()
     app.mainloop()
@@ -0,0 +1,296 @@
+"""
+Benchmark da extração das faturas Porto Seguro Saúde/Odonto com PDFs sintéticos (gerador_faturas).
+
+Mede separadamente cada etapa — extração de texto (pdfplumber), casamento dos regex, montagem do
+DataFrame e exportação — com registros/s e pico de memória (RSS). Cada cenário roda em um processo
+novo, para que o pico de memória seja só dele. Com uma baseline gravada, etapas que ficarem mais
+lentas (ou mais pesadas) que a tolerância são apontadas e o código de saída é 1.
+
+    python benchmark_faturas.py --tamanhos 10 1000 10000 --salvar-baseline
+    python benchmark_faturas.py --tamanhos 10 1000 10000
+    python benchmark_faturas.py --tipos odonto --tamanhos 50000 --dependentes 5 --formato parquet
+    python benchmark_faturas.py --tamanhos 1000 --esteira 8
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from gerador_faturas import gerar_fatura
+from instrumentacao import pico_rss_mb
+
+ETAPAS = ["extracao", "casamento", "montagem", "exportacao"]
+TAMANHOS_PADRAO = [10, 1000, 10000]
+TOLERANCIA_PADRAO = 0.25
+MIN_SEGUNDOS_COMPARACAO = 0.05     # etapas mais rápidas que isso oscilam demais para acusar regressão
+BASELINE_PADRAO = "benchmark_baseline.json"
+PASTA_PDFS_PADRAO = os.path.join(tempfile.gettempdir(), "igarape_benchmark")
+
+def preparar_pdf(tipo: str, beneficiarios: int, dependentes: int, pasta: str) -> str:
+    """Gera o PDF sintético do cenário, reaproveitando o de uma execução anterior se já existir."""
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"{tipo}_{beneficiarios}_dep{dependentes}.pdf")
+    if not os.path.exists(caminho):
+        gerar_fatura(tipo, beneficiarios, caminho + ".tmp", dependentes)
+        os.replace(caminho + ".tmp", caminho)
+    return caminho
+
+# ---------------------- MEDIÇÃO ----------------------------
+def medir_cenario(pdf_path: str, tipo: str, formato: str, pasta_saida: str, motor: str = "texto",
+                  extrator: str = "pdfplumber") -> dict:
+    """Roda as quatro etapas uma vez. Chamado em um processo separado por executar()."""
+    from extrator_faturas import (extrair_paginas, LEITURA_PAGINA, LEITURA_TEXTO, casar_saude, montar_df_saude,
+                                iterar_odonto, montar_df_odonto)
+    from motor_palavras import casar_saude_palavras, iterar_odonto_palavras
+    from escritores import FORMATOS, salvar
+
+    tempos = {}
+    inicio = time.perf_counter()
+    if motor == "palavras":
+        paginas = extrair_paginas(pdf_path, ler_pagina=LEITURA_PAGINA[motor])
+    else:
+        paginas = extrair_paginas(pdf_path, ler_pagina=LEITURA_TEXTO[extrator], extrator=extrator)
+    tempos["extracao"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    if tipo == "saude":
+        casado = (casar_saude_palavras if motor == "palavras" else casar_saude)(paginas)
+    else:
+        casado = list((iterar_odonto_palavras if motor == "palavras" else iterar_odonto)(paginas))
+    tempos["casamento"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    df = montar_df_saude(*casado) if tipo == "saude" else montar_df_odonto(casado)
+    tempos["montagem"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    saida = os.path.join(pasta_saida, f"benchmark_{tipo}{FORMATOS[formato]}")
+    salvar(df, saida, formato)
+    tempos["exportacao"] = time.perf_counter() - inicio
+    os.remove(saida)
+
+    return {"paginas": len(paginas), "registros": len(df), "tempos": tempos, "pico_rss_mb": pico_rss_mb()}
+
+def executar(tipos: list[str], tamanhos: list[int], dependentes: int = 3, formato: str = "xlsx",
+             repeticoes: int = 1, pasta: str = PASTA_PDFS_PADRAO, motor: str = "texto",
+             extrator: str = "pdfplumber") -> dict:
+    """Resultados por cenário ('saude-1000', ou 'saude-1000-palavras' com o motor por coordenadas e
+    'saude-1000-pdfium' com outro extrator de texto).
+    Com repetições, fica o menor tempo de cada etapa."""
+    contexto = multiprocessing.get_context("spawn")
+    resultados = {}
+    for tipo in tipos:
+        for beneficiarios in tamanhos:
+            pdf_path = preparar_pdf(tipo, beneficiarios, dependentes, pasta)
+            medidas = []
+            for _ in range(repeticoes):
+                with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                    medidas.append(executor.submit(medir_cenario, pdf_path, tipo, formato, pasta, motor,
+                                                   extrator).result())
+
+            tempos = {etapa: round(min(m["tempos"][etapa] for m in medidas), 4) for etapa in ETAPAS}
+            total = sum(tempos[e] for e in ("extracao", "casamento", "montagem"))
+            picos = [m["pico_rss_mb"] for m in medidas if m["pico_rss_mb"] is not None]
+            resultado = {
+                "beneficiarios": beneficiarios,
+                "paginas": medidas[0]["paginas"],
+                "registros": medidas[0]["registros"],
+                "tempos": tempos,
+                "registros_por_segundo": round(medidas[0]["registros"] / total, 1) if total else 0.0,
+                "pico_rss_mb": max(picos) if picos else None,
+            }
+            sufixo = f"-{motor}" if motor != "texto" else f"-{extrator}" if extrator != "pdfplumber" else ""
+            resultados[f"{tipo}-{beneficiarios}{sufixo}"] = resultado
+            print(f"{tipo:>6} {beneficiarios:>7} benef.: {resultado['registros']} registros em "
+                  f"{resultado['paginas']} pág., {resultado['registros_por_segundo']} registros/s", flush=True)
+    return resultados
+
+def medir_esteira(tipos: list[str], beneficiarios: int, dependentes: int, arquivos: int, formato: str = "xlsx",
+                  pasta: str = PASTA_PDFS_PADRAO, extrator: str = "pdfplumber") -> dict:
+    """Tempo de parede de um lote de `arquivos` faturas (tipos alternados) gravadas no `formato`, sem
+    cache, pelo caminho sequencial e pela esteira (lote_faturas --esteira), cada um em um processo novo."""
+    pasta_lote = os.path.join(pasta, "esteira")
+    os.makedirs(pasta_lote, exist_ok=True)
+    pdfs = []
+    for i in range(arquivos):
+        origem = preparar_pdf(tipos[i % len(tipos)], beneficiarios, dependentes, pasta)
+        copia = os.path.join(pasta_lote, f"{i:03d}_{os.path.basename(origem)}")
+        if not os.path.exists(copia):
+            shutil.copyfile(origem, copia)
+        pdfs.append(copia)
+
+    contexto = multiprocessing.get_context("spawn")
+    segundos = {}
+    with tempfile.TemporaryDirectory(prefix="igarape_esteira_") as pasta_saida:
+        for modo in ("sequencial", "esteira"):
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                segundos[modo] = executor.submit(_rodar_lote, pdfs, formato, pasta_saida, extrator,
+                                                 modo == "esteira").result()
+    return {
+        "arquivos": arquivos,
+        "segundos": {modo: round(t, 3) for modo, t in segundos.items()},
+        "economia": round(1 - segundos["esteira"] / segundos["sequencial"], 3) if segundos["sequencial"] else None,
+    }
+
+def _rodar_lote(pdfs: list[str], formato: str, pasta_saida: str, extrator: str, esteira: bool) -> float:
+    from lote_faturas import processar_lote, ler_extratores
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        processar_lote(pdfs, pasta_saida=pasta_saida, formato=formato, extratores=ler_extratores([extrator]),
+                       esteira=esteira)
+    return time.perf_counter() - inicio
+
+def medir_ocr(arquivos: list[str], paginas: int) -> dict | None:
+    """Tempo por página do OCR (motor_ocr) nos modos fixo e adaptativo, sem cache, nas primeiras
+    `paginas` de cada arquivo (PDF ou imagem), com a semelhança entre os textos dos dois modos.
+    Devolve None se Tesseract/Poppler ou as bibliotecas do OCR não estiverem disponíveis."""
+    from difflib import SequenceMatcher
+    try:
+        import motor_ocr as ocr
+        amostra = [(arquivo, pagina) for arquivo in arquivos
+                   for pagina in range(1, min(paginas, ocr.contar_paginas(arquivo)) + 1)]
+        textos, tempos = {}, {}
+        for modo in ocr.MODOS_OCR:
+            inicio = time.perf_counter()
+            textos[modo] = [ocr.ler_pagina(arquivo, pagina, modo=modo) for arquivo, pagina in amostra]
+            tempos[modo] = time.perf_counter() - inicio
+    except Exception as e:
+        print(f"OCR ignorado: {e}", file=sys.stderr)
+        return None
+    semelhanca = [SequenceMatcher(None, fixo, adaptativo).ratio()
+                  for fixo, adaptativo in zip(textos["fixo"], textos["adaptativo"])]
+    return {
+        "paginas": len(amostra),
+        "segundos_por_pagina": {modo: round(t / len(amostra), 3) for modo, t in tempos.items()},
+        "economia": round(1 - tempos["adaptativo"] / tempos["fixo"], 3) if tempos["fixo"] else None,
+        "semelhanca_minima": round(min(semelhanca), 3),
+        "semelhanca_media": round(sum(semelhanca) / len(semelhanca), 3),
+    }
+
+# ---------------------- BASELINE ----------------------------
+def carregar_baseline(caminho: str) -> dict | None:
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+def salvar_baseline(caminho: str, resultados: dict) -> None:
+    dados = {
+        "gerado_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "maquina": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "python": platform.python_version(),
+        "cenarios": resultados,
+    }
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+
+def comparar(resultados: dict, baseline: dict, tolerancia: float = TOLERANCIA_PADRAO) -> list[str]:
+    """Etapas (e pico de memória) que pioraram mais que a tolerância em relação à baseline."""
+    regressoes = []
+    for cenario, atual in resultados.items():
+        base = baseline.get("cenarios", {}).get(cenario)
+        if not base:
+            continue
+        for etapa in ETAPAS:
+            antes, agora = base["tempos"].get(etapa), atual["tempos"][etapa]
+            if antes is not None and agora >= MIN_SEGUNDOS_COMPARACAO and agora > antes * (1 + tolerancia):
+                regressoes.append(f"{cenario} {etapa}: {antes:.3f}s -> {agora:.3f}s (+{agora / antes - 1:.0%})")
+        antes, agora = base.get("pico_rss_mb"), atual["pico_rss_mb"]
+        if antes and agora and agora > antes * (1 + tolerancia):
+            regressoes.append(f"{cenario} memória: {antes:.0f} MB -> {agora:.0f} MB (+{agora / antes - 1:.0%})")
+    return regressoes
+
+def imprimir_tabela(resultados: dict) -> None:
+    print("\n---------------------- BENCHMARK ----------------------")
+    print(f"{'cenário':<22}{'pág.':>7}{'registros':>10}" + "".join(f"{e:>12}" for e in ETAPAS)
+          + f"{'reg/s':>11}{'RSS MB':>9}")
+    for cenario, r in resultados.items():
+        print(f"{cenario:<22}{r['paginas']:>7}{r['registros']:>10}"
+              + "".join(f"{r['tempos'][e]:>11.3f}s" for e in ETAPAS)
+              + f"{r['registros_por_segundo']:>11}{r['pico_rss_mb'] or '-':>9}")
+
+# ---------------------- LINHA DE COMANDO ----------------------------
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de extração com faturas sintéticas.")
+    parser.add_argument("--tipos", nargs="+", choices=["saude", "odonto"], default=["saude", "odonto"])
+    parser.add_argument("--tamanhos", nargs="+", type=int, default=TAMANHOS_PADRAO,
+                        help="Números de beneficiários por fatura (padrão: 10 1000 10000).")
+    parser.add_argument("--dependentes", type=int, default=3, help="Máximo de dependentes por titular.")
+    parser.add_argument("--formato", choices=["xlsx", "csv", "parquet", "arrow"], default="xlsx",
+                        help="Formato da etapa de exportação.")
+    parser.add_argument("--motor", choices=["texto", "palavras"], default="texto",
+                        help="Motor de leitura medido: texto corrido + regex ou palavras com coordenadas.")
+    parser.add_argument("--extrator", choices=["pdfplumber", "pdfium"], default="pdfplumber",
+                        help="Biblioteca que lê o texto no motor 'texto' (leitores_pdf).")
+    parser.add_argument("--repeticoes", type=int, default=1, help="Execuções por cenário; vale o menor tempo.")
+    parser.add_argument("--pasta", default=PASTA_PDFS_PADRAO, help="Onde os PDFs sintéticos são gerados e reaproveitados.")
+    parser.add_argument("--baseline", default=BASELINE_PADRAO, help="Arquivo JSON da baseline.")
+    parser.add_argument("--salvar-baseline", action="store_true", help="Grava os resultados como nova baseline.")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO,
+                        help="Piora relativa aceita antes de acusar regressão (padrão: 0.25).")
+    parser.add_argument("--ocr", type=int, default=0, metavar="PAGINAS",
+                        help="Também mede o OCR (modos fixo e adaptativo) nas primeiras PAGINAS da fatura de saúde, "
+                             "ou de cada arquivo de --ocr-amostra (exige Tesseract/Poppler).")
+    parser.add_argument("--ocr-amostra", nargs="+", metavar="ARQUIVO",
+                        help="Documentos digitalizados (PDF/imagem) para medir o OCR no lugar da fatura sintética, "
+                             "que é limpa demais para mostrar o ganho do modo adaptativo.")
+    parser.add_argument("--esteira", type=int, default=0, metavar="ARQUIVOS",
+                        help="Também mede um lote de ARQUIVOS faturas do maior tamanho pelo caminho sequencial e "
+                             "pela esteira (lote_faturas --esteira), em tempo de parede.")
+    parser.add_argument("--relatorio", help="Grava os resultados em JSON.")
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    args = criar_parser().parse_args(argv)
+    resultados = executar(args.tipos, args.tamanhos, args.dependentes, args.formato, args.repeticoes, args.pasta,
+                          args.motor, args.extrator)
+    imprimir_tabela(resultados)
+
+    if args.ocr:
+        arquivos = args.ocr_amostra or [preparar_pdf("saude", max(args.tamanhos), args.dependentes, args.pasta)]
+        medida = medir_ocr(arquivos, args.ocr)
+        if medida:
+            tempos = medida["segundos_por_pagina"]
+            print(f"OCR ({medida['paginas']} páginas): fixo {tempos['fixo']}s/pág., adaptativo {tempos['adaptativo']}s/pág. "
+                  f"({medida['economia']:.0%} menos); texto igual ao fixo em {medida['semelhanca_media']:.1%} "
+                  f"(pior página {medida['semelhanca_minima']:.1%})")
+
+    if args.esteira:
+        medida = medir_esteira(args.tipos, max(args.tamanhos), args.dependentes, args.esteira, args.formato,
+                               args.pasta, args.extrator)
+        tempos = medida["segundos"]
+        print(f"Esteira ({medida['arquivos']} faturas): sequencial {tempos['sequencial']:.2f}s, esteira "
+              f"{tempos['esteira']:.2f}s ({abs(medida['economia']):.0%} {'menos' if medida['economia'] >= 0 else 'mais'})")
+
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+    if args.salvar_baseline:
+        salvar_baseline(args.baseline, resultados)
+        print(f"Baseline gravada em {args.baseline}")
+        return 0
+
+    baseline = carregar_baseline(args.baseline)
+    if baseline is None:
+        return 0
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+    if regressoes:
+        print("\nRegressões em relação à baseline:")
+        for r in regressoes:
+            print(f"  {r}")
+        return 1
+    print("\nSem regressões em relação à baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Benchmark da abertura das interfaces (AppSaudeOdonto e OCR_Documentos_RH).
+
+Mede, em um processo novo a cada repetição, quanto tempo passa do lançamento até a janela aparecer e
+até o motor (pandas, pdfplumber, OpenCV...) terminar de carregar em segundo plano. Com tela disponível
+a própria interface é aberta (e fechada sozinha, via IGARAPE_MEDIR_INICIO); sem tela, mede-se a
+importação do módulo da interface ("janela") e a carga do motor ("pronto").
+
+    python benchmark_inicio.py --repeticoes 5 --salvar-baseline
+    python benchmark_inicio.py --executavel dist/AppSaudeOdonto1.exe --apps saude
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+from benchmark_faturas import TOLERANCIA_PADRAO, MIN_SEGUNDOS_COMPARACAO, carregar_baseline, salvar_baseline
+
+PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+APPS = {"saude": "AppSaudeOdonto", "ocr": "OCR_Documentos_RH"}
+MEDIDAS = ["janela", "pronto"]
+BASELINE_PADRAO = "benchmark_inicio_baseline.json"
+TEMPO_LIMITE = 120
+
+# só a importação: a janela não pode ser criada sem tela
+CODIGO_IMPORTACAO = """
+import os, sys, time, json
+inicio = float(os.environ["IGARAPE_INICIO_EM"])
+sys.path.insert(0, {pasta!r})
+import {modulo} as app
+janela = time.time() - inicio
+from carregamento import Carregamento
+carga = Carregamento(app.MODULOS_MOTOR)
+carga.aguardar()
+print(json.dumps({{"janela": round(janela, 3), "pronto": round(time.time() - inicio, 3)}}))
+"""
+
+def tem_tela() -> bool:
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+def medir_uma_vez(modulo: str, modo: str, executavel: str | None = None) -> dict:
+    ambiente = dict(os.environ)
+    if modo == "janela":
+        with tempfile.TemporaryDirectory() as pasta:
+            destino = os.path.join(pasta, "inicio.json")
+            ambiente.update(IGARAPE_MEDIR_INICIO=destino, IGARAPE_INICIO_EM=repr(time.time()))
+            comando = [executavel] if executavel else [sys.executable, os.path.join(PASTA_PROJETO, modulo + ".py")]
+            subprocess.run(comando, env=ambiente, timeout=TEMPO_LIMITE, check=True, cwd=PASTA_PROJETO)
+            with open(destino, encoding="utf-8") as f:
+                return json.load(f)
+    ambiente["IGARAPE_INICIO_EM"] = repr(time.time())
+    saida = subprocess.run([sys.executable, "-c", CODIGO_IMPORTACAO.format(pasta=PASTA_PROJETO, modulo=modulo)],
+                           env=ambiente, timeout=TEMPO_LIMITE, check=True, capture_output=True, text=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+def executar(apps: list[str], repeticoes: int, executavel: str | None = None) -> dict:
+    modo = "janela" if executavel or tem_tela() else "importacao"
+    resultados = {}
+    for app in apps:
+        medidas = [medir_uma_vez(APPS[app], modo, executavel) for _ in range(repeticoes)]
+        resultados[app] = {
+            "modo": modo,
+            "repeticoes": repeticoes,
+            # mediana: a primeira execução paga o cache de disco frio e distorceria a média
+            "tempos": {m: round(statistics.median(x[m] for x in medidas), 3) for m in MEDIDAS},
+            "maximo": {m: round(max(x[m] for x in medidas), 3) for m in MEDIDAS},
+        }
+        tempos = resultados[app]["tempos"]
+        print(f"{app:>6}: janela em {tempos['janela']:.3f}s, motor pronto em {tempos['pronto']:.3f}s ({modo})",
+              flush=True)
+    return resultados
+
+def comparar(resultados: dict, baseline: dict, tolerancia: float = TOLERANCIA_PADRAO) -> list[str]:
+    regressoes = []
+    for app, atual in resultados.items():
+        base = baseline.get("cenarios", {}).get(app)
+        if not base or base.get("modo") != atual["modo"]:
+            continue
+        for medida in MEDIDAS:
+            antes, agora = base["tempos"][medida], atual["tempos"][medida]
+            if agora >= MIN_SEGUNDOS_COMPARACAO and agora > antes * (1 + tolerancia):
+                regressoes.append(f"{app} {medida}: {antes:.3f}s -> {agora:.3f}s (+{agora / antes - 1:.0%})")
+    return regressoes
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Mede a abertura das interfaces: janela visível e motor carregado.")
+    parser.add_argument("--apps", nargs="+", choices=list(APPS), default=list(APPS))
+    parser.add_argument("--repeticoes", type=int, default=5, help="Processos novos por interface; vale a mediana.")
+    parser.add_argument("--executavel", help="Mede o executável empacotado (pyinstaller) em vez do script; "
+                                             "use com uma interface só em --apps.")
+    parser.add_argument("--baseline", default=BASELINE_PADRAO, help="Arquivo JSON da baseline.")
+    parser.add_argument("--salvar-baseline", action="store_true", help="Grava os resultados como nova baseline.")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO,
+                        help="Piora relativa aceita antes de acusar regressão (padrão: 0.25).")
+    parser.add_argument("--relatorio", help="Grava os resultados em JSON.")
+    args = parser.parse_args(argv)
+    if args.executavel and len(args.apps) != 1:
+        parser.error("--executavel mede uma interface só: informe --apps saude ou --apps ocr.")
+
+    resultados = executar(args.apps, args.repeticoes, args.executavel)
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+    if args.salvar_baseline:
+        salvar_baseline(args.baseline, resultados)
+        print(f"Baseline gravada em {args.baseline}")
+        return 0
+
+    baseline = carregar_baseline(args.baseline)
+    if baseline is None:
+        return 0
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+    if regressoes:
+        print("\nRegressões em relação à baseline:")
+        for r in regressoes:
+            print(f"  {r}")
+        return 1
+    print("\nSem regressões em relação à baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
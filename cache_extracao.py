@@ -0,0 +1,254 @@
+"""
+Cache persistente da extração das faturas, indexado pelo hash do conteúdo do PDF.
+
+Guarda o texto de cada página (chave: hash do PDF + versão do extrator + página) e o DataFrame
+final já processado (chave: hash do PDF + tipo + assinatura dos regex). Reimportar a mesma fatura
+não passa mais pelo pdfplumber; alterar qualquer regex muda a assinatura e invalida os DataFrames.
+Também guarda o texto do OCR de cada imagem de página (chave: hash dos pixels + configuração do OCR)
+e o texto de cada página pelo hash do seu conteúdo, que se repete entre faturas de meses seguidos.
+O layout identificado em cada contrato fica guardado para as faturas seguintes do mesmo contrato.
+O tamanho total é limitado e as entradas menos usadas recentemente são descartadas primeiro.
+"""
+import io
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import pandas as pd
+
+PASTA_CACHE_PADRAO = os.environ.get("IGARAPE_CACHE_DIR",
+                                    os.path.join(os.path.expanduser("~"), ".igarape_digital", "cache"))
+LIMITE_BYTES_PADRAO = 512 * 1024 * 1024
+
+def assinatura(*objetos) -> str:
+    """Hash curto dos padrões (regex compilados, dicts de regex ou textos) usados no processamento."""
+    h = hashlib.sha1()
+    for obj in objetos:
+        itens = obj.items() if isinstance(obj, dict) else [("", obj)]
+        for nome, valor in itens:
+            if isinstance(valor, re.Pattern):
+                valor = f"{valor.pattern}|{valor.flags}"
+            h.update(f"{nome}={valor}\x00".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def _df_para_bytes(df: pd.DataFrame) -> tuple[bytes, str]:
+    buf = io.BytesIO()
+    try:
+        df.to_parquet(buf, index=True)
+        return buf.getvalue(), "parquet"
+    except ImportError:
+        # pyarrow/fastparquet são opcionais; sem eles o DataFrame vai em pickle
+        buf = io.BytesIO()
+        df.to_pickle(buf)
+        return buf.getvalue(), "pickle"
+
+def _bytes_para_df(dados: bytes, formato: str) -> pd.DataFrame:
+    if formato == "parquet":
+        return pd.read_parquet(io.BytesIO(dados))
+    return pd.read_pickle(io.BytesIO(dados))
+
+def abrir_cache(pasta: str = PASTA_CACHE_PADRAO, limite_bytes: int = LIMITE_BYTES_PADRAO) -> "CacheExtracao | None":
+    """Abre o cache ou devolve None se a pasta não puder ser usada; sem cache tudo segue funcionando."""
+    try:
+        return CacheExtracao(pasta, limite_bytes)
+    except (OSError, sqlite3.Error):
+        return None
+
+class CacheExtracao:
+    def __init__(self, pasta: str = PASTA_CACHE_PADRAO, limite_bytes: int = LIMITE_BYTES_PADRAO):
+        os.makedirs(pasta, exist_ok=True)
+        self.pasta = pasta
+        self.limite_bytes = limite_bytes
+        self.con = sqlite3.connect(os.path.join(pasta, "extracao.sqlite3"), timeout=30,
+                                   check_same_thread=False)
+        self.con.executescript("""
+            CREATE TABLE IF NOT EXISTS arquivos (
+                caminho TEXT PRIMARY KEY, tamanho INTEGER, mtime REAL, hash TEXT);
+            CREATE TABLE IF NOT EXISTS documentos (
+                hash TEXT, versao TEXT, paginas INTEGER, PRIMARY KEY (hash, versao));
+            CREATE TABLE IF NOT EXISTS paginas (
+                hash TEXT, versao TEXT, pagina INTEGER, texto TEXT, bytes INTEGER, acesso REAL,
+                PRIMARY KEY (hash, versao, pagina));
+            CREATE TABLE IF NOT EXISTS resultados (
+                hash TEXT, tipo TEXT, assinatura TEXT, formato TEXT, dados BLOB, bytes INTEGER, acesso REAL,
+                PRIMARY KEY (hash, tipo, assinatura));
+            CREATE TABLE IF NOT EXISTS ocr (
+                hash TEXT, config TEXT, texto TEXT, bytes INTEGER, acesso REAL, PRIMARY KEY (hash, config));
+            CREATE TABLE IF NOT EXISTS conteudos (
+                hash TEXT, versao TEXT, texto TEXT, bytes INTEGER, acesso REAL, PRIMARY KEY (hash, versao));
+            CREATE TABLE IF NOT EXISTS layouts (
+                contrato TEXT, tipo TEXT, assinatura TEXT, layout TEXT, acesso REAL,
+                PRIMARY KEY (contrato, tipo, assinatura));
+            CREATE INDEX IF NOT EXISTS ix_paginas_acesso ON paginas (acesso);
+            CREATE INDEX IF NOT EXISTS ix_resultados_acesso ON resultados (acesso);
+            CREATE INDEX IF NOT EXISTS ix_ocr_acesso ON ocr (acesso);
+            CREATE INDEX IF NOT EXISTS ix_conteudos_acesso ON conteudos (acesso);
+        """)
+
+    def fechar(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    # ---------------------- HASH DO CONTEÚDO ----------------------------
+    def hash_pdf(self, pdf_path: str) -> str:
+        """SHA-256 do conteúdo. Arquivos já vistos com mesmo tamanho e data de modificação não são relidos."""
+        caminho = os.path.abspath(pdf_path)
+        st = os.stat(caminho)
+        row = self.con.execute("SELECT hash FROM arquivos WHERE caminho=? AND tamanho=? AND mtime=?",
+                               (caminho, st.st_size, st.st_mtime)).fetchone()
+        if row:
+            return row[0]
+
+        h = hashlib.sha256()
+        with open(caminho, "rb") as f:
+            for parte in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(parte)
+        with self.con:
+            self.con.execute("INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?)",
+                             (caminho, st.st_size, st.st_mtime, h.hexdigest()))
+        return h.hexdigest()
+
+    # ---------------------- TEXTO POR PÁGINA ----------------------------
+    def obter_textos(self, hash_pdf: str, versao: str) -> list[str] | None:
+        """Texto de todas as páginas, ou None se o documento não estiver completo no cache."""
+        doc = self.con.execute("SELECT paginas FROM documentos WHERE hash=? AND versao=?",
+                               (hash_pdf, versao)).fetchone()
+        if not doc:
+            return None
+        rows = self.con.execute("SELECT texto FROM paginas WHERE hash=? AND versao=? ORDER BY pagina",
+                                (hash_pdf, versao)).fetchall()
+        if len(rows) != doc[0]:
+            return None
+        with self.con:
+            self.con.execute("UPDATE paginas SET acesso=? WHERE hash=? AND versao=?",
+                             (time.time(), hash_pdf, versao))
+        return [r[0] for r in rows]
+
+    def guardar_textos(self, hash_pdf: str, versao: str, textos: list[str]) -> None:
+        agora = time.time()
+        with self.con:
+            self.con.execute("INSERT OR REPLACE INTO documentos VALUES (?, ?, ?)", (hash_pdf, versao, len(textos)))
+            self.con.executemany("INSERT OR REPLACE INTO paginas VALUES (?, ?, ?, ?, ?, ?)",
+                                 [(hash_pdf, versao, i, txt, len(txt.encode("utf-8")), agora)
+                                  for i, txt in enumerate(textos)])
+        self.aplicar_limite()
+
+    # ---------------------- DATAFRAME PROCESSADO ----------------------------
+    def obter_df(self, hash_pdf: str, tipo: str, assinatura_regex: str) -> pd.DataFrame | None:
+        row = self.con.execute("SELECT formato, dados FROM resultados WHERE hash=? AND tipo=? AND assinatura=?",
+                               (hash_pdf, tipo, assinatura_regex)).fetchone()
+        if not row:
+            return None
+        with self.con:
+            self.con.execute("UPDATE resultados SET acesso=? WHERE hash=? AND tipo=? AND assinatura=?",
+                             (time.time(), hash_pdf, tipo, assinatura_regex))
+        return _bytes_para_df(row[1], row[0])
+
+    def guardar_df(self, hash_pdf: str, tipo: str, assinatura_regex: str, df: pd.DataFrame) -> None:
+        dados, formato = _df_para_bytes(df)
+        # cada motor e extrator tem a sua assinatura: resultados de outras assinaturas continuam valendo, e os
+        # de versões antigas dos regex, que nunca mais serão lidos, saem pelo limite (acesso mais antigo)
+        with self.con:
+            self.con.execute("INSERT OR REPLACE INTO resultados VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (hash_pdf, tipo, assinatura_regex, formato, dados, len(dados), time.time()))
+        self.aplicar_limite()
+
+    # ---------------------- TEXTO DO OCR ----------------------------
+    def obter_ocr(self, hash_imagem: str, config: str) -> str | None:
+        row = self.con.execute("SELECT texto FROM ocr WHERE hash=? AND config=?", (hash_imagem, config)).fetchone()
+        if not row:
+            return None
+        with self.con:
+            self.con.execute("UPDATE ocr SET acesso=? WHERE hash=? AND config=?", (time.time(), hash_imagem, config))
+        return row[0]
+
+    def guardar_ocr(self, hash_imagem: str, config: str, texto: str) -> None:
+        with self.con:
+            self.con.execute("INSERT OR REPLACE INTO ocr VALUES (?, ?, ?, ?, ?)",
+                             (hash_imagem, config, texto, len(texto.encode("utf-8")), time.time()))
+        self.aplicar_limite()
+
+    # ---------------------- TEXTO PELO CONTEÚDO DA PÁGINA ----------------------------
+    def obter_conteudos(self, hashes: list[str], versao: str) -> dict[str, str]:
+        """Texto já extraído de cada hash de conteúdo conhecido (os desconhecidos ficam de fora)."""
+        hashes = list(set(hashes))
+        encontrados = {}
+        for i in range(0, len(hashes), 500):        # limite de parâmetros do SQLite
+            lote = hashes[i:i + 500]
+            marcas = ",".join("?" * len(lote))
+            encontrados.update(self.con.execute(
+                f"SELECT hash, texto FROM conteudos WHERE versao=? AND hash IN ({marcas})", (versao, *lote)))
+        if encontrados:
+            with self.con:
+                self.con.executemany("UPDATE conteudos SET acesso=? WHERE hash=? AND versao=?",
+                                     [(time.time(), h, versao) for h in encontrados])
+        return encontrados
+
+    def guardar_conteudos(self, textos: dict[str, str], versao: str) -> None:
+        agora = time.time()
+        with self.con:
+            self.con.executemany("INSERT OR REPLACE INTO conteudos VALUES (?, ?, ?, ?, ?)",
+                                 [(h, versao, txt, len(txt.encode("utf-8")), agora) for h, txt in textos.items()])
+        self.aplicar_limite()
+
+    # ---------------------- LAYOUT POR CONTRATO ----------------------------
+    def obter_layout(self, contrato: str, tipo: str, assinatura_regex: str) -> str | None:
+        row = self.con.execute("SELECT layout FROM layouts WHERE contrato=? AND tipo=? AND assinatura=?",
+                               (contrato, tipo, assinatura_regex)).fetchone()
+        return row[0] if row else None
+
+    def guardar_layout(self, contrato: str, tipo: str, assinatura_regex: str, layout: str) -> None:
+        with self.con:
+            self.con.execute("INSERT OR REPLACE INTO layouts VALUES (?, ?, ?, ?, ?)",
+                             (contrato, tipo, assinatura_regex, layout, time.time()))
+
+    # ---------------------- LIMITE DE TAMANHO (LRU) ----------------------------
+    def tamanho_bytes(self) -> int:
+        paginas = self.con.execute("SELECT COALESCE(SUM(bytes), 0) FROM paginas").fetchone()[0]
+        resultados = self.con.execute("SELECT COALESCE(SUM(bytes), 0) FROM resultados").fetchone()[0]
+        ocr = self.con.execute("SELECT COALESCE(SUM(bytes), 0) FROM ocr").fetchone()[0]
+        conteudos = self.con.execute("SELECT COALESCE(SUM(bytes), 0) FROM conteudos").fetchone()[0]
+        return paginas + resultados + ocr + conteudos
+
+    def aplicar_limite(self) -> None:
+        """Remove documentos inteiros, do acesso mais antigo para o mais recente, até caber no limite."""
+        excesso = self.tamanho_bytes() - self.limite_bytes
+        if excesso <= 0:
+            return
+        entradas = self.con.execute("""
+            SELECT 'paginas', hash, versao, MAX(acesso), SUM(bytes) FROM paginas GROUP BY hash, versao
+            UNION ALL
+            SELECT 'resultados', hash, tipo || '|' || assinatura, acesso, bytes FROM resultados
+            UNION ALL
+            SELECT 'ocr', hash, config, acesso, bytes FROM ocr
+            UNION ALL
+            SELECT 'conteudos', hash, versao, acesso, bytes FROM conteudos
+            ORDER BY 4
+        """).fetchall()
+        with self.con:
+            for tabela, hash_pdf, chave, _, tamanho in entradas:
+                if excesso <= 0:
+                    break
+                if tabela == "paginas":
+                    self.con.execute("DELETE FROM paginas WHERE hash=? AND versao=?", (hash_pdf, chave))
+                    self.con.execute("DELETE FROM documentos WHERE hash=? AND versao=?", (hash_pdf, chave))
+                elif tabela == "ocr":
+                    self.con.execute("DELETE FROM ocr WHERE hash=? AND config=?", (hash_pdf, chave))
+                elif tabela == "conteudos":
+                    self.con.execute("DELETE FROM conteudos WHERE hash=? AND versao=?", (hash_pdf, chave))
+                else:
+                    tipo, assinatura_regex = chave.split("|", 1)
+                    self.con.execute("DELETE FROM resultados WHERE hash=? AND tipo=? AND assinatura=?",
+                                     (hash_pdf, tipo, assinatura_regex))
+                excesso -= tamanho
+
+    def limpar(self) -> None:
+        with self.con:
+            for tabela in ("arquivos", "documentos", "paginas", "resultados", "ocr", "conteudos", "layouts"):
+                self.con.execute(f"DELETE FROM {tabela}")
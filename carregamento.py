@@ -0,0 +1,86 @@
+"""
+Carga das bibliotecas pesadas (pandas, pdfplumber, OpenCV, Tesseract) fora do caminho de abertura
+das interfaces.
+
+A janela abre só com o customtkinter; logo depois de aparecer, uma thread importa os motores de
+extração. Quem precisa de um motor chama modulo(), que espera a carga terminar — na prática ela já
+terminou quando o usuário escolhe o primeiro arquivo.
+
+Com IGARAPE_MEDIR_INICIO=<arquivo.json> a interface grava quanto levou até a janela aparecer e até
+a carga terminar, e fecha sozinha (usado por benchmark_inicio.py, inclusive no executável empacotado).
+"""
+import os
+import json
+import time
+import importlib
+import threading
+
+class Carregamento:
+    """Importa `modulos` em uma thread e depois roda `preparar()` (ex.: abrir o cache), também na thread:
+    nada de widgets em `preparar`."""
+    def __init__(self, modulos: list[str], preparar=None):
+        self.nomes = modulos
+        self.preparar = preparar
+        self.modulos = {}
+        self.erro = None
+        self.segundos = None
+        self._pronto = threading.Event()
+        self._iniciado = False
+        self._trava = threading.Lock()
+
+    def iniciar(self) -> None:
+        with self._trava:
+            if self._iniciado:
+                return
+            self._iniciado = True
+        threading.Thread(target=self._carregar, daemon=True).start()
+
+    def _carregar(self):
+        inicio = time.perf_counter()
+        try:
+            for nome in self.nomes:
+                self.modulos[nome] = importlib.import_module(nome)
+            if self.preparar:
+                self.preparar()
+        except Exception as e:
+            self.erro = e
+        finally:
+            self.segundos = time.perf_counter() - inicio
+            self._pronto.set()
+
+    @property
+    def pronto(self) -> bool:
+        return self._pronto.is_set()
+
+    def aguardar(self) -> None:
+        """Espera a carga (iniciando-a, se ainda não começou); levanta o erro de importação, se houve."""
+        self.iniciar()
+        self._pronto.wait()
+        if self.erro is not None:
+            raise self.erro
+
+    def modulo(self, nome: str):
+        self.aguardar()
+        return self.modulos[nome]
+
+def iniciar_apos_abrir(janela, carregamento: Carregamento, atraso_ms: int = 50) -> None:
+    """Começa a carga assim que a janela for desenhada e, se pedido, mede o tempo de abertura."""
+    janela.after(atraso_ms, carregamento.iniciar)
+    destino = os.environ.get("IGARAPE_MEDIR_INICIO")
+    if not destino:
+        return
+    lancado = float(os.environ.get("IGARAPE_INICIO_EM") or time.time())
+
+    def janela_visivel():
+        janela_segundos = time.time() - lancado
+
+        def esperar_carga():
+            if not carregamento.pronto:
+                janela.after(10, esperar_carga)
+                return
+            with open(destino, "w", encoding="utf-8") as f:
+                json.dump({"janela": round(janela_segundos, 3), "pronto": round(time.time() - lancado, 3),
+                           "erro": str(carregamento.erro) if carregamento.erro else None}, f)
+            janela.destroy()
+        esperar_carga()
+    janela.after(0, lambda: janela.after_idle(janela_visivel))
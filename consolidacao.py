@@ -0,0 +1,271 @@
+"""
+Base consolidada das faturas de todos os contratos, em SQLite local.
+
+Cada fatura processada (processar_saude/processar_odonto) é carregada uma vez na base, com contrato e
+competência; as linhas de saúde e odonto ficam em tabelas próprias, indexadas por matrícula, CPF e
+competência. A matrícula liga as duas: 'Reg func' na saúde (do titular, repetida para os dependentes
+do mesmo Seguro) e 'Matrícula' no odonto. Um cadastro opcional (matrícula, CPF, nome, centro de
+custo) permite agregar por centro de custo.
+
+    with BaseConsolidada("fechamento.sqlite3") as base:
+        base.carregar(df, "saude", "2025-06", "contrato_a")
+        base.por_funcionario(competencia="2025-06")
+
+Pela linha de comando:
+    python consolidacao.py fechamento.sqlite3 --cadastro funcionarios.xlsx
+    python consolidacao.py fechamento.sqlite3 --por centro --competencia 2025-06 --saida centros.xlsx
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import pandas as pd
+
+from escritores import FORMATOS, RE_COMPETENCIA, salvar, formato_por_extensao
+
+SEM_CENTRO = "(sem centro de custo)"
+# coluna do DataFrame -> coluna da tabela
+COLUNAS_SAUDE = {
+    "Seguro": "seguro", "Dep": "dep", "Nome": "nome", "Idade": "idade", "Parentesco": "parentesco",
+    "Plano": "plano", "Premio base": "premio_base", "Total copart": "total_copart", "Consultas": "consultas",
+    "Exames": "exames", "Pronto socorro": "pronto_socorro", "Pro rata": "pro_rata", "Iof": "iof",
+    "Total dep": "total_dep", "Total familiar": "total_familiar",
+}
+COLUNAS_ODONTO = {
+    "N° Beneficiário": "beneficiario", "Nome": "nome", "CPF": "cpf", "Plano": "plano", "Tp": "tp",
+    "Id": "id", "Dependência": "dependencia", "Dt Inclusão": "dt_inclusao", "Rubrica": "rubrica",
+    "Valor": "valor", "Valor Total": "valor_total", "IOF": "iof",
+}
+# colunas aceitas no arquivo de cadastro (minúsculas) -> coluna da tabela
+COLUNAS_CADASTRO = {
+    "matrícula": "matricula", "matricula": "matricula", "reg func": "matricula", "cpf": "cpf", "nome": "nome",
+    "centro de custo": "centro_custo", "centro_custo": "centro_custo", "cc": "centro_custo",
+}
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS faturas (
+        id INTEGER PRIMARY KEY, contrato TEXT, tipo TEXT, competencia TEXT, arquivo TEXT, registros INTEGER,
+        carregada_em REAL, UNIQUE (contrato, tipo, competencia, arquivo));
+    CREATE TABLE IF NOT EXISTS saude (
+        fatura_id INTEGER REFERENCES faturas (id), matricula TEXT, seguro TEXT, dep INTEGER, nome TEXT,
+        idade INTEGER, parentesco TEXT, plano TEXT, premio_base REAL, total_copart REAL, consultas REAL,
+        exames REAL, pronto_socorro REAL, pro_rata REAL, iof REAL, total_dep REAL, total_familiar REAL);
+    CREATE TABLE IF NOT EXISTS odonto (
+        fatura_id INTEGER REFERENCES faturas (id), matricula TEXT, beneficiario INTEGER, nome TEXT, cpf TEXT,
+        plano TEXT, tp TEXT, id INTEGER, dependencia TEXT, dt_inclusao TEXT, rubrica TEXT, valor REAL,
+        valor_total REAL, iof REAL);
+    CREATE TABLE IF NOT EXISTS cadastro (
+        matricula TEXT PRIMARY KEY, cpf TEXT, nome TEXT, centro_custo TEXT);
+    CREATE INDEX IF NOT EXISTS ix_faturas_competencia ON faturas (competencia);
+    CREATE INDEX IF NOT EXISTS ix_saude_fatura ON saude (fatura_id);
+    CREATE INDEX IF NOT EXISTS ix_saude_matricula ON saude (matricula);
+    CREATE INDEX IF NOT EXISTS ix_odonto_fatura ON odonto (fatura_id);
+    CREATE INDEX IF NOT EXISTS ix_odonto_matricula ON odonto (matricula);
+    CREATE INDEX IF NOT EXISTS ix_odonto_cpf ON odonto (cpf);
+    CREATE INDEX IF NOT EXISTS ix_cadastro_cpf ON cadastro (cpf);
+    CREATE INDEX IF NOT EXISTS ix_cadastro_centro ON cadastro (centro_custo);
+    -- uma linha por cobrança: na saúde o total do dependente (já com IOF), no odonto valor + IOF da rubrica
+    CREATE VIEW IF NOT EXISTS lancamentos AS
+        SELECT f.competencia, f.contrato, 'saude' AS tipo, s.matricula, NULL AS cpf, s.nome,
+               s.dep = 0 AS titular, s.total_dep AS valor
+        FROM saude s JOIN faturas f ON f.id = s.fatura_id
+        UNION ALL
+        SELECT f.competencia, f.contrato, 'odonto', o.matricula, o.cpf, o.nome,
+               o.tp = 'Titular', COALESCE(o.valor, 0) + COALESCE(o.iof, 0)
+        FROM odonto o JOIN faturas f ON f.id = o.fatura_id;
+"""
+
+def normalizar_matricula(valor) -> str | None:
+    """'000124646', '124646' e 124646 são a mesma matrícula."""
+    if valor is None or pd.isna(valor):
+        return None
+    texto = str(valor).strip()
+    if texto.endswith(".0") and texto[:-2].isdigit():   # matrícula lida como float de planilha
+        texto = texto[:-2]
+    return (texto.lstrip("0") or "0") if texto.isdigit() else texto or None
+
+def _linhas_saude(df: pd.DataFrame) -> pd.DataFrame:
+    linhas = df[list(COLUNAS_SAUDE)].rename(columns=COLUNAS_SAUDE)
+    # só o titular traz o Reg func; os dependentes do mesmo Seguro são da mesma matrícula
+    reg_func = df["Reg func"].astype(object).where(df["Reg func"].notna(), None)
+    linhas.insert(0, "matricula", reg_func.groupby(df["Seguro"].to_numpy(), sort=False)
+                  .transform("first").map(normalizar_matricula))
+    return linhas
+
+def _linhas_odonto(df: pd.DataFrame) -> pd.DataFrame:
+    linhas = df[list(COLUNAS_ODONTO)].rename(columns=COLUNAS_ODONTO)
+    linhas.insert(0, "matricula", df["Matrícula"].map(normalizar_matricula))
+    linhas["dt_inclusao"] = linhas["dt_inclusao"].map(lambda d: None if pd.isna(d) else str(d))
+    return linhas
+
+PREPARAR = {"saude": _linhas_saude, "odonto": _linhas_odonto}
+
+class BaseConsolidada:
+    def __init__(self, caminho: str):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self.con = sqlite3.connect(caminho, timeout=30)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.executescript(ESQUEMA)
+
+    def fechar(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    # ---------------------- CARGA ----------------------------
+    def carregar(self, df: pd.DataFrame, tipo: str, competencia: str, contrato: str, arquivo: str = "") -> int:
+        """Carrega uma fatura já processada; recarregar o mesmo contrato/tipo/competência/arquivo substitui."""
+        if not RE_COMPETENCIA.match(competencia):
+            raise ValueError(f"Competência inválida '{competencia}', use AAAA-MM.")
+        linhas = PREPARAR[tipo](df)
+        with self.con:
+            antiga = self.con.execute("SELECT id FROM faturas WHERE contrato=? AND tipo=? AND competencia=? "
+                                      "AND arquivo=?", (contrato, tipo, competencia, arquivo)).fetchone()
+            if antiga:
+                self.con.execute(f"DELETE FROM {tipo} WHERE fatura_id=?", antiga)
+                self.con.execute("DELETE FROM faturas WHERE id=?", antiga)
+            fatura_id = self.con.execute(
+                "INSERT INTO faturas (contrato, tipo, competencia, arquivo, registros, carregada_em) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (contrato, tipo, competencia, arquivo, len(linhas), time.time()),
+            ).lastrowid
+            colunas = ["fatura_id", *linhas.columns]
+            valores = linhas.astype(object).where(linhas.notna(), None).itertuples(index=False, name=None)
+            self.con.executemany(f"INSERT INTO {tipo} ({', '.join(colunas)}) VALUES "
+                                 f"({', '.join('?' * len(colunas))})",
+                                 ((fatura_id, *v) for v in valores))
+        return fatura_id
+
+    def carregar_cadastro(self, cadastro: pd.DataFrame | str) -> int:
+        """Cadastro de funcionários (DataFrame ou .xlsx/.csv) com Matrícula e, opcionalmente, CPF, Nome e
+        Centro de custo. Substitui as matrículas já cadastradas."""
+        if isinstance(cadastro, str):
+            cadastro = (pd.read_csv(cadastro, dtype=str, sep=None, engine="python") if cadastro.lower().endswith(".csv")
+                        else pd.read_excel(cadastro, dtype=str))
+        colunas = {c: COLUNAS_CADASTRO[c.strip().lower()] for c in cadastro.columns
+                   if c.strip().lower() in COLUNAS_CADASTRO}
+        if "matricula" not in colunas.values():
+            raise ValueError("O cadastro precisa da coluna 'Matrícula'.")
+        cadastro = cadastro[list(colunas)].rename(columns=colunas)
+        cadastro = cadastro.reindex(columns=["matricula", "cpf", "nome", "centro_custo"])
+        cadastro["matricula"] = cadastro["matricula"].map(normalizar_matricula)
+        cadastro = cadastro.dropna(subset=["matricula"]).drop_duplicates("matricula", keep="last")
+        with self.con:
+            self.con.executemany("INSERT OR REPLACE INTO cadastro VALUES (?, ?, ?, ?)",
+                                 cadastro.astype(object).where(cadastro.notna(), None)
+                                 .itertuples(index=False, name=None))
+        return len(cadastro)
+
+    def faturas(self) -> pd.DataFrame:
+        return pd.read_sql_query("SELECT contrato, tipo, competencia, arquivo, registros FROM faturas "
+                                 "ORDER BY competencia, contrato, tipo, arquivo", self.con)
+
+    # ---------------------- CONSULTAS ----------------------------
+    def _filtros(self, competencia: str | None, contrato: str | None, matricula: str | None,
+                 cpf: str | None) -> tuple[str, list]:
+        condicoes, parametros = [], []
+        if competencia:
+            condicoes.append("l.competencia = ?")
+            parametros.append(competencia)
+        if contrato:
+            condicoes.append("l.contrato = ?")
+            parametros.append(contrato)
+        if matricula:
+            condicoes.append("l.matricula = ?")
+            parametros.append(normalizar_matricula(matricula))
+        if cpf:
+            # o CPF pode ser do titular ou de um dependente: vale a matrícula a que ele pertence
+            condicoes.append("l.matricula IN (SELECT matricula FROM odonto WHERE cpf = ? "
+                             "UNION SELECT matricula FROM cadastro WHERE cpf = ?)")
+            parametros += [cpf, cpf]
+        return (" WHERE " + " AND ".join(condicoes)) if condicoes else "", parametros
+
+    def por_funcionario(self, competencia: str | None = None, contrato: str | None = None,
+                        matricula: str | None = None, cpf: str | None = None) -> pd.DataFrame:
+        """Saúde + odonto por matrícula e competência, somando titular e dependentes."""
+        onde, parametros = self._filtros(competencia, contrato, matricula, cpf)
+        return pd.read_sql_query(f"""
+            SELECT l.competencia AS "Competência", l.matricula AS "Matrícula",
+                   COALESCE(MAX(c.nome), MAX(CASE WHEN l.titular THEN l.nome END), MAX(l.nome)) AS "Nome",
+                   COALESCE(MAX(c.centro_custo), ?) AS "Centro de custo",
+                   COUNT(DISTINCT CASE WHEN l.tipo = 'saude' THEN l.nome END) AS "Vidas saúde",
+                   COUNT(DISTINCT CASE WHEN l.tipo = 'odonto' THEN l.nome END) AS "Vidas odonto",
+                   ROUND(SUM(CASE WHEN l.tipo = 'saude' THEN l.valor ELSE 0 END), 2) AS "Saúde",
+                   ROUND(SUM(CASE WHEN l.tipo = 'odonto' THEN l.valor ELSE 0 END), 2) AS "Odonto",
+                   ROUND(SUM(l.valor), 2) AS "Total"
+            FROM lancamentos l LEFT JOIN cadastro c ON c.matricula = l.matricula
+            {onde}
+            GROUP BY l.competencia, l.matricula
+            ORDER BY l.competencia, l.matricula""", self.con, params=[SEM_CENTRO, *parametros])
+
+    def por_centro_custo(self, competencia: str | None = None, contrato: str | None = None) -> pd.DataFrame:
+        onde, parametros = self._filtros(competencia, contrato, None, None)
+        return pd.read_sql_query(f"""
+            SELECT l.competencia AS "Competência", COALESCE(c.centro_custo, ?) AS "Centro de custo",
+                   COUNT(DISTINCT l.matricula) AS "Funcionários",
+                   ROUND(SUM(CASE WHEN l.tipo = 'saude' THEN l.valor ELSE 0 END), 2) AS "Saúde",
+                   ROUND(SUM(CASE WHEN l.tipo = 'odonto' THEN l.valor ELSE 0 END), 2) AS "Odonto",
+                   ROUND(SUM(l.valor), 2) AS "Total"
+            FROM lancamentos l LEFT JOIN cadastro c ON c.matricula = l.matricula
+            {onde}
+            GROUP BY l.competencia, COALESCE(c.centro_custo, ?)
+            ORDER BY l.competencia, "Total" DESC""", self.con, params=[SEM_CENTRO, *parametros, SEM_CENTRO])
+
+    def lancamentos(self, competencia: str | None = None, contrato: str | None = None,
+                    matricula: str | None = None, cpf: str | None = None) -> pd.DataFrame:
+        """As linhas de cobrança que entram nas agregações, para conferência."""
+        onde, parametros = self._filtros(competencia, contrato, matricula, cpf)
+        return pd.read_sql_query(f"""
+            SELECT l.competencia AS "Competência", l.contrato AS "Contrato", l.tipo AS "Tipo",
+                   l.matricula AS "Matrícula", l.cpf AS "CPF", l.nome AS "Nome", l.titular AS "Titular",
+                   l.valor AS "Valor"
+            FROM lancamentos l {onde}
+            ORDER BY l.competencia, l.matricula, l.tipo""", self.con, params=parametros)
+
+# ---------------------- LINHA DE COMANDO ----------------------------
+CONSULTAS = {"funcionario": "por_funcionario", "centro": "por_centro_custo", "lancamentos": "lancamentos"}
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Consulta a base consolidada das faturas (carregada pelo "
+                                                 "lote_faturas.py --base).")
+    parser.add_argument("base", help="Arquivo SQLite da base consolidada.")
+    parser.add_argument("--cadastro", help="Carrega o cadastro de funcionários (.xlsx/.csv com Matrícula, CPF, "
+                                           "Nome, Centro de custo) antes da consulta.")
+    parser.add_argument("--por", choices=list(CONSULTAS), default="funcionario",
+                        help="Agregação: por funcionário (padrão), por centro de custo ou as linhas de cobrança.")
+    parser.add_argument("--competencia", help="Filtra a competência AAAA-MM.")
+    parser.add_argument("--contrato", help="Filtra um contrato.")
+    parser.add_argument("--matricula", help="Filtra uma matrícula (funcionário/lançamentos).")
+    parser.add_argument("--cpf", help="Filtra pelo CPF do titular ou de um dependente (funcionário/lançamentos).")
+    parser.add_argument("--saida", help="Exporta o resultado (.xlsx, .csv, .parquet ou .arrow); sem ela, vai para a tela.")
+    args = parser.parse_args(argv)
+
+    with BaseConsolidada(args.base) as base:
+        if args.cadastro:
+            print(f"Cadastro: {base.carregar_cadastro(args.cadastro)} matrículas.")
+        consulta = getattr(base, CONSULTAS[args.por])
+        filtros = {"competencia": args.competencia, "contrato": args.contrato}
+        if args.por != "centro":
+            filtros.update(matricula=args.matricula, cpf=args.cpf)
+        resultado = consulta(**filtros)
+
+    if args.saida:
+        formato = formato_por_extensao(args.saida)
+        if os.path.splitext(args.saida)[1].lower() not in FORMATOS.values():
+            parser.error(f"Extensão não suportada em '{args.saida}'.")
+        salvar(resultado, args.saida, formato)
+        print(f"{len(resultado)} linhas gravadas em {args.saida}")
+    else:
+        with pd.option_context("display.max_rows", 200, "display.width", 200):
+            print(resultado.to_string(index=False) if len(resultado) else "Nenhuma linha.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
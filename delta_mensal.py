@@ -0,0 +1,86 @@
+"""
+Comparação mês a mês das faturas recorrentes de um mesmo contrato.
+
+O resultado de cada competência fica guardado numa pasta de estado (um arquivo por contrato, tipo e
+competência). Ao importar a fatura seguinte, ela é comparada com a competência anterior mais recente
+pela chave de cada vida — Seguro/Dep na saúde, CPF/Id no odonto — e sai só o delta: inclusões,
+exclusões e alterações de valor. A releitura do PDF também é incremental: as páginas iguais às do mês
+anterior vêm do cache pelo hash do conteúdo (extrator_faturas.extrair_textos_incremental).
+"""
+import os
+import re
+import numpy as np
+import pandas as pd
+
+PASTA_ESTADO_PADRAO = os.environ.get("IGARAPE_ESTADO_DIR",
+                                     os.path.join(os.path.expanduser("~"), ".igarape_digital", "mensal"))
+CHAVES = {"saude": ["Seguro", "Dep"], "odonto": ["CPF", "Id"]}
+COLUNAS_VALOR = {"saude": ["Premio base", "Iof"], "odonto": ["Valor", "IOF"]}
+SITUACOES = ["Inclusão", "Exclusão", "Alteração"]
+TOLERANCIA_VALOR = 0.005        # centavos arredondados de forma diferente não contam como alteração
+RE_COMPETENCIA = re.compile(r"^\d{4}-\d{2}$")
+
+# ---------------------- DELTA ----------------------------
+def _com_ocorrencia(df: pd.DataFrame, tipo: str) -> pd.DataFrame:
+    """Chave + nº da ocorrência: a mesma vida pode ter mais de uma linha (ex.: rubricas no odonto)."""
+    chaves = CHAVES[tipo]
+    df = df[[*chaves, "Nome", *COLUNAS_VALOR[tipo]]].copy()
+    df["Nome"] = df["Nome"].astype(object)
+    df["Ocorrência"] = df.groupby(chaves, sort=False).cumcount()
+    return df
+
+def calcular_delta(anterior: pd.DataFrame, atual: pd.DataFrame, tipo: str) -> pd.DataFrame:
+    """Inclusões, exclusões e alterações dos valores de COLUNAS_VALOR entre duas competências."""
+    chaves = CHAVES[tipo]
+    valores = COLUNAS_VALOR[tipo]
+    juntos = pd.merge(_com_ocorrencia(anterior, tipo), _com_ocorrencia(atual, tipo),
+                      on=[*chaves, "Ocorrência"], how="outer", suffixes=(" anterior", " atual"), indicator=True)
+
+    situacao = np.select(
+        [juntos["_merge"].eq("right_only").to_numpy(), juntos["_merge"].eq("left_only").to_numpy()],
+        ["Inclusão", "Exclusão"], default="",
+    ).astype(object)
+    alterado = np.zeros(len(juntos), dtype=bool)
+    for col in valores:
+        antes = juntos[f"{col} anterior"].fillna(0.0).to_numpy()
+        agora = juntos[f"{col} atual"].fillna(0.0).to_numpy()
+        juntos[f"{col} diferença"] = np.round(agora - antes, 2)
+        alterado |= np.abs(agora - antes) > TOLERANCIA_VALOR
+    situacao[(situacao == "") & alterado] = "Alteração"
+
+    juntos["Situação"] = pd.Categorical(situacao, categories=["", *SITUACOES])
+    juntos["Nome"] = juntos["Nome atual"].fillna(juntos["Nome anterior"])
+    delta = juntos[juntos["Situação"] != ""].sort_values(["Situação", *chaves, "Ocorrência"])
+    delta["Situação"] = delta["Situação"].cat.remove_categories("")
+    colunas = ["Situação", *chaves, "Nome"]
+    for col in valores:
+        colunas += [f"{col} anterior", f"{col} atual", f"{col} diferença"]
+    return delta[colunas].reset_index(drop=True)
+
+def contar_delta(delta: pd.DataFrame) -> dict[str, int]:
+    contagem = delta["Situação"].value_counts()
+    return {situacao.lower(): int(contagem.get(situacao, 0)) for situacao in SITUACOES}
+
+# ---------------------- ESTADO POR COMPETÊNCIA ----------------------------
+def caminho_estado(pasta: str, contrato: str, tipo: str, competencia: str) -> str:
+    return os.path.join(pasta, contrato, tipo, f"{competencia}.pkl")
+
+def guardar_competencia(df: pd.DataFrame, pasta: str, contrato: str, tipo: str, competencia: str) -> str:
+    """Guarda o resultado da competência (pickle, para manter os tipos exatos das colunas)."""
+    caminho = caminho_estado(pasta, contrato, tipo, competencia)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    df.reset_index(drop=True).to_pickle(caminho + ".tmp")
+    os.replace(caminho + ".tmp", caminho)
+    return caminho
+
+def carregar_anterior(pasta: str, contrato: str, tipo: str, competencia: str) -> tuple[str, pd.DataFrame] | None:
+    """(competência, DataFrame) da competência guardada mais recente anterior a `competencia`."""
+    pasta_tipo = os.path.dirname(caminho_estado(pasta, contrato, tipo, competencia))
+    if not os.path.isdir(pasta_tipo):
+        return None
+    anteriores = [nome[:-4] for nome in os.listdir(pasta_tipo)
+                  if nome.endswith(".pkl") and RE_COMPETENCIA.match(nome[:-4]) and nome[:-4] < competencia]
+    if not anteriores:
+        return None
+    anterior = max(anteriores)
+    return anterior, pd.read_pickle(caminho_estado(pasta, contrato, tipo, anterior))
@@ -0,0 +1,209 @@
+"""
+Escrita dos resultados em Excel, CSV, Parquet ou Arrow IPC.
+
+Todos os formatos aceitam escrita em blocos (escrever() várias vezes), com tipos fixos por coluna
+para que Parquet/Arrow saiam sempre com o mesmo schema, e o Excel é gravado em modo de memória
+constante quando o xlsxwriter está instalado. pyarrow só é exigido pelos formatos colunares.
+"""
+import os
+import re
+import pandas as pd
+
+from instrumentacao import etapa, contar
+
+FORMATOS = {"xlsx": ".xlsx", "csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+TAMANHO_BLOCO = 50_000
+# filetypes dos diálogos "Salvar como" das interfaces
+TIPOS_ARQUIVO = [("Planilha Excel", "*.xlsx"), ("CSV", "*.csv"), ("Parquet", "*.parquet"), ("Arrow IPC", "*.arrow")]
+
+# colunas de valor sempre em float64, identificadores inteiros em int64; o resto vira texto
+COLUNAS_FLOAT = {
+    "Premio base", "Total copart", "Consultas", "Exames", "Pronto socorro", "Pro rata", "Iof",
+    "Total dep", "Total familiar", "Valor", "Valor Total", "IOF",
+}
+COLUNAS_INT = {"Dep", "Idade", "N° Beneficiário", "Matrícula", "Id", "Página"}
+COLUNAS_DATA = {"Dt Inclusão"}
+
+RE_COMPETENCIA = re.compile(r"^\d{4}-\d{2}$")
+
+def formato_por_extensao(caminho: str, padrao: str = "xlsx") -> str:
+    ext = os.path.splitext(caminho)[1].lower()
+    return next((fmt for fmt, e in FORMATOS.items() if e == ext), padrao)
+
+def tipar(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica os tipos fixos de saída. Colunas desconhecidas e categorias mantêm o tipo que já têm."""
+    df = df.copy()
+    for col in df.columns:
+        if col in COLUNAS_FLOAT:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        elif col in COLUNAS_INT:
+            # inteiros já tipados pelo schema dos extratores (int32/int64) ficam como estão
+            if not pd.api.types.is_integer_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+        elif col in COLUNAS_DATA:
+            df[col] = pd.to_datetime(df[col], errors="coerce").dt.date
+        elif df[col].dtype == object:
+            df[col] = df[col].astype("string")
+    return df
+
+def _schema_estavel(pa, schema):
+    """Categorias viram dictionary<int32, ...>: o índice inferido (int8/int16) muda de um bloco para
+    outro conforme o número de categorias e quebraria o cast dos blocos seguintes."""
+    campos = [pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type), f.nullable)
+              if pa.types.is_dictionary(f.type) else f for f in schema]
+    return pa.schema(campos, metadata=schema.metadata)
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Os formatos Parquet e Arrow exigem o pacote 'pyarrow' (pip install pyarrow).")
+    return pyarrow
+
+# ---------------------- ESCRITORES ----------------------------
+class Escritor:
+    """Grava um resultado em blocos. Use como gerenciador de contexto ou chame fechar() no fim."""
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.linhas = 0
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+    def escrever(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        self._escrever(tipar(df))
+        self.linhas += len(df)
+
+    def _escrever(self, df: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def fechar(self) -> None:
+        pass
+
+    def bytes_escritos(self) -> int:
+        return os.path.getsize(self.caminho) if os.path.exists(self.caminho) else 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+class EscritorXlsx(Escritor):
+    def __init__(self, caminho: str, aba: str = "Sheet1"):
+        super().__init__(caminho)
+        self.partes = []
+        try:
+            import xlsxwriter
+        except ImportError:
+            # sem xlsxwriter os blocos são juntados e gravados pelo pandas/openpyxl no fechar()
+            self.workbook = None
+            return
+        # memória constante: cada linha vai para o disco assim que é escrita, por isso as linhas
+        # são gravadas direto (o to_excel do pandas escreve coluna a coluna)
+        self.workbook = xlsxwriter.Workbook(caminho, {"constant_memory": True,
+                                                      "default_date_format": "dd/mm/yyyy"})
+        self.planilha = self.workbook.add_worksheet(aba)
+        self.negrito = self.workbook.add_format({"bold": True})
+
+    def _escrever(self, df):
+        if self.workbook is None:
+            self.partes.append(df)
+            return
+        if self.linhas == 0:
+            self.planilha.write_row(0, 0, list(df.columns), self.negrito)
+        valores = df.astype(object).where(df.notna(), None)
+        for i, linha in enumerate(valores.itertuples(index=False, name=None), start=self.linhas + 1):
+            self.planilha.write_row(i, 0, linha)
+
+    def fechar(self):
+        if self.workbook is not None:
+            self.workbook.close()
+            self.workbook = None
+        elif self.partes:
+            pd.concat(self.partes, ignore_index=True).to_excel(self.caminho, index=False)
+            self.partes = []
+
+class EscritorCsv(Escritor):
+    def _escrever(self, df):
+        df.to_csv(self.caminho, mode="a" if self.linhas else "w", header=self.linhas == 0,
+                  index=False, encoding="utf-8")
+
+class EscritorParquet(Escritor):
+    def __init__(self, caminho: str):
+        super().__init__(caminho)
+        self.pa = _pyarrow()
+        self.writer = None
+
+    def _escrever(self, df):
+        tabela = self.pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.schema = _schema_estavel(self.pa, tabela.schema)
+            self.writer = self.pa.parquet.ParquetWriter(self.caminho, self.schema)
+        self.writer.write_table(tabela.cast(self.schema))
+
+    def fechar(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+class EscritorArrow(Escritor):
+    def __init__(self, caminho: str):
+        super().__init__(caminho)
+        self.pa = _pyarrow()
+        self.writer = None
+
+    def _escrever(self, df):
+        tabela = self.pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.schema = _schema_estavel(self.pa, tabela.schema)
+            self.writer = self.pa.ipc.new_file(self.caminho, self.schema)
+        self.writer.write_table(tabela.cast(self.schema))
+
+    def fechar(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+ESCRITORES = {"xlsx": EscritorXlsx, "csv": EscritorCsv, "parquet": EscritorParquet, "arrow": EscritorArrow}
+
+def abrir_escritor(caminho: str, formato: str | None = None) -> Escritor:
+    return ESCRITORES[formato or formato_por_extensao(caminho)](caminho)
+
+def salvar(df: pd.DataFrame, caminho: str, formato: str | None = None, tamanho_bloco: int = TAMANHO_BLOCO) -> int:
+    """Grava o DataFrame no formato indicado (ou deduzido pela extensão). Devolve os bytes gravados."""
+    with etapa("exportacao"):
+        with abrir_escritor(caminho, formato) as escritor:
+            for i in range(0, len(df), tamanho_bloco):
+                escritor.escrever(df.iloc[i:i + tamanho_bloco])
+    contar("bytes_escritos", escritor.bytes_escritos())
+    return escritor.bytes_escritos()
+
+def salvar_blocos(blocos, caminho: str, formato: str | None = None) -> int:
+    """Grava DataFrames que chegam aos poucos (ex.: processar_odonto_em_blocos) sem juntá-los em memória."""
+    with abrir_escritor(caminho, formato) as escritor:
+        for df in blocos:
+            with etapa("exportacao"):
+                escritor.escrever(df)
+        with etapa("exportacao"):
+            escritor.fechar()
+    contar("bytes_escritos", escritor.bytes_escritos())
+    return escritor.bytes_escritos()
+
+# ---------------------- DATASET PARTICIONADO ----------------------------
+def caminho_particao(pasta_dataset: str, tipo: str, competencia: str, nome: str, formato: str = "parquet") -> str:
+    """Caminho no layout Hive (tipo=.../competencia=AAAA-MM/nome.ext), lido direto por
+    pd.read_parquet(pasta_dataset) ou pyarrow.dataset. Regravar a mesma fatura substitui a parte."""
+    if not RE_COMPETENCIA.match(competencia):
+        raise ValueError(f"Competência inválida '{competencia}', use AAAA-MM.")
+    return os.path.join(pasta_dataset, f"tipo={tipo}", f"competencia={competencia}", nome + FORMATOS[formato])
+
+def anexar_dataset(df: pd.DataFrame, pasta_dataset: str, tipo: str, competencia: str, nome: str,
+                   formato: str = "parquet") -> str:
+    caminho = caminho_particao(pasta_dataset, tipo, competencia, nome, formato)
+    salvar(df, caminho, formato)
+    return caminho
@@ -0,0 +1,1103 @@
+"""
+Motor de extração das faturas Porto Seguro Saúde/Odonto: leitura das páginas (pdfplumber ou PDFium,
+ver leitores_pdf), casamento
+dos regex ou das colunas (motor_palavras), montagem dos DataFrames e cache. A interface fica em
+AppSaudeOdonto; o lote, o benchmark e o serviço usam este módulo direto.
+"""
+import os
+import re
+import gc
+import time
+import tempfile
+import itertools
+from bisect import bisect_left
+from operator import itemgetter
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from cache_extracao import CacheExtracao, assinatura
+from instrumentacao import etapa, contar, anotar, medicao_atual, memoria_atual_mb
+from leitores_pdf import (EXTRATOR_REFERENCIA, abrir_pdf, liberar_pagina, texto_ocr, texto_pagina_pdfium,
+                          versao_extrator)
+from motor_palavras import (VERSAO_MOTOR, ROTULOS_COLUNAS_SAUDE, ROTULOS_VALORES_SAUDE, RE_CPF, RE_DATA, RE_VALOR,
+                            linhas_pagina, casar_saude_palavras, iterar_odonto_palavras)
+from triagem_paginas import VERSAO_TRIAGEM, tem_tabela_saude, pagina_digitalizada, hash_conteudo
+
+# ---------------------- UTILIDADES ----------------------------
+def to_float(s: str | None) -> float | None:
+    if not s: return None
+    return float(s.replace(".", "").replace(",", "."))
+
+def brl_para_float(valores: Iterable[str | None]) -> np.ndarray:
+    """to_float de uma coluna inteira de uma vez ('1.234,56' -> 1234.56); ausentes viram NaN.
+    As trocas de separador são feitas num único texto e o numpy converte o array inteiro."""
+    texto = "\n".join(v or "nan" for v in valores)
+    if not texto:
+        return np.empty(0, dtype="float64")
+    return np.array(texto.replace(".", "").replace(",", ".").split("\n"), dtype=object).astype("float64")
+
+# ---------------------- SCHEMA DE SAÍDA ----------------------------
+# Tipos fixos das colunas finais: a mesma fatura sai sempre com os mesmos dtypes, textos muito
+# repetidos viram categorias e identificadores curtos ficam em int32.
+TP_ODONTO = pd.CategoricalDtype(["Titular", "Dependente"])
+
+SCHEMA_SAUDE = {
+    "Seguro": "string", "Dep": "int32", "Nome": "string", "Reg func": "string", "Idade": "int32",
+    "Parentesco": "category", "Plano": "category",
+    "Premio base": "float64", "Total copart": "float64", "Consultas": "float64", "Exames": "float64",
+    "Pronto socorro": "float64", "Pro rata": "float64", "Iof": "float64", "Total dep": "float64",
+    "Total familiar": "float64",
+}
+
+SCHEMA_ODONTO = {
+    "N° Beneficiário": "int32", "Nome": "string", "Matrícula": "int64", "CPF": "string",
+    "Plano": "category", "Tp": TP_ODONTO, "Id": "int32", "Dependência": "category",
+    "Dt Inclusão": "object", "Rubrica": "category",
+    "Valor": "float64", "Valor Total": "float64", "IOF": "float64",
+}
+
+def montar_df(colunas: dict, schema: dict) -> pd.DataFrame:
+    """DataFrame direto das listas/arrays de cada coluna, já nos tipos do schema."""
+    df = {}
+    for nome, dtype in schema.items():
+        valores = colunas[nome]
+        if dtype in ("int32", "int64"):
+            # dígitos capturados pelo regex ("07"): o numpy converte o array de texto inteiro de uma vez
+            valores = np.array(valores, dtype=object).astype(dtype)
+        df[nome] = pd.Series(valores, dtype=dtype)
+    return pd.DataFrame(df)
+
+# ---------------------- EXTRAÇÃO DE TEXTO ----------------------------
+PROCESSOS_PADRAO = max(1, (os.cpu_count() or 1) - 1)
+MIN_PAGINAS_PARALELO = 16       # abaixo disso o custo de subir processos não compensa
+FAIXAS_POR_PROCESSO = 4         # faixas menores equilibram páginas pesadas entre processos
+
+# progresso(paginas_lidas, total_paginas): chamado a cada página (ou faixa, no modo paralelo). Uma
+# exceção levantada por ele (ex.: cancelamento pela interface) interrompe a extração ali mesmo.
+Progresso = Callable[[int, int], None]
+
+# Motores de leitura: 'texto' (extract_text + regex) ou 'palavras' (coordenadas, motor_palavras).
+# A leitura de página de cada motor precisa ser uma função de módulo para ir aos processos do pool.
+MOTORES = ["texto", "palavras"]
+MOTOR_PADRAO = {"saude": "texto", "odonto": "texto"}
+
+# Página digitalizada (só imagem) sai vazia do extract_text(); ela vai para o OCR (leitores_pdf.texto_ocr)
+# e o texto lido segue para os mesmos regex. O motor 'palavras' depende das coordenadas do PDF e não
+# tem como ler a imagem: a página digitalizada é um erro nele, e não beneficiários a menos.
+def texto_pagina(pg) -> str:
+    texto = pg.extract_text() or ""
+    if not texto.strip() and pagina_digitalizada(pg):
+        return texto_ocr(pg)
+    return texto
+
+def linhas_pagina_texto(pg) -> list:
+    linhas = linhas_pagina(pg)
+    if not linhas and pagina_digitalizada(pg):
+        raise ValueError(f"A página {pg.page_number} é digitalizada (sem texto): o motor 'palavras' não a lê; "
+                         f"use o motor 'texto', que passa a página pelo OCR.")
+    return linhas
+
+LEITURA_PAGINA = {"texto": texto_pagina, "palavras": linhas_pagina_texto}
+
+# Na saúde só interessam as páginas com a tabela 'Seguro Dep': as demais (capa, resumo, avisos) são
+# descartadas pela triagem antes da extração e chegam aos motores como None ("página ignorada"). A
+# página digitalizada não tem texto para a triagem: passa pelo OCR e é conferida no texto lido.
+def texto_pagina_saude(pg) -> str | None:
+    if tem_tabela_saude(pg):
+        return texto_pagina(pg)
+    if pagina_digitalizada(pg):
+        texto = texto_ocr(pg)
+        return texto if extrair_tabela_seguro(texto) is not None else None
+    return None
+
+def linhas_pagina_saude(pg) -> list | None:
+    return linhas_pagina_texto(pg) if tem_tabela_saude(pg) or pagina_digitalizada(pg) else None
+
+LEITURA_SAUDE = {"texto": texto_pagina_saude, "palavras": linhas_pagina_saude}
+
+# Extratores do motor 'texto' (leitores_pdf); o motor 'palavras' lê as coordenadas do pdfplumber.
+# No PDFium o texto sai barato, então a triagem da saúde é feita no próprio texto: a página sem o
+# cabeçalho da tabela fica None, exatamente como o casar_saude a descartaria.
+EXTRATOR_PADRAO = {"saude": "pdfplumber", "odonto": "pdfplumber"}
+
+def texto_pagina_saude_pdfium(pg) -> str | None:
+    texto = texto_pagina_pdfium(pg)
+    return texto if extrair_tabela_seguro(texto) is not None else None
+
+LEITURA_TEXTO = {"pdfplumber": texto_pagina, "pdfium": texto_pagina_pdfium}
+LEITURA_TEXTO_SAUDE = {"pdfplumber": texto_pagina_saude, "pdfium": texto_pagina_saude_pdfium}
+
+def iterar_paginas(pdf_path: str, ler_pagina=texto_pagina, progresso: Progresso | None = None,
+                   extrator: str = EXTRATOR_REFERENCIA) -> Iterator:
+    """Cada página lida por `ler_pagina` sob demanda, sem manter a lista do documento inteiro."""
+    with abrir_pdf(pdf_path, extrator) as pdf:
+        total = len(pdf.pages)
+        for i, pg in enumerate(pdf.pages, 1):
+            with etapa("extracao"):
+                pagina = ler_pagina(pg)
+                liberar_pagina(pg)
+            contar("paginas")
+            if pagina is None:
+                contar("paginas_ignoradas")
+            yield pagina
+            if progresso:
+                progresso(i, total)
+
+def iterar_textos(pdf_path: str, progresso: Progresso | None = None) -> Iterator[str]:
+    return iterar_paginas(pdf_path, texto_pagina, progresso)
+
+def _extrair_faixa(pdf_path: str, indices: range | list[int], ler_pagina=texto_pagina,
+                   extrator: str = EXTRATOR_REFERENCIA) -> list:
+    with abrir_pdf(pdf_path, extrator) as pdf:
+        return [_ler_e_liberar(pdf.pages[i], ler_pagina) for i in indices]
+
+def _ler_e_liberar(pg, ler_pagina):
+    pagina = ler_pagina(pg)
+    liberar_pagina(pg)
+    return pagina
+
+def extrair_textos(pdf_path: str, processos: int = 1, progresso: Progresso | None = None,
+                   extrator: str = EXTRATOR_REFERENCIA) -> list[str]:
+    """Texto de cada página, na ordem do PDF. Com processos > 1 as páginas são divididas em faixas
+    extraídas em paralelo e reunidas na ordem original, produzindo o mesmo resultado do modo serial."""
+    return extrair_paginas(pdf_path, processos, progresso, LEITURA_TEXTO[extrator], extrator=extrator)
+
+def extrair_paginas(pdf_path: str, processos: int = 1, progresso: Progresso | None = None,
+                    ler_pagina=texto_pagina, indices: list[int] | None = None,
+                    extrator: str = EXTRATOR_REFERENCIA) -> list:
+    """Como extrair_textos, com a leitura de página escolhida; `indices` limita às páginas listadas.
+    `ler_pagina` recebe as páginas da biblioteca de `extrator`."""
+    with etapa("extracao"):
+        paginas = _extrair_paginas(pdf_path, processos, progresso, ler_pagina, indices, extrator)
+    contar("paginas", len(paginas))
+    contar("paginas_ignoradas", sum(p is None for p in paginas))
+    return paginas
+
+def _extrair_paginas(pdf_path: str, processos: int, progresso: Progresso | None, ler_pagina,
+                     indices: list[int] | None = None, extrator: str = EXTRATOR_REFERENCIA) -> list:
+    with abrir_pdf(pdf_path, extrator) as pdf:
+        if indices is None:
+            indices = range(len(pdf.pages))
+        total = len(indices)
+        if processos <= 1 or total < MIN_PAGINAS_PARALELO:
+            paginas = []
+            for i in indices:
+                paginas.append(_ler_e_liberar(pdf.pages[i], ler_pagina))
+                if progresso:
+                    progresso(len(paginas), total)
+            return paginas
+
+    tamanho = max(1, -(-total // (processos * FAIXAS_POR_PROCESSO)))
+    faixas = [indices[i:i + tamanho] for i in range(0, total, tamanho)]
+    with ProcessPoolExecutor(max_workers=min(processos, len(faixas))) as executor:
+        futuros = [executor.submit(_extrair_faixa, pdf_path, faixa, ler_pagina, extrator) for faixa in faixas]
+        paginas = []
+        try:
+            for futuro in futuros:
+                paginas.extend(futuro.result())
+                if progresso:
+                    progresso(len(paginas), total)
+        except BaseException:
+            # sem isso o with esperaria todas as faixas restantes antes de propagar o cancelamento
+            for futuro in futuros:
+                futuro.cancel()
+            raise
+        return paginas
+
+# ---------------------- EXPRESSÕES REGULARES - SAÚDE ----------------------------
+RE_HEADER_SAUDE = re.compile(r"""
+    ^\s*
+    (?:(?P<seguro>\d{8})\s+)?             
+    (?P<dep>\d{1,2})\s+                   
+    (?P<nome>[A-ZÀ-Ü][^\d\n]+?)           
+    \s*
+    (?P<reg_func>\d{4,7})?                
+    \s+
+    (?P<idade>\d{1,3})\s+                 
+    (?P<parentesco>Titular|Conjuge|Filh[oa])
+    """, re.MULTILINE | re.VERBOSE
+)
+
+RE_HEADER_SAUDE_ALT = re.compile(r"""
+    ^\s*
+    (?:(?P<seguro>\d{7,9})\s+)?             
+    (?P<dep>\d{1,2})\s+                   
+    (?P<nome>[A-ZÀ-Üa-zà-ü\s\.'\-]+?)           
+    \s*
+    (?P<reg_func>\d{4,8})?                
+    \s+
+    (?P<idade>\d{1,3})\s+                 
+    (?P<parentesco>Titular|Conjuge|Filh[oa]|filho|filha)
+    """, re.MULTILINE | re.VERBOSE
+)
+
+VAL = r"(?P<val>\d[\d\.]*,\d{2})"
+RE_VALS_SAUDE = {
+    "premio_base": re.compile(r"Prêmio\s+Base\s*" + VAL),
+    #"desc_copart": re.compile(r"(Desc(?:onto)?\s+por\s+Co[- ]?Part(?:\.|icipação)?\s*\(-?\))?\s*" + VAL),
+    "total_copart": re.compile(r"Total\s+Co[- ]?Part\.\s*R?\$?\s*" + VAL),
+    "consultas": re.compile(r"CONSULTAS[^\d]*" + VAL),
+    "exames": re.compile(r"EXAMES[^\d]*" + VAL),
+    "pronto_socorro": re.compile(r"PRONTO[-\s]?SOCORRO[^\d]*" + VAL),
+    "pro_rata": re.compile(r"Pro[-\s]?Rata[^\d]*" + VAL),
+    "iof": re.compile(r"\bIOF\s*" + VAL),
+    "total_dep": re.compile(r"TOTAL\s+DO\s+DEP\.\s*" + VAL),
+}
+
+RE_TOTAL_FAMILIA = re.compile(r"TOTAL\.\s*(\d[\d\.]*,\d{2})")
+
+# Rótulo (início literal) de cada regex de valor. Em vez de rodar todo o RE_VALS_SAUDE no corpo de cada
+# beneficiário, cada rótulo é procurado uma única vez no bloco inteiro e as ocorrências viram uma
+# lista de tokens ordenada por posição; o regex completo só é testado onde há um rótulo.
+ROTULOS_SAUDE = {
+    "premio_base": r"Prêmio\s+Base",
+    "total_copart": r"Total\s+Co[- ]?Part\.",
+    "consultas": r"CONSULTAS",
+    "exames": r"EXAMES",
+    "pronto_socorro": r"PRONTO[-\s]?SOCORRO",
+    "pro_rata": r"Pro[-\s]?Rata",
+    "iof": r"IOF",             # sem o \b, que impede a busca rápida por literal; ele é conferido no match
+    "total_dep": r"TOTAL\s+DO\s+DEP\.",
+}
+RE_ROTULOS_SAUDE = {campo: re.compile(rotulo) for campo, rotulo in ROTULOS_SAUDE.items()}
+
+def tokenizar_saude(texto: str) -> list[tuple[int, str]]:
+    """(posição, campo) de todos os rótulos de valor do bloco, em ordem de posição."""
+    tokens = [(r.start(), campo) for campo, rx in RE_ROTULOS_SAUDE.items() for r in rx.finditer(texto)]
+    tokens.sort()
+    return tokens
+
+PADROES_TABELA_SEGURO = [
+    r"Seguro\s+Dep",
+    r"Seguro\s*:\s*Dep",
+    r"N[oº]?\s*Seguro\s+Dep"
+]
+
+RE_TABELAS_SEGURO = [re.compile(padrao) for padrao in PADROES_TABELA_SEGURO]
+
+def extrair_tabela_seguro(txt: str) -> str | None:
+    """Texto depois do cabeçalho da tabela de beneficiários, com o primeiro padrão que casar."""
+    for rx in RE_TABELAS_SEGURO:
+        m = rx.search(txt)
+        if m:
+            return txt[m.end():]
+    return None
+
+# ---------------------- PROCESSAMENTO SAÚDE ----------------------------
+def extrair_textos_incremental(pdf_path: str, cache: CacheExtracao, processos: int = 1,
+                               progresso: Progresso | None = None, ler_pagina=texto_pagina) -> list[str | None]:
+    """Texto de cada página, extraindo só as páginas cujo conteúdo (hash_conteudo) o cache ainda não
+    conhece. A fatura do mês seguinte do mesmo contrato repete a maior parte das páginas."""
+    with etapa("cache"), abrir_pdf(pdf_path) as pdf:
+        vistos = {}
+        hashes = [hash_conteudo(pg, vistos) for pg in pdf.pages]
+    conhecidos = cache.obter_conteudos([h for h in hashes if h], VERSAO_EXTRATOR)
+    faltam = [i for i, h in enumerate(hashes) if h not in conhecidos]
+    # a triagem (ler_pagina) só vale para o que será extraído; páginas conhecidas já têm o texto
+    textos = [conhecidos.get(h) for h in hashes]
+    contar("paginas_reaproveitadas", len(hashes) - len(faltam))
+    if faltam:
+        novos = extrair_paginas(pdf_path, processos, progresso, ler_pagina, faltam)
+        for i, texto in zip(faltam, novos):
+            textos[i] = texto
+        with etapa("cache"):
+            cache.guardar_conteudos({hashes[i]: texto for i, texto in zip(faltam, novos)
+                                     if hashes[i] and texto is not None}, VERSAO_EXTRATOR)
+    else:
+        contar("paginas", 0)
+        if progresso:
+            progresso(len(hashes), len(hashes))
+    return textos
+
+def processar_saude(pdf_path: str, processos: int = 1, progresso: Progresso | None = None,
+                    motor: str = "texto", triagem: bool = True, extrator: str = EXTRATOR_REFERENCIA) -> pd.DataFrame:
+    """Com `triagem`, páginas sem a tabela de beneficiários não passam pela extração de texto."""
+    if motor == "palavras":
+        ler_pagina = (LEITURA_SAUDE if triagem else LEITURA_PAGINA)[motor]
+        return processar_saude_palavras(_ler_paginas(pdf_path, processos, progresso, ler_pagina))
+    ler_pagina = (LEITURA_TEXTO_SAUDE if triagem else LEITURA_TEXTO)[extrator]
+    return processar_saude_textos(extrair_paginas(pdf_path, processos, progresso, ler_pagina, extrator=extrator))
+
+def _ler_paginas(pdf_path: str, processos: int, progresso: Progresso | None, ler_pagina,
+                 extrator: str = EXTRATOR_REFERENCIA):
+    """Páginas sob demanda no modo serial; com processos > 1, a lista extraída pelo pool."""
+    if processos <= 1:
+        return iterar_paginas(pdf_path, ler_pagina, progresso, extrator)
+    return extrair_paginas(pdf_path, processos, progresso, ler_pagina, extrator=extrator)
+
+CAMPOS_HEADER_SAUDE = ["seguro", "dep", "nome", "reg_func", "idade", "parentesco"]
+
+def processar_saude_textos(textos: list[str | None], layout: str | None = None) -> pd.DataFrame:
+    with etapa("casamento"):
+        casado = casar_saude(textos, layout)
+    with etapa("montagem"):
+        return montar_df_saude(*casado)
+
+def processar_saude_em_fluxo(textos: Iterable[str | None], layout: str | None = None) -> pd.DataFrame:
+    """Como processar_saude_textos, para páginas que chegam aos poucos (a esteira do lote): o casamento
+    é medido página a página, sem somar a espera pela página seguinte."""
+    casador = CasadorSaude(layout)
+    for n, txt in enumerate(textos, 1):
+        with etapa("casamento"):
+            casador.pagina(n, txt)
+    with etapa("montagem"):
+        return montar_df_saude(*casador.finalizar())
+
+def processar_saude_palavras(paginas: Iterable[list]) -> pd.DataFrame:
+    casado = casar_saude_palavras(paginas)      # a etapa 'casamento' é medida página a página lá dentro
+    with etapa("montagem"):
+        return montar_df_saude(*casado)
+
+def casar_saude(textos: Iterable[str | None], layout: str | None = None) -> tuple[dict[str, list], dict[int, str]]:
+    """Etapa de regex: colunas ainda em texto e o TOTAL. de cada titular (índice -> valor).
+    Páginas None (descartadas pela triagem) são puladas. Sem `layout`, ele é identificado na primeira
+    página com a tabela de beneficiários."""
+    casador = CasadorSaude(layout)
+    for n, txt in enumerate(textos, 1):
+        casador.pagina(n, txt)
+    return casador.finalizar()
+
+class CasadorSaude:
+    """Casamento da saúde página a página. O estado que atravessa as páginas (seguro e titular da
+    família em curso) fica aqui; `retirar` entrega as famílias já fechadas sem esperar o fim do documento."""
+    def __init__(self, layout: str | None = None):
+        self.layout = layout
+        # uma lista por coluna; os valores ficam como texto e são convertidos de uma vez no final
+        self.cols = {c: [] for c in [*CAMPOS_HEADER_SAUDE, "plano", *RE_VALS_SAUDE]}
+        self.totais = {}        # índice do titular -> TOTAL. da família
+        self.titular = None     # último titular em ordem de documento; a família pode continuar na página seguinte
+        self.seguro = None
+        self.blocos = 0
+        self.blocos_alt = 0     # blocos lidos com o RE_HEADER_SAUDE_ALT
+
+    def pagina(self, n: int, txt: str | None) -> None:
+        if not txt:
+            return
+        if self.layout is None:
+            self.layout = identificar_layout("saude", txt)
+            if self.layout:
+                anotar("layout", self.layout)
+        tbl = tabela_do_layout(txt, self.layout) if self.layout else None
+        if tbl is None:
+            tbl = extrair_tabela_seguro(txt)
+            contar("saude.fora_do_layout", bool(tbl and self.layout))
+        if tbl:
+            self._casar_bloco(n, _sem_linhas_longas(tbl))
+
+    def _casar_bloco(self, n: int, texto: str) -> None:
+        # a página sem layout identificado só pode ter cabeçalhos que nenhum layout casa: os dois
+        # cabeçalhos falham nela de qualquer jeito, então o padrão serve como configuração
+        config = LAYOUTS["saude"][self.layout or LAYOUT_PADRAO["saude"]]
+        cabecalho = config["cabecalho"]
+        outro = RE_HEADER_SAUDE_ALT if cabecalho is RE_HEADER_SAUDE else RE_HEADER_SAUDE
+        cols, totais = self.cols, self.totais
+        self.blocos += 1
+        inicio_bloco = len(cols["dep"])
+        usado = cabecalho
+        matches = list(casar_no_orcamento(cabecalho, texto, config["orcamento"], n))
+        if not matches:
+            # página fora do layout: tenta o outro cabeçalho, como antes do registro de layouts
+            usado = outro
+            matches = list(casar_no_orcamento(outro, texto, config["orcamento"], n))
+        self.blocos_alt += usado is RE_HEADER_SAUDE_ALT
+
+        total_matches = list(RE_TOTAL_FAMILIA.finditer(texto))
+        tokens = tokenizar_saude(texto)
+        posicoes = [p for p, _ in tokens]
+
+        seguro = self.seguro
+        for m, nxt in zip(matches, itertools.chain(matches[1:], [None])):
+            # o número do seguro só aparece no titular; os dependentes herdam o anterior
+            seguro = m["seguro"] or seguro
+            cols["seguro"].append(seguro)
+            for campo in CAMPOS_HEADER_SAUDE[1:]:
+                cols[campo].append(m[campo])
+            inicio, fim = m.end(), nxt.start() if nxt else len(texto)
+            corpo = texto[inicio:fim]
+
+            # ── NOVO: extrair nome do Plano da primeira linha do corpo
+            cols["plano"].append(next((l.strip() for l in corpo.splitlines() if l.strip()), None))
+
+            # cada valor é o primeiro rótulo do corpo cujo regex completo casa a partir dali,
+            # exatamente o que rx.search(corpo) devolveria
+            vals = dict.fromkeys(RE_VALS_SAUDE)
+            for p, campo in tokens[bisect_left(posicoes, inicio):bisect_left(posicoes, fim)]:
+                if vals[campo] is not None:
+                    continue
+                # no início do corpo o \b de IOF precisa ver o corpo recortado, não o cabeçalho
+                rx = RE_VALS_SAUDE[campo]
+                mm = rx.match(texto, p, fim) if p > inicio else rx.match(corpo)
+                if mm:
+                    vals[campo] = mm["val"]
+            for campo, val in vals.items():
+                cols[campo].append(val)
+        self.seguro = seguro
+
+        # cabeçalhos e TOTAL. já estão em ordem de posição no bloco: um único passo intercalado
+        # atribui cada TOTAL. ao último titular anterior a ele
+        parentesco = cols["parentesco"]
+        titular = self.titular
+        i = 0
+        for tm in total_matches:
+            while i < len(matches) and matches[i].start() < tm.start():
+                if parentesco[inicio_bloco + i] == "Titular":
+                    titular = inicio_bloco + i
+                i += 1
+            if titular is not None:
+                totais[titular] = tm.group(1)
+        for j in range(inicio_bloco + i, len(parentesco)):
+            if parentesco[j] == "Titular":
+                titular = j
+        self.titular = titular
+
+    def pendentes(self) -> int:
+        """Beneficiários casados e ainda não retirados."""
+        return len(self.cols["dep"])
+
+    def retirar(self) -> tuple[dict[str, list], dict[int, str]]:
+        """Colunas e totais das famílias fechadas (todas antes do titular em curso, cujo TOTAL. ainda
+        pode vir na próxima página), com os índices recomeçando do zero; o restante continua aqui."""
+        limite = self.pendentes() if self.titular is None else self.titular
+        fechadas = {c: v[:limite] for c, v in self.cols.items()}
+        totais = {i: t for i, t in self.totais.items() if i < limite}
+        self._contar(fechadas, totais)
+        self.cols = {c: v[limite:] for c, v in self.cols.items()}
+        self.totais = {i - limite: t for i, t in self.totais.items() if i >= limite}
+        if self.titular is not None:
+            self.titular -= limite
+        return fechadas, totais
+
+    def finalizar(self) -> tuple[dict[str, list], dict[int, str]]:
+        cols, totais = self.cols, self.totais
+        self._contar(cols, totais)
+        if medicao_atual():
+            contar("saude.blocos", self.blocos)
+            contar("saude.RE_HEADER_SAUDE_ALT.blocos", self.blocos_alt)
+            if self.blocos_alt:
+                anotar("saude.fallback", f"RE_HEADER_SAUDE_ALT em {self.blocos_alt} de {self.blocos} blocos")
+        return cols, totais
+
+    def _contar(self, cols: dict[str, list], totais: dict[int, str]) -> None:
+        if medicao_atual():
+            contar("saude.beneficiarios", len(cols["dep"]))
+            contar("saude.RE_TOTAL_FAMILIA", len(totais))
+            for campo in RE_VALS_SAUDE:
+                contar(f"saude.RE_VALS_SAUDE.{campo}", sum(v is not None for v in cols[campo]))
+
+def montar_df_saude(cols: dict[str, list], totais: dict[int, str]) -> pd.DataFrame:
+    return juntar_blocos_saude([montar_bloco_saude(cols, totais)])
+
+def montar_bloco_saude(cols: dict[str, list], totais: dict[int, str]) -> pd.DataFrame:
+    """DataFrame de um trecho de beneficiários, sem ordenar e com o Total familiar vazio onde não houve
+    TOTAL.: a regra do total e a ordenação dependem do documento inteiro e ficam para juntar_blocos_saude."""
+    n = len(cols["dep"])
+    if not n:
+        return pd.DataFrame()
+
+    for campo in RE_VALS_SAUDE:
+        cols[campo] = np.nan_to_num(brl_para_float(cols[campo]), nan=0.0)
+    cols["seguro"] = [str(sg) for sg in cols["seguro"]]
+    cols["total_familiar"] = np.full(n, np.nan)
+    if totais:
+        cols["total_familiar"][list(totais)] = brl_para_float(totais.values())
+    return montar_df({c.capitalize().replace("_", " "): v for c, v in cols.items()}, SCHEMA_SAUDE)
+
+def juntar_blocos_saude(blocos: list[pd.DataFrame]) -> pd.DataFrame:
+    blocos = [b for b in blocos if not b.empty]
+    if not blocos:
+        return pd.DataFrame()
+    df = juntar_blocos(blocos, SCHEMA_SAUDE)
+    total = df["Total familiar"]
+    if total.notna().any():
+        df["Total familiar"] = total.fillna(0.0)
+    else:
+        # fatura sem TOTAL.: o total da família é a soma dos dependentes do mesmo seguro
+        df["Total familiar"] = df["Total dep"].groupby(df["Seguro"], sort=False).transform("sum")
+    return df.sort_values(["Seguro", "Dep"])
+
+def juntar_blocos(blocos: list[pd.DataFrame], schema: dict) -> pd.DataFrame:
+    """Concatena, na ordem do documento, blocos montados em separado. As categorias são refeitas sobre o
+    todo, como se o DataFrame tivesse sido montado de uma vez."""
+    if len(blocos) == 1:
+        return blocos[0]
+    df = pd.concat(blocos, ignore_index=True)
+    for nome, dtype in schema.items():
+        if dtype == "category":
+            df[nome] = df[nome].astype("category")
+    return df
+
+# ---------------------- EXPRESSÕES ODONTO ----------------------------
+RE_ODONTO_SEGURO = re.compile(r"""
+    ^\s*
+    (?P<num>\d{1,6})\s+
+    (?P<nome>[A-ZÀ-Ü][^\d\n]+?)\s+
+    (?P<matricula>\d+)\s+
+    (?P<cpf>\d{3}\.\d{3}\.\d{3}-\d{2})\s+
+    (?P<plano>[A-ZÀ-Ü\s\/\-]+(?:DOC)?(?:\s+\d{1,2})?)\s+
+    (?P<tp>[TD])\s+
+    (?P<id>\d+)\s+
+    (?:(?P<dependencia>Conjuge|Filh[oa]|Enteada?)\s+)?
+    (?P<dt_inclusao>\d{2}/\d{2}/\d{4})\s+
+    (?P<rubrica>(Total|Mensalidades?)\s+[\wÀ-Ü\s\-\/]+?)\s+
+    (?P<valor>\d[\d\.]*,\d{2})
+    (?:\s+(?P<valor_total>\d[\d\.]*,\d{2}))?
+    \s*$
+""", re.MULTILINE | re.VERBOSE)
+
+RE_ODONTO = re.compile(r"""
+    ^\s*
+    (?P<num>\d+)\s+
+    (?P<nome>[^0-9\n]+?)\s*(?P<matricula>\d+)\s+
+    (?P<cpf>\d{3}\.\d{3}\.\d{3}-\d{2})\s+
+    (?P<plano>.+?)(?=\s+[TD]\s+\d+)\s+
+    (?P<tp>[TD])\s+
+    (?P<id>\d+)\s+
+    (?:(?P<dependencia>Conjuge|Filh[oa])\s+)?
+    (?P<dt_inclusao>\d{2}/\d{2}/\d{4})\s+
+    (?P<rubrica>.+?)\s+
+    (?P<valor>\d[\d\.]*,\d{2})
+    (?:\s+(?P<valor_total>\d[\d\.]*,\d{2}))?
+""", re.MULTILINE | re.VERBOSE)
+
+RE_IOF = re.compile(r"Cobran[çc]a de IOF[^\d]*(?P<iof>\d[\d\.]*,\d{2})")
+
+RE_JUNTA_CPF = re.compile(r'([A-ZÀ-Üa-zà-ü])\n(?=\d{3}\.\d{3}\.\d{3}-\d{2})')
+
+# ---------------------- LAYOUTS ----------------------------
+# Cada layout é o conjunto de padrões de um modelo de fatura. Ele é identificado uma vez, na primeira
+# página com tabela (ou vem do cache, pelo contrato), e só os padrões dele rodam no resto do documento;
+# uma página em que eles não casam volta a tentar os demais. Todo layout tem um orçamento de tempo de
+# casamento por página, para que uma linha patológica nos .+? não trave o lote inteiro.
+ORCAMENTO_PAGINA = 5.0      # segundos de casamento por página antes de desistir do arquivo
+LINHA_MAXIMA = 1000         # nenhuma linha de registro chega perto disso; mais longa, não entra no regex
+NOMES_TABELA_SEGURO = ["seguro-dep", "seguro:dep", "n-seguro-dep"]
+
+LAYOUTS = {
+    "saude": {
+        f"{nome}{sufixo}": {"tabela": rx_tabela, "cabecalho": rx_cabecalho, "orcamento": ORCAMENTO_PAGINA}
+        for nome, rx_tabela in zip(NOMES_TABELA_SEGURO, RE_TABELAS_SEGURO)
+        for sufixo, rx_cabecalho in (("", RE_HEADER_SAUDE), ("-alt", RE_HEADER_SAUDE_ALT))
+    },
+    "odonto": {
+        "odonto": {"registro": RE_ODONTO_SEGURO, "orcamento": ORCAMENTO_PAGINA},
+        "odonto-livre": {"registro": RE_ODONTO, "orcamento": ORCAMENTO_PAGINA},
+    },
+}
+LAYOUT_PADRAO = {"saude": "seguro-dep", "odonto": "odonto"}
+
+class TempoCasamentoEsgotado(ValueError):
+    """O casamento passou do orçamento em uma página: o arquivo falha e o lote segue para o próximo."""
+
+def casar_no_orcamento(rx: re.Pattern, texto: str, orcamento: float, pagina: int) -> Iterator[re.Match]:
+    """rx.finditer(texto), desistindo quando a página passa do orçamento. O re não interrompe um
+    casamento em andamento: o tempo é conferido entre um casamento e outro, e _sem_linhas_longas
+    tira do texto as linhas em que um único casamento poderia retroceder sem fim."""
+    limite = time.perf_counter() + orcamento
+    for m in rx.finditer(texto):
+        yield m
+        if time.perf_counter() > limite:
+            break
+    if time.perf_counter() > limite:
+        raise TempoCasamentoEsgotado(f"Casamento do regex passou de {orcamento:.0f}s na página {pagina}; "
+                                     "verifique se o layout da fatura mudou.")
+
+def _sem_linhas_longas(texto: str) -> str:
+    """Troca por '#' (mesmo tamanho: as posições não mudam) as linhas mais longas que LINHA_MAXIMA."""
+    if len(texto) <= LINHA_MAXIMA:
+        return texto
+    linhas = texto.split("\n")
+    if max(map(len, linhas)) <= LINHA_MAXIMA:
+        return texto
+    contar("linhas_longas_ignoradas", sum(len(l) > LINHA_MAXIMA for l in linhas))
+    return "\n".join("#" * len(l) if len(l) > LINHA_MAXIMA else l for l in linhas)
+
+def tabela_do_layout(txt: str, layout: str) -> str | None:
+    m = LAYOUTS["saude"][layout]["tabela"].search(txt)
+    return txt[m.end():] if m else None
+
+def _layout_serve(tipo: str, layout: str, texto: str) -> bool:
+    config = LAYOUTS[tipo][layout]
+    if tipo == "saude":
+        tbl = tabela_do_layout(texto, layout)
+        return tbl is not None and config["cabecalho"].search(tbl) is not None
+    return config["registro"].search(texto) is not None
+
+def identificar_layout(tipo: str, texto: str, preferido: str | None = None) -> str | None:
+    """Layout de uma página: o `preferido` (o já conhecido do contrato) se ele casar, senão o primeiro do
+    registro que casar, na ordem em que os regex alternativos eram tentados. None em página sem tabela."""
+    texto = _sem_linhas_longas(RE_JUNTA_CPF.sub(r"\1 ", texto) if tipo == "odonto" else texto)
+    candidatos = ([preferido] if preferido in LAYOUTS[tipo] else []) + list(LAYOUTS[tipo])
+    return next((layout for layout in candidatos if _layout_serve(tipo, layout, texto)), None)
+
+def identificar_layout_documento(tipo: str, textos: Iterable[str | None], preferido: str | None = None) -> str | None:
+    for texto in textos:
+        if texto:
+            layout = identificar_layout(tipo, texto, preferido)
+            if layout:
+                return layout
+    return None
+
+LINHAS_MARGEM_ODONTO = 3    # linhas finais do trecho que ainda podem continuar na página seguinte
+BLOCO_ODONTO = 5000         # registros por DataFrame no modo em blocos
+
+def _inicio_ultimas_linhas(texto: str, n: int) -> int:
+    pos = len(texto)
+    for _ in range(n):
+        pos = texto.rfind("\n", 0, pos)
+        if pos < 0:
+            return 0
+    return pos + 1
+
+def _registro_odonto(texto: str, m: re.Match, fim: int) -> dict:
+    d = m.groupdict()
+    mi = RE_IOF.search(texto, m.end(), fim)
+    d["iof"] = mi.group("iof") if mi else None
+    return d
+
+def _nome_regex_odonto(regex: re.Pattern) -> str:
+    return "odonto.RE_ODONTO_SEGURO" if regex is RE_ODONTO_SEGURO else "odonto.RE_ODONTO"
+
+def iterar_odonto(textos: Iterable[str], layout: str | None = None) -> Iterator[dict]:
+    """Gera os registros odonto página a página, com o mesmo resultado de processar o texto inteiro.
+    Entre páginas fica guardado só o trecho a partir do último registro em aberto: o IOF dele pode
+    estar na página seguinte e o nome pode ter sido quebrado antes do CPF na virada de página.
+    Sem `layout`, ele é identificado na primeira página com registros; no layout 'odonto-livre' o
+    regex alternativo roda página a página, sem esperar o fim do documento."""
+    config = LAYOUTS["odonto"][layout or LAYOUT_PADRAO["odonto"]]
+    if layout:
+        anotar("layout", layout)
+    pendente = None
+    for n, txt in enumerate(textos, 1):
+        trecho = _sem_linhas_longas(RE_JUNTA_CPF.sub(r"\1 ", txt if pendente is None else pendente + "\n" + txt))
+        if layout is None:
+            layout = identificar_layout("odonto", trecho)
+            if layout:
+                anotar("layout", layout)
+                config = LAYOUTS["odonto"][layout]
+        regex = config["registro"]
+        corte = _inicio_ultimas_linhas(trecho, LINHAS_MARGEM_ODONTO)
+
+        with etapa("casamento"):
+            fechados = []
+            for m in casar_no_orcamento(regex, trecho, config["orcamento"], n):
+                if m.end() > corte:
+                    break
+                fechados.append(m)
+            registros = [_registro_odonto(trecho, m, nxt.start()) for m, nxt in zip(fechados, fechados[1:])]
+            # sem nenhum registro até aqui o texto todo é mantido, pois pode ser preciso o regex alternativo
+            pendente = trecho[fechados[-1].start():] if fechados else trecho
+        contar(_nome_regex_odonto(regex), len(registros))
+        yield from registros
+
+    if pendente is None:
+        return
+
+    with etapa("casamento"):
+        regex = config["registro"]
+        detalhes = list(casar_no_orcamento(regex, pendente, config["orcamento"], n))
+        if not detalhes and regex is not RE_ODONTO:
+            regex = RE_ODONTO
+            detalhes = list(casar_no_orcamento(regex, pendente, config["orcamento"], n))
+        registros = [_registro_odonto(pendente, m, nxt.start() if nxt else len(pendente))
+                     for m, nxt in zip(detalhes, itertools.chain(detalhes[1:], [None]))]
+    if regex is RE_ODONTO:
+        anotar("odonto.fallback", "RE_ODONTO")
+    contar(_nome_regex_odonto(regex), len(registros))
+    yield from registros
+
+def processar_odonto(pdf_path: str, processos: int = 1, progresso: Progresso | None = None,
+                     motor: str = "texto", extrator: str = EXTRATOR_REFERENCIA) -> pd.DataFrame:
+    if motor == "palavras":
+        paginas = _ler_paginas(pdf_path, processos, progresso, LEITURA_PAGINA[motor])
+        return processar_odonto_registros(iterar_odonto_palavras(paginas))
+    return processar_odonto_textos(_ler_paginas(pdf_path, processos, progresso, LEITURA_TEXTO[extrator], extrator))
+
+def processar_odonto_textos(textos: Iterable[str], layout: str | None = None) -> pd.DataFrame:
+    return processar_odonto_registros(iterar_odonto(textos, layout))
+
+def processar_odonto_registros(registros: Iterable[dict]) -> pd.DataFrame:
+    registros = list(registros)
+    if not registros:
+        raise ValueError("❌ Nenhum dado encontrado no PDF Odonto.")
+    contar("odonto.RE_IOF", sum(d["iof"] is not None for d in registros))
+    with etapa("montagem"):
+        return montar_df_odonto(registros)
+
+def processar_odonto_em_blocos(pdf_path: str, tamanho: int = BLOCO_ODONTO) -> Iterator[pd.DataFrame]:
+    """Versão em streaming de processar_odonto: entrega DataFrames de até `tamanho` registros à medida
+    que as páginas são lidas. Cada bloco vem ordenado internamente, não em relação aos demais."""
+    bloco, total = [], 0
+    for d in iterar_odonto(iterar_textos(pdf_path)):
+        bloco.append(d)
+        if len(bloco) >= tamanho:
+            total += len(bloco)
+            yield montar_df_odonto(bloco)
+            bloco = []
+    if bloco:
+        total += len(bloco)
+        yield montar_df_odonto(bloco)
+    if not total:
+        raise ValueError("❌ Nenhum dado encontrado no PDF Odonto.")
+
+CAMPOS_ODONTO = {
+    "num": "N° Beneficiário", "nome": "Nome", "matricula": "Matrícula", "cpf": "CPF", "plano": "Plano",
+    "tp": "Tp", "id": "Id", "dependencia": "Dependência", "dt_inclusao": "Dt Inclusão",
+    "rubrica": "Rubrica", "valor": "Valor", "valor_total": "Valor Total", "iof": "IOF",
+}
+
+def montar_df_odonto(registros: list[dict]) -> pd.DataFrame:
+    return juntar_blocos_odonto([montar_bloco_odonto(registros)])
+
+def montar_bloco_odonto(registros: list[dict]) -> pd.DataFrame:
+    """DataFrame de um trecho de registros, na ordem do documento (juntar_blocos_odonto ordena o todo)."""
+    if not registros:
+        return pd.DataFrame()
+
+    cols = {nome: list(map(itemgetter(campo), registros)) for campo, nome in CAMPOS_ODONTO.items()}
+    cols["Dt Inclusão"] = pd.to_datetime(cols["Dt Inclusão"], format="%d/%m/%Y").date
+    cols["Valor"] = brl_para_float(cols["Valor"])
+    cols["Valor Total"] = brl_para_float(cols["Valor Total"])
+    cols["IOF"] = np.nan_to_num(brl_para_float(cols["IOF"]), nan=0.0)
+    cols["Tp"] = pd.Categorical.from_codes([int(tp == "D") for tp in cols["Tp"]], dtype=TP_ODONTO)
+    cols["Dependência"] = [dep or "Titular" for dep in cols["Dependência"]]
+
+    return montar_df(cols, SCHEMA_ODONTO)
+
+def juntar_blocos_odonto(blocos: list[pd.DataFrame]) -> pd.DataFrame:
+    blocos = [b for b in blocos if not b.empty]
+    if not blocos:
+        return pd.DataFrame()
+    return juntar_blocos(blocos, SCHEMA_ODONTO).sort_values("N° Beneficiário", kind="stable")
+
+# ---------------------- MEMÓRIA LIMITADA ----------------------------
+# Com um teto de memória, a fatura é lida página a página, sem a lista de textos do documento: cada
+# página é liberada logo depois de lida, o PDF é reaberto a cada PAGINAS_POR_ABERTURA páginas (o
+# pdfminer guarda todo objeto já lido até o documento ser fechado) e os registros casados viram
+# DataFrames tipados de até REGISTROS_POR_BLOCO linhas, guardados em disco até o fim. Só o DataFrame
+# final, já nos tipos do schema, fica inteiro em memória. Se a memória medida passa de FRACAO_TETO do
+# teto, o trecho e o bloco em curso terminam antes; os mínimos evitam reabrir a cada página quando o
+# processo não devolve ao sistema a memória já liberada.
+PAGINAS_POR_ABERTURA = 500
+PAGINAS_MINIMAS_ABERTURA = 50
+REGISTROS_POR_BLOCO = 5000
+REGISTROS_MINIMOS_BLOCO = 500
+FRACAO_TETO = 0.8           # o restante do teto fica para juntar os blocos no fim
+INTERVALO_MEDICAO = 0.05    # segundos entre duas leituras da memória do processo
+
+class TetoMemoria:
+    """Memória residente medida entre páginas (no máximo a cada INTERVALO_MEDICAO) e o pico observado.
+    Onde a memória do processo não pode ser lida, só os tamanhos fixos de trecho e bloco valem."""
+    def __init__(self, memoria_mb: float):
+        self.teto = memoria_mb
+        self.pico = memoria_atual_mb()
+        self.acima = False
+        self.proxima = 0.0
+
+    def estourou(self) -> bool:
+        agora = time.perf_counter()
+        if agora >= self.proxima:
+            self.proxima = agora + INTERVALO_MEDICAO
+            atual = memoria_atual_mb()
+            if atual is not None:
+                self.pico = max(self.pico or 0.0, atual)
+                self.acima = atual > self.teto * FRACAO_TETO
+        return self.acima
+
+    def registrar(self) -> None:
+        self.proxima = 0.0
+        self.estourou()
+        anotar("memoria.teto_mb", self.teto)
+        anotar("memoria.pico_mb", self.pico)
+
+class BlocosEmDisco:
+    """DataFrames guardados em uma pasta temporária (pickle: só este processo os lê de volta) até o fim."""
+    def __init__(self):
+        self.pasta = tempfile.TemporaryDirectory(prefix="igarape_blocos_")
+        self.caminhos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.pasta.cleanup()
+
+    def __len__(self) -> int:
+        return len(self.caminhos)
+
+    def guardar(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        caminho = os.path.join(self.pasta.name, f"{len(self.caminhos):06d}.pkl")
+        df.to_pickle(caminho)
+        self.caminhos.append(caminho)
+        contar("memoria.blocos_em_disco")
+        contar("memoria.bytes_em_disco", os.path.getsize(caminho))
+
+    def ler(self) -> list[pd.DataFrame]:
+        return [pd.read_pickle(caminho) for caminho in self.caminhos]
+
+def iterar_paginas_em_trechos(pdf_path: str, ler_pagina, progresso: Progresso | None, extrator: str,
+                              teto: TetoMemoria) -> Iterator:
+    """Como iterar_paginas, reabrindo o PDF a cada trecho para descartar o que a biblioteca guardou dele."""
+    pdf = abrir_pdf(pdf_path, extrator)
+    try:
+        total = len(pdf.pages)
+        inicio = 0
+        for i in range(total):
+            lidas = i - inicio
+            if lidas >= PAGINAS_POR_ABERTURA or (lidas >= PAGINAS_MINIMAS_ABERTURA and teto.estourou()):
+                pdf.close()
+                gc.collect()
+                pdf = abrir_pdf(pdf_path, extrator)
+                inicio = i
+                contar("memoria.reaberturas")
+            pg = pdf.pages[i]
+            with etapa("extracao"):
+                pagina = ler_pagina(pg)
+                liberar_pagina(pg)
+            contar("paginas")
+            if pagina is None:
+                contar("paginas_ignoradas")
+            yield pagina
+            if progresso:
+                progresso(i + 1, total)
+    finally:
+        pdf.close()
+
+def processar_limitado(pdf_path: str, tipo: str, memoria_mb: float, progresso: Progresso | None = None,
+                       extrator: str = EXTRATOR_REFERENCIA, textos: Iterable[str | None] | None = None,
+                       layout: str | None = None) -> pd.DataFrame:
+    """Mesmo resultado de processar_saude/processar_odonto (motor 'texto', serial), mantendo a memória
+    perto de `memoria_mb`. Com `textos` (ex.: os do cache) o PDF não é aberto."""
+    teto = TetoMemoria(memoria_mb)
+    if textos is None:
+        ler_pagina = (LEITURA_TEXTO_SAUDE if tipo == "saude" else LEITURA_TEXTO)[extrator]
+        textos = iterar_paginas_em_trechos(pdf_path, ler_pagina, progresso, extrator, teto)
+    with BlocosEmDisco() as blocos:
+        if tipo == "saude":
+            df = _saude_em_blocos(textos, layout, blocos, teto)
+        else:
+            df = _odonto_em_blocos(textos, layout, blocos, teto)
+    teto.registrar()
+    return df
+
+def _bloco_cheio(linhas: int, teto: TetoMemoria) -> bool:
+    return linhas >= REGISTROS_POR_BLOCO or (linhas >= REGISTROS_MINIMOS_BLOCO and teto.estourou())
+
+def _saude_em_blocos(textos: Iterable[str | None], layout: str | None, blocos: BlocosEmDisco,
+                     teto: TetoMemoria) -> pd.DataFrame:
+    casador = CasadorSaude(layout)
+    for n, txt in enumerate(textos, 1):
+        with etapa("casamento"):
+            casador.pagina(n, txt)
+        if _bloco_cheio(casador.pendentes(), teto):
+            with etapa("montagem"):
+                blocos.guardar(montar_bloco_saude(*casador.retirar()))
+    with etapa("montagem"):
+        blocos.guardar(montar_bloco_saude(*casador.finalizar()))
+        return juntar_blocos_saude(blocos.ler())
+
+def _odonto_em_blocos(textos: Iterable[str], layout: str | None, blocos: BlocosEmDisco,
+                      teto: TetoMemoria) -> pd.DataFrame:
+    registros = []
+    for d in iterar_odonto(textos, layout):
+        registros.append(d)
+        if _bloco_cheio(len(registros), teto):
+            _guardar_registros_odonto(registros, blocos)
+            registros = []
+    _guardar_registros_odonto(registros, blocos)
+    if not blocos:
+        raise ValueError("❌ Nenhum dado encontrado no PDF Odonto.")
+    with etapa("montagem"):
+        return juntar_blocos_odonto(blocos.ler())
+
+def _guardar_registros_odonto(registros: list[dict], blocos: BlocosEmDisco) -> None:
+    contar("odonto.RE_IOF", sum(d["iof"] is not None for d in registros))
+    with etapa("montagem"):
+        blocos.guardar(montar_bloco_odonto(registros))
+
+# ---------------------- CACHE DE EXTRAÇÃO ----------------------------
+VERSAO_PARSER = "5"     # incrementar quando a lógica (e não só os regex) de montagem mudar
+
+def versoes_textos(extrator: str = EXTRATOR_REFERENCIA) -> tuple[str, str]:
+    """Versões no cache do texto completo e do texto da saúde com triagem. Neste, as páginas descartadas
+    ficam vazias, então ele não serve para o odonto."""
+    completo = versao_extrator(extrator)
+    return completo, f"{completo}+triagem-saude-{VERSAO_TRIAGEM}"
+
+VERSAO_EXTRATOR, VERSAO_EXTRATOR_TRIAGEM = versoes_textos(EXTRATOR_REFERENCIA)
+ASSINATURA_REGEX = {
+    "saude": assinatura(VERSAO_PARSER, RE_HEADER_SAUDE, RE_HEADER_SAUDE_ALT, RE_VALS_SAUDE,
+                        RE_TOTAL_FAMILIA, *PADROES_TABELA_SEGURO),
+    "odonto": assinatura(VERSAO_PARSER, RE_ODONTO_SEGURO, RE_ODONTO, RE_IOF, RE_JUNTA_CPF),
+}
+ASSINATURA_PALAVRAS = {
+    "saude": assinatura(VERSAO_PARSER, "palavras", VERSAO_MOTOR, ROTULOS_COLUNAS_SAUDE, ROTULOS_VALORES_SAUDE),
+    "odonto": assinatura(VERSAO_PARSER, "palavras", VERSAO_MOTOR, RE_CPF, RE_DATA, RE_VALOR),
+}
+ASSINATURAS = {"texto": ASSINATURA_REGEX, "palavras": ASSINATURA_PALAVRAS}
+PROCESSADORES_TEXTO = {"saude": processar_saude_textos, "odonto": processar_odonto_textos}
+
+def assinatura_df(tipo: str, motor: str, extrator: str = EXTRATOR_REFERENCIA) -> str:
+    """Chave do DataFrame no cache: o do pdfplumber mantém a chave de antes; o de outro extrator tem a sua."""
+    if motor == "palavras" or extrator == EXTRATOR_REFERENCIA:
+        return ASSINATURAS[motor][tipo]
+    return assinatura(ASSINATURAS[motor][tipo], versao_extrator(extrator))
+
+def processar_fatura(pdf_path: str, tipo: str, processos: int = 1, cache: CacheExtracao | None = None,
+                     progresso: Progresso | None = None, motor: str | None = None,
+                     contrato: str | None = None, extrator: str | None = None,
+                     memoria_mb: float | None = None) -> pd.DataFrame:
+    """Processa uma fatura de saúde ou odonto, reaproveitando o cache quando o mesmo PDF já foi lido.
+    `motor` escolhe a leitura ('texto' ou 'palavras'); o padrão de cada layout está em MOTOR_PADRAO.
+    `extrator` escolhe a biblioteca do motor 'texto' (leitores_pdf.EXTRATORES); o padrão está em EXTRATOR_PADRAO.
+    Com `contrato` e cache, o layout identificado fica guardado e é o primeiro a ser tentado na próxima
+    fatura do mesmo contrato. Com `memoria_mb` a leitura é serial e em trechos (processar_limitado) e o
+    texto do documento inteiro não vai para o cache."""
+    motor = motor or MOTOR_PADRAO[tipo]
+    if memoria_mb and motor == "palavras":
+        raise ValueError("O modo de memória limitada usa o motor 'texto'.")
+    extrator = EXTRATOR_REFERENCIA if motor == "palavras" else extrator or EXTRATOR_PADRAO[tipo]
+    anotar("tipo", tipo)
+    anotar("motor", motor)
+    anotar("extrator", extrator)
+    processar = processar_saude if tipo == "saude" else processar_odonto
+    if cache is None:
+        anotar("cache", "desativado")
+        if memoria_mb:
+            return processar_limitado(pdf_path, tipo, memoria_mb, progresso, extrator)
+        return processar(pdf_path, processos, progresso, motor, extrator=extrator)
+
+    chave_df = assinatura_df(tipo, motor, extrator)
+    with etapa("cache"):
+        hash_pdf = cache.hash_pdf(pdf_path)
+        df = cache.obter_df(hash_pdf, tipo, chave_df)
+    if df is not None:
+        anotar("cache", "dataframe")
+        if progresso:
+            progresso(1, 1)
+        return df
+
+    if motor == "palavras":
+        # o cache de texto é do extract_text; as palavras com posição não ficam guardadas
+        anotar("cache", "nenhum")
+        df = processar(pdf_path, processos, progresso, motor)
+        if not df.empty:
+            with etapa("cache"):
+                cache.guardar_df(hash_pdf, tipo, chave_df, df)
+        return df
+
+    # o texto completo serve aos dois tipos; o da saúde com triagem, só à saúde
+    completo, triagem = versoes_textos(extrator)
+    versao = triagem if tipo == "saude" else completo
+    with etapa("cache"):
+        textos = cache.obter_textos(hash_pdf, completo)
+        if textos is None and versao != completo:
+            textos = cache.obter_textos(hash_pdf, versao)
+    if textos is None and memoria_mb:
+        anotar("cache", "nenhum")
+        df = processar_limitado(pdf_path, tipo, memoria_mb, progresso, extrator)
+        if not df.empty:
+            with etapa("cache"):
+                cache.guardar_df(hash_pdf, tipo, chave_df, df)
+        return df
+    if textos is None:
+        anotar("cache", "nenhum")
+        ler_pagina = (LEITURA_TEXTO_SAUDE if tipo == "saude" else LEITURA_TEXTO)[extrator]
+        if extrator == EXTRATOR_REFERENCIA:
+            textos = extrair_textos_incremental(pdf_path, cache, processos, progresso, ler_pagina)
+        else:
+            # o hash de conteúdo das páginas vem do pdfminer e custaria tanto quanto o próprio PDFium
+            textos = extrair_paginas(pdf_path, processos, progresso, ler_pagina, extrator=extrator)
+        with etapa("cache"):
+            cache.guardar_textos(hash_pdf, versao, [t or "" for t in textos])
+    else:
+        anotar("cache", "texto")
+        contar("paginas", len(textos))
+        if progresso:
+            progresso(len(textos), len(textos))
+
+    with etapa("cache"):
+        conhecido = cache.obter_layout(contrato, tipo, ASSINATURAS[motor][tipo]) if contrato else None
+    with etapa("casamento"):
+        layout = identificar_layout_documento(tipo, textos, conhecido)
+    if layout:
+        anotar("layout", layout)
+        anotar("layout.origem", "contrato" if layout == conhecido else "identificado")
+    if memoria_mb:
+        df = processar_limitado(pdf_path, tipo, memoria_mb, textos=textos, layout=layout)
+    else:
+        df = PROCESSADORES_TEXTO[tipo](textos, layout)
+    if not df.empty:
+        with etapa("cache"):
+            cache.guardar_df(hash_pdf, tipo, chave_df, df)
+            if contrato and layout and layout != conhecido:
+                cache.guardar_layout(contrato, tipo, ASSINATURAS[motor][tipo], layout)
+    return df
+
+# ---------------------- FIDELIDADE ENTRE EXTRATORES ----------------------------
+# Antes de trocar o extrator de um layout, a referência (pdfplumber) e o candidato leem as mesmas
+# páginas e os registros montados são comparados um a um. A amostra é feita de trechos de páginas em
+# sequência, para que a família ou o nome que continua na página seguinte case como no documento inteiro.
+PAGINAS_FIDELIDADE = 40
+TRECHOS_FIDELIDADE = 4
+EXEMPLOS_FIDELIDADE = 5
+
+def paginas_amostra(total: int, paginas: int = PAGINAS_FIDELIDADE, trechos: int = TRECHOS_FIDELIDADE) -> list[int]:
+    """Índices de até `paginas` páginas, em `trechos` sequências espalhadas do início ao fim do documento."""
+    if total <= paginas:
+        return list(range(total))
+    tamanho = -(-paginas // trechos)
+    inicios = [round(k * (total - tamanho) / max(1, trechos - 1)) for k in range(trechos)]
+    return sorted({i for inicio in inicios for i in range(inicio, inicio + tamanho)})[:paginas]
+
+def _montar_amostra(tipo: str, textos: list[str]) -> pd.DataFrame:
+    if tipo == "saude":
+        return processar_saude_textos(textos)
+    registros = list(iterar_odonto(textos))
+    return montar_df_odonto(registros) if registros else pd.DataFrame()
+
+def _registros(df: pd.DataFrame) -> Counter:
+    """Multiconjunto das linhas (NaN vira None, para que duas ausências sejam iguais)."""
+    valores = df.astype(object).where(df.notna(), None)
+    return Counter(valores.itertuples(index=False, name=None))
+
+def conferir_fidelidade(pdf_path: str, tipo: str, extrator: str = "pdfium",
+                        paginas: int = PAGINAS_FIDELIDADE) -> dict:
+    """Extrai a amostra de páginas com o pdfplumber e com `extrator`, monta os registros com o motor de
+    texto e compara. 'fiel' exige registros na amostra e nenhum registro a mais ou a menos em nenhum dos
+    dois; textos diferentes (espaços, ordem de linhas) só importam se mudarem os registros."""
+    with abrir_pdf(pdf_path, extrator) as pdf:
+        total = len(pdf.pages)
+    indices = paginas_amostra(total, paginas)
+    nomes = [EXTRATOR_REFERENCIA, extrator]
+    textos, segundos, dfs = {}, {}, {}
+    for nome in nomes:
+        inicio = time.perf_counter()
+        textos[nome] = extrair_paginas(pdf_path, ler_pagina=LEITURA_TEXTO[nome], indices=indices, extrator=nome)
+        segundos[nome] = time.perf_counter() - inicio
+        dfs[nome] = _montar_amostra(tipo, textos[nome])
+
+    referencia, candidato = _registros(dfs[EXTRATOR_REFERENCIA]), _registros(dfs[extrator])
+    sobras = {EXTRATOR_REFERENCIA: referencia - candidato, extrator: candidato - referencia}
+    colunas = list(max(dfs.values(), key=len).columns)
+    return {
+        "arquivo": os.path.basename(pdf_path),
+        "tipo": tipo,
+        "layout": identificar_layout_documento(tipo, textos[EXTRATOR_REFERENCIA]),
+        "extrator": extrator,
+        "paginas": len(indices),
+        "paginas_documento": total,
+        "textos_iguais": sum(a == b for a, b in zip(textos[EXTRATOR_REFERENCIA], textos[extrator])),
+        "registros": {nome: len(dfs[nome]) for nome in nomes},
+        # registros que só um dos dois extratores produziu, com alguns exemplos para conferir à mão
+        "so_no_extrator": {nome: sum(sobras[nome].values()) for nome in nomes},
+        "exemplos": {nome: [dict(zip(colunas, r)) for r in itertools.islice(sobras[nome].elements(),
+                                                                             EXEMPLOS_FIDELIDADE)]
+                     for nome in nomes},
+        "segundos": {nome: round(segundos[nome], 3) for nome in nomes},
+        "fiel": bool(referencia) and not sobras[EXTRATOR_REFERENCIA] and not sobras[extrator],
+    }
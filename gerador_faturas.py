@@ -0,0 +1,156 @@
+"""
+Gerador de faturas sintéticas Porto Seguro Saúde/Odonto em PDF, para benchmarks e testes de carga.
+
+As linhas seguem os layouts esperados pelos regex de extrator_faturas (cabeçalho 'Seguro Dep' em cada
+página de saúde, TOTAL. por família, nome quebrado antes do CPF e 'Cobrança de IOF' no odonto). As
+páginas têm um número fixo de linhas, então famílias ficam divididas entre páginas naturalmente.
+O PDF é escrito direto (Helvetica, WinAnsi), sem depender de bibliotecas de geração de PDF.
+
+    python gerador_faturas.py saude 5000 faturas/sintetica_saude.pdf --dependentes 4
+"""
+import sys
+import zlib
+import random
+import argparse
+
+LINHAS_POR_PAGINA = 45
+CABECALHO_SAUDE = "Seguro Dep Nome Reg.Func. Idade Parentesco"
+CABECALHO_ODONTO = "Relação de Beneficiários - Porto Seguro Odonto"
+NOMES = ["JOAO", "MARIA", "ANA", "PEDRO", "LUCAS", "JULIANA", "CARLOS", "FERNANDA", "JOSÉ", "CONCEIÇÃO"]
+SOBRENOMES = ["SILVA", "SOUZA", "LIMA", "OLIVEIRA", "PEREIRA", "COSTA", "ARAÚJO", "RIBEIRO"]
+PLANOS_SAUDE = ["PLANO EMPRESARIAL APTO", "PLANO EMPRESARIAL ENFERMARIA", "PORTO 400 APTO"]
+PLANOS_ODONTO = ["PLANO ODONTO DOC", "PLANO ODONTO DOC 2", "ODONTO PLUS"]
+
+def br(valor: float) -> str:
+    """1234.5 -> '1.234,50'"""
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def _nome(r: random.Random) -> str:
+    return f"{r.choice(NOMES)} {r.choice(SOBRENOMES)} {r.choice(SOBRENOMES)}"
+
+# ---------------------- LINHAS DAS FATURAS ----------------------------
+def linhas_saude(beneficiarios: int, dependentes: int = 3, semente: int = 1) -> list[str]:
+    """Famílias com 0 a `dependentes` dependentes até somar `beneficiarios` vidas."""
+    r = random.Random(semente)
+    linhas, vidas, familia = [], 0, 0
+    while vidas < beneficiarios:
+        seguro = f"{10000000 + familia:08d}"
+        familia += 1
+        total_familia = 0.0
+        for dep in range(min(r.randint(0, dependentes), beneficiarios - vidas - 1) + 1):
+            if dep == 0:
+                linhas.append(f"{seguro} {dep:02d} {_nome(r)} {r.randint(1000, 999999)} {r.randint(18, 70)} Titular")
+            else:
+                parentesco = r.choice(["Conjuge", "Filho", "Filha"])
+                linhas.append(f"{dep:02d} {_nome(r)} {r.randint(0, 90)} {parentesco}")
+            linhas.append(r.choice(PLANOS_SAUDE))
+            premio = r.randint(10_000, 300_000) / 100
+            total_dep = premio
+            linhas.append(f"Prêmio Base {br(premio)}")
+            if r.random() < 0.5:
+                consultas = r.randint(100, 9_000) / 100
+                total_dep += consultas
+                linhas.append(f"CONSULTAS {br(consultas)}")
+            if r.random() < 0.3:
+                linhas.append(f"EXAMES {br(r.randint(100, 9_000) / 100)}")
+            if r.random() < 0.3:
+                linhas.append(f"Total Co-Part. R$ {br(r.randint(100, 9_000) / 100)}")
+            iof = round(total_dep * 0.0238, 2)
+            total_dep += iof
+            linhas.append(f"IOF {br(iof)}")
+            linhas.append(f"TOTAL DO DEP. {br(total_dep)}")
+            total_familia += total_dep
+            vidas += 1
+        linhas.append(f"TOTAL. {br(total_familia)}")
+    return linhas
+
+def linhas_odonto(beneficiarios: int, dependentes: int = 3, semente: int = 2) -> list[str]:
+    r = random.Random(semente)
+    linhas, num = [], 0
+    while num < beneficiarios:
+        matricula = r.randint(1000, 99999)
+        plano = r.choice(PLANOS_ODONTO)
+        for dep in range(min(r.randint(0, dependentes), beneficiarios - num - 1) + 1):
+            num += 1
+            tp = "T" if dep == 0 else "D"
+            dependencia = "" if dep == 0 else r.choice(["Conjuge ", "Filho ", "Filha "])
+            cpf = f"{r.randint(100, 999)}.{r.randint(100, 999)}.{r.randint(100, 999)}-{r.randint(10, 99)}"
+            valor = br(r.randint(1_000, 9_000) / 100)
+            total = f" {br(r.randint(9_000, 20_000) / 100)}" if tp == "T" else ""
+            resto = f"{cpf} {plano} {tp} {5000 + num} {dependencia}01/02/2020 Mensalidade Odonto {valor}{total}"
+            if num % 7 == 5:
+                # nome quebrado antes do CPF, como acontece nas faturas reais com nomes longos
+                linhas.append(f"{num} {_nome(r)}")
+                linhas.append(f"{matricula} {resto}")
+            else:
+                linhas.append(f"{num} {_nome(r)} {matricula} {resto}")
+            if r.random() < 0.4:
+                linhas.append(f"Cobrança de IOF {br(r.randint(10, 99) / 100)}")
+    return linhas
+
+# ---------------------- ESCRITA DO PDF ----------------------------
+def _texto_pdf(linha: str) -> bytes:
+    return (linha.encode("cp1252", "replace")
+            .replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)"))
+
+def escrever_pdf(caminho: str, linhas: list[str], cabecalho: str | None = None,
+                 linhas_por_pagina: int = LINHAS_POR_PAGINA, capa: str | None = "FATURA PORTO SEGURO - CAPA") -> int:
+    """Grava as linhas em páginas A4 (uma capa opcional primeiro). Devolve o número de páginas."""
+    paginas = [[capa]] if capa else []
+    for i in range(0, len(linhas), linhas_por_pagina):
+        paginas.append(([cabecalho] if cabecalho else []) + linhas[i:i + linhas_por_pagina])
+
+    # objetos: 1 catálogo, 2 árvore de páginas (gravada por último), 3 fonte, depois página + conteúdo
+    offsets = {}
+    with open(caminho, "wb") as f:
+        def objeto(numero: int, corpo: bytes):
+            offsets[numero] = f.tell()
+            f.write(b"%d 0 obj\n" % numero + corpo + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        objeto(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        objeto(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        kids = []
+        for n, pagina in enumerate(paginas):
+            num_pagina, num_conteudo = 4 + 2 * n, 5 + 2 * n
+            conteudo = b"BT /F1 8 Tf 12 TL 30 800 Td " + b" T* ".join(b"(%s) Tj" % _texto_pdf(l) for l in pagina) + b" ET"
+            conteudo = zlib.compress(conteudo)
+            objeto(num_pagina, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                               b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % num_conteudo)
+            objeto(num_conteudo, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(conteudo)
+                   + conteudo + b"\nendstream")
+            kids.append(b"%d 0 R" % num_pagina)
+        objeto(2, b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % len(kids))
+
+        total = max(offsets) + 1
+        inicio_xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % total)
+        for numero in range(1, total):
+            f.write(b"%010d 00000 n \n" % offsets[numero])
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (total, inicio_xref))
+    return len(paginas)
+
+def gerar_fatura(tipo: str, beneficiarios: int, caminho: str, dependentes: int = 3, semente: int = 1,
+                 linhas_por_pagina: int = LINHAS_POR_PAGINA) -> int:
+    if tipo == "saude":
+        return escrever_pdf(caminho, linhas_saude(beneficiarios, dependentes, semente), CABECALHO_SAUDE,
+                            linhas_por_pagina)
+    return escrever_pdf(caminho, linhas_odonto(beneficiarios, dependentes, semente), CABECALHO_ODONTO,
+                        linhas_por_pagina)
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera uma fatura sintética Porto Seguro em PDF.")
+    parser.add_argument("tipo", choices=["saude", "odonto"])
+    parser.add_argument("beneficiarios", type=int)
+    parser.add_argument("saida")
+    parser.add_argument("--dependentes", type=int, default=3, help="Máximo de dependentes por titular (padrão: 3).")
+    parser.add_argument("--linhas-por-pagina", type=int, default=LINHAS_POR_PAGINA)
+    parser.add_argument("--semente", type=int, default=1)
+    args = parser.parse_args(argv)
+    paginas = gerar_fatura(args.tipo, args.beneficiarios, args.saida, args.dependentes, args.semente,
+                           args.linhas_por_pagina)
+    print(f"{args.saida}: {args.beneficiarios} beneficiários em {paginas} páginas")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""
+Índice dos documentos de RH digitalizados (RG, CPF, comprovantes...), em SQLite local.
+
+Cada documento passa pelo OCR (motor_ocr) uma vez: o texto de cada página fica numa tabela de busca
+textual (FTS5) e os campos extraídos (CPF, RG, nome, data de nascimento...) ficam numa tabela
+indexada pelo CPF e pelo RG só com dígitos. Reindexar uma pasta só lê os arquivos novos ou alterados
+(pelo hash do conteúdo); os documentos de um funcionário saem do índice sem OCR.
+
+    python indice_documentos.py indexar admissoes/2025-06/ --processos 4
+    python indice_documentos.py cpf 123.456.789-00
+    python indice_documentos.py buscar "comprovante residencia" --saida achados.xlsx
+"""
+import os
+import re
+import sys
+import glob
+import time
+import sqlite3
+import hashlib
+import argparse
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+INDICE_PADRAO = os.environ.get("IGARAPE_INDICE_DOCUMENTOS",
+                               os.path.join(os.path.expanduser("~"), ".igarape_digital", "documentos.sqlite3"))
+EXTENSOES = (".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+CHAVES = ["CPF", "RG"]
+
+# ---------------------- CAMPOS ----------------------------
+# campo: (rótulo que precede o valor, valor). O texto chega em maiúsculas e numa linha só.
+# Os números não podem estar colados a outros dígitos: sem isso o RG casava dentro do CPF
+# ('23.456.789-0' em '123.456.789-00') e o documento ficava indexado por um RG que não existe.
+CAMPOS = {
+    "CPF": ("", r"(?<![\d.])\d{3}\.\d{3}\.\d{3}-\d{2}(?!\d)"),
+    "RG": ("", r"(?<![\d.])\d{1,2}\.\d{3}\.\d{3}-[\dX](?![\dX])"),
+    "Data Nascimento": ("", r"(?<!\d)\d{2}/\d{2}/\d{4}(?!\d)"),
+    "Nome": (r"NOME[:\-]?\s*", r"[A-ZÀ-Ú\s]+"),
+    "Órgão Expedidor": (r"ÓRGÃO EXPEDIDOR[:\-]?\s*", r"[A-ZÀ-Ú\s]+"),
+    "Filiação": (r"FILIAÇÃO[:\-]?\s*", r"[A-ZÀ-Ú\s]+"),
+}
+# Um regex só para todos os campos, percorrido uma vez por página. Cada alternativa é um lookahead:
+# o casamento não consome texto, então um campo pode começar dentro do valor de outro (o nome pode
+# engolir o rótulo seguinte), exatamente como se cada padrão fosse buscado à parte. O primeiro
+# caractere (dígito ou inicial de um rótulo) descarta de cara as posições em que nada pode começar.
+_GRUPOS = {f"c{i}": campo for i, campo in enumerate(CAMPOS)}
+_INICIAIS = "".join(sorted({rotulo[0] if rotulo else r"\d" for rotulo, _ in CAMPOS.values()}))
+RE_CAMPOS = re.compile(f"(?=[{_INICIAIS}])(?:"
+                       + "|".join(f"(?={rotulo}(?P<c{i}>{valor}))" for i, (rotulo, valor) in enumerate(CAMPOS.values()))
+                       + ")")
+
+def extrair_campos(texto_ocr: str) -> dict[str, str]:
+    """Primeira ocorrência de cada campo no texto de uma página, na ordem de CAMPOS."""
+    texto = texto_ocr.upper().replace("\n", " ")
+    achados = {}
+    for m in RE_CAMPOS.finditer(texto):
+        campo = _GRUPOS[m.lastgroup]
+        if campo not in achados:
+            achados[campo] = m.group(m.lastgroup).strip()
+            if len(achados) == len(CAMPOS):
+                break
+    return {campo: achados[campo] for campo in CAMPOS if campo in achados}
+
+def normalizar_chave(valor: str | None) -> str | None:
+    """CPF e RG só com dígitos (e o X do RG): '123.456.789-00' e '12345678900' são a mesma chave."""
+    if not valor:
+        return None
+    return re.sub(r"[^0-9X]", "", str(valor).upper()) or None
+
+# ---------------------- ÍNDICE ----------------------------
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS documentos (
+        id INTEGER PRIMARY KEY, arquivo TEXT UNIQUE, hash TEXT, paginas INTEGER, segundos REAL,
+        indexado_em REAL);
+    CREATE TABLE IF NOT EXISTS paginas (
+        id INTEGER PRIMARY KEY, documento_id INTEGER REFERENCES documentos (id), pagina INTEGER);
+    CREATE TABLE IF NOT EXISTS campos (
+        documento_id INTEGER REFERENCES documentos (id), pagina INTEGER, campo TEXT, valor TEXT, chave TEXT);
+    CREATE INDEX IF NOT EXISTS ix_documentos_hash ON documentos (hash);
+    CREATE INDEX IF NOT EXISTS ix_paginas_documento ON paginas (documento_id);
+    CREATE INDEX IF NOT EXISTS ix_campos_documento ON campos (documento_id);
+    CREATE INDEX IF NOT EXISTS ix_campos_chave ON campos (campo, chave);
+"""
+# texto das páginas (rowid = paginas.id); sem FTS5 no SQLite, a busca cai para LIKE
+ESQUEMA_FTS = "CREATE VIRTUAL TABLE IF NOT EXISTS textos USING fts5(texto, tokenize='unicode61 remove_diacritics 2')"
+ESQUEMA_SEM_FTS = "CREATE TABLE IF NOT EXISTS textos (texto TEXT)"
+
+def hash_arquivo(caminho: str) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for parte in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(parte)
+    return h.hexdigest()
+
+def _consulta_fts(consulta: str) -> str:
+    """Cada termo vira uma frase entre aspas (CPF, datas e pontuação não quebram a sintaxe do FTS5);
+    'termo*' continua buscando por prefixo."""
+    termos = []
+    for termo in consulta.split():
+        prefixo = termo.endswith("*")
+        termo = termo.rstrip("*").replace('"', '""')
+        if termo:
+            termos.append(f'"{termo}"' + ("*" if prefixo else ""))
+    return " ".join(termos)
+
+class IndiceDocumentos:
+    def __init__(self, caminho: str = INDICE_PADRAO):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self.con = sqlite3.connect(caminho, timeout=30)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.executescript(ESQUEMA)
+        try:
+            self.con.execute(ESQUEMA_FTS)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.con.execute(ESQUEMA_SEM_FTS)
+            self.fts = False
+
+    def fechar(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    # ---------------------- CARGA ----------------------------
+    def indexado(self, arquivo: str, hash_conteudo: str) -> bool:
+        """O arquivo já está no índice com este mesmo conteúdo."""
+        return self.con.execute("SELECT 1 FROM documentos WHERE arquivo=? AND hash=?",
+                                (os.path.abspath(arquivo), hash_conteudo)).fetchone() is not None
+
+    def textos_por_hash(self, hash_conteudo: str) -> list[str] | None:
+        """Texto das páginas de um documento idêntico já indexado (cópia do mesmo arquivo em outra pasta)."""
+        row = self.con.execute("SELECT id FROM documentos WHERE hash=?", (hash_conteudo,)).fetchone()
+        if not row:
+            return None
+        return [t for t, in self.con.execute("SELECT t.texto FROM paginas p JOIN textos t ON t.rowid = p.id "
+                                             "WHERE p.documento_id=? ORDER BY p.pagina", row)]
+
+    def adicionar(self, arquivo: str, hash_conteudo: str, textos: list[str], segundos: float = 0.0) -> int:
+        """Indexa o texto de cada página e os campos extraídos; reindexar o mesmo arquivo substitui."""
+        arquivo = os.path.abspath(arquivo)
+        with self.con:
+            antigo = self.con.execute("SELECT id FROM documentos WHERE arquivo=?", (arquivo,)).fetchone()
+            if antigo:
+                self._remover(antigo[0])
+            documento_id = self.con.execute(
+                "INSERT INTO documentos (arquivo, hash, paginas, segundos, indexado_em) VALUES (?, ?, ?, ?, ?)",
+                (arquivo, hash_conteudo, len(textos), segundos, time.time())).lastrowid
+            for pagina, texto in enumerate(textos, 1):
+                pagina_id = self.con.execute("INSERT INTO paginas (documento_id, pagina) VALUES (?, ?)",
+                                             (documento_id, pagina)).lastrowid
+                self.con.execute("INSERT INTO textos (rowid, texto) VALUES (?, ?)", (pagina_id, texto))
+                self.con.executemany(
+                    "INSERT INTO campos VALUES (?, ?, ?, ?, ?)",
+                    ((documento_id, pagina, campo, valor, normalizar_chave(valor) if campo in CHAVES else None)
+                     for campo, valor in extrair_campos(texto).items()))
+        return documento_id
+
+    def _remover(self, documento_id: int) -> None:
+        self.con.execute("DELETE FROM textos WHERE rowid IN (SELECT id FROM paginas WHERE documento_id=?)",
+                         (documento_id,))
+        for tabela in ("paginas", "campos"):
+            self.con.execute(f"DELETE FROM {tabela} WHERE documento_id=?", (documento_id,))
+        self.con.execute("DELETE FROM documentos WHERE id=?", (documento_id,))
+
+    def remover_ausentes(self) -> int:
+        """Tira do índice os documentos cujo arquivo não existe mais."""
+        ausentes = [(i,) for i, arquivo in self.con.execute("SELECT id, arquivo FROM documentos")
+                    if not os.path.exists(arquivo)]
+        with self.con:
+            for documento_id, in ausentes:
+                self._remover(documento_id)
+        return len(ausentes)
+
+    # ---------------------- CONSULTAS ----------------------------
+    def documentos(self) -> pd.DataFrame:
+        return pd.read_sql_query('SELECT arquivo AS "Arquivo", paginas AS "Páginas", hash AS "Hash", '
+                                 'segundos AS "Segundos OCR" FROM documentos ORDER BY arquivo', self.con)
+
+    def campos(self, documento_ids: list[int] | None = None) -> pd.DataFrame:
+        """Campos extraídos, uma linha por página (Arquivo, Página, CPF, RG, Nome...)."""
+        onde = "" if documento_ids is None else f"WHERE c.documento_id IN ({', '.join('?' * len(documento_ids))})"
+        longo = pd.read_sql_query(f"""
+            SELECT d.arquivo AS "Arquivo", c.pagina AS "Página", c.campo, c.valor
+            FROM campos c JOIN documentos d ON d.id = c.documento_id {onde}""",
+                                  self.con, params=documento_ids or [])
+        if longo.empty:
+            # sem documentos (ou nenhum com campos) a tabela sai vazia, com as colunas de sempre
+            return pd.DataFrame(columns=["Arquivo", "Página", *CAMPOS])
+        largo = longo.pivot_table(index=["Arquivo", "Página"], columns="campo", values="valor", aggfunc="first")
+        return (largo.reindex(columns=[c for c in CAMPOS if c in largo.columns]).reset_index()
+                .rename_axis(columns=None).sort_values(["Arquivo", "Página"], ignore_index=True))
+
+    def campos_da_pasta(self, pasta: str) -> pd.DataFrame:
+        prefixo = os.path.join(os.path.abspath(pasta), "")
+        ids = [i for i, arquivo in self.con.execute("SELECT id, arquivo FROM documentos") if arquivo.startswith(prefixo)]
+        return self.campos(ids)
+
+    def por_chave(self, campo: str, valor: str) -> pd.DataFrame:
+        """Todos os documentos (com os campos de cada página) em que aparece o CPF ou RG informado."""
+        ids = [i for i, in self.con.execute("SELECT DISTINCT documento_id FROM campos WHERE campo=? AND chave=?",
+                                           (campo, normalizar_chave(valor)))]
+        return self.campos(ids)
+
+    def por_cpf(self, cpf: str) -> pd.DataFrame:
+        return self.por_chave("CPF", cpf)
+
+    def por_rg(self, rg: str) -> pd.DataFrame:
+        return self.por_chave("RG", rg)
+
+    def buscar(self, consulta: str, limite: int = 50) -> pd.DataFrame:
+        """Páginas cujo texto contém todos os termos (sem distinção de acentos e maiúsculas no FTS5)."""
+        if self.fts:
+            return pd.read_sql_query("""
+                SELECT d.arquivo AS "Arquivo", p.pagina AS "Página",
+                       snippet(textos, 0, '[', ']', '…', 12) AS "Trecho"
+                FROM textos JOIN paginas p ON p.id = textos.rowid JOIN documentos d ON d.id = p.documento_id
+                WHERE textos MATCH ? ORDER BY rank LIMIT ?""", self.con, params=[_consulta_fts(consulta), limite])
+        termos = consulta.split() or [""]
+        onde = " AND ".join("t.texto LIKE ?" for _ in termos)
+        return pd.read_sql_query(f"""
+            SELECT d.arquivo AS "Arquivo", p.pagina AS "Página", substr(t.texto, 1, 120) AS "Trecho"
+            FROM textos t JOIN paginas p ON p.id = t.rowid JOIN documentos d ON d.id = p.documento_id
+            WHERE {onde} ORDER BY d.arquivo, p.pagina LIMIT ?""", self.con,
+                                 params=[*(f"%{t}%" for t in termos), limite])
+
+# ---------------------- INDEXAÇÃO EM LOTE ----------------------------
+def listar_documentos(entradas: list[str]) -> list[str]:
+    """Expande diretórios, globs e arquivos em uma lista ordenada de PDFs e imagens sem repetição."""
+    encontrados = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatos = glob.glob(os.path.join(entrada, "**", "*"), recursive=True)
+        elif glob.has_magic(entrada):
+            candidatos = glob.glob(entrada, recursive=True)
+        else:
+            candidatos = [entrada]
+        encontrados.extend(c for c in candidatos if c.lower().endswith(EXTENSOES) and os.path.isfile(c))
+    return sorted(set(os.path.abspath(c) for c in encontrados))
+
+def ler_documento(arquivo: str, processos: int = 1, pasta_cache: str | None = None) -> dict:
+    """OCR de todas as páginas de um arquivo; roda em um processo do pool."""
+    from motor_ocr import iterar_ocr
+    from cache_extracao import abrir_cache
+    inicio = time.perf_counter()
+    resultado = {"arquivo": arquivo, "textos": None, "segundos": 0.0, "erro": None}
+    cache = abrir_cache(pasta_cache) if pasta_cache else None
+    try:
+        resultado["textos"] = list(iterar_ocr(arquivo, processos, cache))
+    except Exception as e:
+        resultado["erro"] = str(e)
+    finally:
+        if cache:
+            cache.fechar()
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+def _executar_ocr(arquivos: list[str], processos: int, pasta_cache: str | None):
+    """Gera o resultado de cada arquivo, na ordem em que terminam. Com vários arquivos cada um vai
+    inteiro para um processo; um arquivo sozinho tem as páginas divididas entre os processos."""
+    if processos <= 1 or len(arquivos) <= 1:
+        for arquivo in arquivos:
+            yield ler_documento(arquivo, processos, pasta_cache)
+        return
+    with ProcessPoolExecutor(max_workers=min(processos, len(arquivos))) as executor:
+        futuros = [executor.submit(ler_documento, arquivo, 1, pasta_cache) for arquivo in arquivos]
+        for futuro in as_completed(futuros):
+            yield futuro.result()
+
+def indexar(entradas: list[str], indice: IndiceDocumentos, processos: int = 1, pasta_cache: str | None = None,
+            reindexar: bool = False, progresso=None) -> dict:
+    """Indexa os documentos de pastas/globs/arquivos. Arquivos já indexados com o mesmo conteúdo são
+    pulados, e cópias de um documento já indexado reaproveitam o texto sem OCR.
+    `progresso(feitos, total)` é chamado a cada arquivo."""
+    inicio = time.perf_counter()
+    arquivos = listar_documentos(entradas)
+    resumo = {"arquivos": len(arquivos), "indexados": 0, "pulados": 0, "copias": 0, "paginas": 0, "falhas": []}
+    pendentes, hashes = [], {}
+    for arquivo in arquivos:
+        hashes[arquivo] = hash_arquivo(arquivo)
+        if not reindexar and indice.indexado(arquivo, hashes[arquivo]):
+            resumo["pulados"] += 1
+            continue
+        textos = None if reindexar else indice.textos_por_hash(hashes[arquivo])
+        if textos is not None:
+            indice.adicionar(arquivo, hashes[arquivo], textos)
+            resumo["copias"] += 1
+            continue
+        pendentes.append(arquivo)
+    feitos = len(arquivos) - len(pendentes)
+    if progresso:
+        progresso(feitos, len(arquivos))
+
+    for resultado in _executar_ocr(pendentes, processos, pasta_cache):
+        feitos += 1
+        if resultado["erro"]:
+            resumo["falhas"].append({"arquivo": resultado["arquivo"], "erro": resultado["erro"]})
+        else:
+            indice.adicionar(resultado["arquivo"], hashes[resultado["arquivo"]], resultado["textos"],
+                             resultado["segundos"])
+            resumo["indexados"] += 1
+            resumo["paginas"] += len(resultado["textos"])
+        if progresso:
+            progresso(feitos, len(arquivos))
+    resumo["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resumo
+
+# ---------------------- LINHA DE COMANDO ----------------------------
+def _mostrar(resultado: pd.DataFrame, saida: str | None) -> None:
+    if saida:
+        from escritores import salvar, formato_por_extensao
+        salvar(resultado, saida, formato_por_extensao(saida))
+        print(f"{len(resultado)} linhas gravadas em {saida}")
+    else:
+        with pd.option_context("display.max_rows", 200, "display.width", 200, "display.max_colwidth", 80):
+            print(resultado.to_string(index=False) if len(resultado) else "Nenhum documento.")
+
+def main(argv: list[str] | None = None) -> int:
+    from motor_ocr import PROCESSOS_PADRAO
+    from cache_extracao import PASTA_CACHE_PADRAO
+
+    parser = argparse.ArgumentParser(description="Índice dos documentos de RH digitalizados: OCR em lote, "
+                                                 "consulta por CPF/RG e busca no texto.")
+    parser.add_argument("--indice", default=INDICE_PADRAO, help=f"Arquivo SQLite do índice (padrão: {INDICE_PADRAO}).")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p = comandos.add_parser("indexar", help="Faz o OCR e indexa PDFs/imagens de pastas, globs ou arquivos.")
+    p.add_argument("entradas", nargs="+")
+    p.add_argument("--processos", type=int, default=PROCESSOS_PADRAO)
+    p.add_argument("--cache-dir", default=PASTA_CACHE_PADRAO, help="Cache do texto do OCR por imagem.")
+    p.add_argument("--sem-cache", action="store_true")
+    p.add_argument("--reindexar", action="store_true", help="Refaz o OCR mesmo dos arquivos já indexados.")
+    p.add_argument("--limpar-ausentes", action="store_true", help="Tira do índice os arquivos que não existem mais.")
+
+    for nome, ajuda in (("cpf", "Documentos em que aparece o CPF."), ("rg", "Documentos em que aparece o RG.")):
+        p = comandos.add_parser(nome, help=ajuda)
+        p.add_argument("valor")
+        p.add_argument("--saida", help="Exporta o resultado (.xlsx, .csv, .parquet ou .arrow).")
+    p = comandos.add_parser("buscar", help="Busca textual no OCR de todas as páginas indexadas.")
+    p.add_argument("consulta")
+    p.add_argument("--limite", type=int, default=50)
+    p.add_argument("--saida")
+    p = comandos.add_parser("listar", help="Documentos indexados.")
+    p.add_argument("--saida")
+    args = parser.parse_args(argv)
+
+    with IndiceDocumentos(args.indice) as indice:
+        if args.comando == "indexar":
+            if args.limpar_ausentes:
+                print(f"{indice.remover_ausentes()} documentos ausentes removidos do índice.")
+            resumo = indexar(args.entradas, indice, args.processos, None if args.sem_cache else args.cache_dir,
+                             args.reindexar, progresso=lambda feitos, total: print(f"\r{feitos}/{total} arquivos",
+                                                                                   end="", flush=True))
+            print(f"\n{resumo['indexados']} indexados ({resumo['paginas']} páginas), {resumo['copias']} cópias, "
+                  f"{resumo['pulados']} já indexados, {len(resumo['falhas'])} falhas em {resumo['segundos']:.1f}s")
+            for falha in resumo["falhas"]:
+                print(f"  {os.path.basename(falha['arquivo'])}: {falha['erro']}")
+            return 1 if resumo["falhas"] else 0
+        if args.comando == "cpf":
+            _mostrar(indice.por_cpf(args.valor), args.saida)
+        elif args.comando == "rg":
+            _mostrar(indice.por_rg(args.valor), args.saida)
+        elif args.comando == "buscar":
+            _mostrar(indice.buscar(args.consulta, args.limite), args.saida)
+        else:
+            _mostrar(indice.documentos(), args.saida)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Instrumentação opcional da extração: tempo por etapa, contadores (páginas, casamentos por regex,
+bytes gravados) e anotações (qual regex alternativo foi usado, acerto de cache).
+
+O pipeline chama etapa()/contar()/anotar() sem saber se alguém está medindo: fora de um bloco
+`with medir() as medicao:` as chamadas não fazem nada. A medição ativa fica em uma ContextVar, então
+cada thread (ex.: a fila da interface) mede só o que ela própria executa; o trabalho feito dentro dos
+pools de processos entra pelo tempo que o processo principal espera por ele.
+
+    with medir(ao_evento=print) as medicao:
+        processar_fatura("fatura.pdf", "saude")
+    medicao.salvar_json("execucao.json")
+"""
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+PERFIS = ["cprofile", "pyinstrument"]
+
+class Medicao:
+    """Resultado de uma execução medida. `ao_evento(evento, dados)` recebe, ao vivo, os eventos
+    'etapa' (nome, segundos), 'contador' (nome, incremento, total) e 'anotacao' (chave, valor)."""
+    def __init__(self, ao_evento=None):
+        self.ao_evento = ao_evento
+        self.etapas = {}
+        self.contadores = {}
+        self.anotacoes = {}
+
+    def _avisar(self, evento: str, dados: dict):
+        if self.ao_evento:
+            self.ao_evento(evento, dados)
+
+    def somar_etapa(self, nome: str, segundos: float) -> None:
+        etapa = self.etapas.setdefault(nome, {"segundos": 0.0, "chamadas": 0})
+        etapa["segundos"] += segundos
+        etapa["chamadas"] += 1
+        self._avisar("etapa", {"nome": nome, "segundos": segundos})
+
+    def contar(self, nome: str, n: int = 1) -> None:
+        self.contadores[nome] = self.contadores.get(nome, 0) + n
+        self._avisar("contador", {"nome": nome, "incremento": n, "total": self.contadores[nome]})
+
+    def anotar(self, chave: str, valor) -> None:
+        self.anotacoes[chave] = valor
+        self._avisar("anotacao", {"chave": chave, "valor": valor})
+
+    def incorporar(self, dados: dict) -> None:
+        """Soma a esta medição um para_dict() de outra (ex.: a medição feita em um processo do pool)."""
+        for nome, e in dados.get("etapas", {}).items():
+            etapa = self.etapas.setdefault(nome, {"segundos": 0.0, "chamadas": 0})
+            etapa["segundos"] += e["segundos"]
+            etapa["chamadas"] += e["chamadas"]
+        for nome, n in dados.get("contadores", {}).items():
+            self.contadores[nome] = self.contadores.get(nome, 0) + n
+        self.anotacoes.update(dados.get("anotacoes", {}))
+
+    def para_dict(self) -> dict:
+        return {
+            "etapas": {nome: {"segundos": round(e["segundos"], 4), "chamadas": e["chamadas"]}
+                       for nome, e in self.etapas.items()},
+            "contadores": dict(self.contadores),
+            "anotacoes": dict(self.anotacoes),
+        }
+
+    def salvar_json(self, caminho: str) -> None:
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.para_dict(), f, ensure_ascii=False, indent=2, default=str)
+
+_medicao_atual: ContextVar[Medicao | None] = ContextVar("medicao_atual", default=None)
+
+def medicao_atual() -> Medicao | None:
+    return _medicao_atual.get()
+
+@contextmanager
+def medir(ao_evento=None, perfil: str | None = None, saida_perfil: str | None = None):
+    """Ativa uma Medicao no bloco. Com `perfil` ('cprofile' ou 'pyinstrument') o bloco inteiro também
+    é perfilado e o resultado gravado em `saida_perfil` (.prof para cProfile, .html para pyinstrument)."""
+    medicao = Medicao(ao_evento)
+    token = _medicao_atual.set(medicao)
+    perfilador = _iniciar_perfil(perfil) if perfil else None
+    try:
+        yield medicao
+    finally:
+        _medicao_atual.reset(token)
+        if perfilador:
+            _gravar_perfil(perfil, perfilador, saida_perfil)
+            medicao.anotar("perfil", saida_perfil)
+
+# ---------------------- CHAMADAS DO PIPELINE ----------------------------
+@contextmanager
+def etapa(nome: str):
+    """Soma o tempo do bloco na etapa `nome`; entrar várias vezes acumula (ex.: uma vez por página)."""
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao.somar_etapa(nome, time.perf_counter() - inicio)
+
+def contar(nome: str, n: int = 1) -> None:
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.contar(nome, n)
+
+def anotar(chave: str, valor) -> None:
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.anotar(chave, valor)
+
+# ---------------------- MEMÓRIA ----------------------------
+def memoria_atual_mb() -> float | None:
+    """Memória residente do processo agora: /proc no Linux, GetProcessMemoryInfo no Windows, None nos demais."""
+    if sys.platform == "win32":
+        contadores = _contadores_memoria_windows()
+        return round(contadores.WorkingSetSize / 2 ** 20, 1) if contadores else None
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            residentes = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(residentes * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+
+def pico_rss_mb() -> float | None:
+    """Pico de memória residente do processo desde o início (None onde não há como medir)."""
+    if sys.platform == "win32":
+        contadores = _contadores_memoria_windows()
+        return round(contadores.PeakWorkingSetSize / 2 ** 20, 1) if contadores else None
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+def _contadores_memoria_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    contadores = PROCESS_MEMORY_COUNTERS()
+    contadores.cb = ctypes.sizeof(contadores)
+    processo = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(contadores), contadores.cb):
+        return None
+    return contadores
+
+# ---------------------- PERFILADORES ----------------------------
+def _iniciar_perfil(perfil: str):
+    if perfil == "cprofile":
+        import cProfile
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+        return perfilador
+    if perfil == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise RuntimeError("O perfil 'pyinstrument' exige o pacote 'pyinstrument' (pip install pyinstrument).")
+        perfilador = Profiler()
+        perfilador.start()
+        return perfilador
+    raise ValueError(f"Perfil desconhecido '{perfil}', use {' ou '.join(PERFIS)}.")
+
+def _gravar_perfil(perfil: str, perfilador, saida: str | None) -> None:
+    if perfil == "cprofile":
+        perfilador.disable()
+        if saida:
+            perfilador.dump_stats(saida)
+        else:
+            import pstats
+            pstats.Stats(perfilador).sort_stats("cumulative").print_stats(25)
+    else:
+        perfilador.stop()
+        if saida:
+            with open(saida, "w", encoding="utf-8") as f:
+                f.write(perfilador.output_html())
+        else:
+            print(perfilador.output_text(unicode=True))
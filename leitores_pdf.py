@@ -0,0 +1,97 @@
+"""
+Bibliotecas de leitura do texto das faturas (o "extrator" de cada layout).
+
+'pdfplumber' é a referência: a análise de layout do pdfminer, em Python puro, é a etapa mais cara
+das faturas com texto. 'pdfium' usa o PDFium (pypdfium2, que já vem instalado com o pdfplumber), em
+código nativo, e costuma ser bem mais rápido; a ordem e o espaçamento das linhas podem diferir em
+PDFs montados de outro jeito, por isso a troca é feita por layout, depois de conferida com
+extrator_faturas.conferir_fidelidade (lote_faturas.py --fidelidade).
+
+Os dois abrem o documento do mesmo jeito para os motores: gerenciador de contexto com `pages`
+(len, índice e iteração). O motor 'palavras' usa as coordenadas do pdfplumber e fica sempre nele.
+
+Página digitalizada (sem camada de texto, só a imagem) sai vazia das duas bibliotecas; ela é
+desenhada pela própria biblioteca e lida pelo OCR do motor_ocr (texto_ocr).
+"""
+import pdfplumber
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+
+from instrumentacao import contar
+
+EXTRATORES = ["pdfplumber", "pdfium"]
+EXTRATOR_REFERENCIA = "pdfplumber"
+
+class DocumentoPdfium:
+    """PdfDocument com a interface do pdfplumber usada aqui: `pages` e fechamento no with."""
+    def __init__(self, pdf_path: str):
+        self.pdf = pdfium.PdfDocument(pdf_path)
+        self.pages = self.pdf
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pdf.close()
+
+def abrir_pdf(pdf_path: str, extrator: str = EXTRATOR_REFERENCIA):
+    if extrator == "pdfium":
+        return DocumentoPdfium(pdf_path)
+    return pdfplumber.open(pdf_path)
+
+def texto_pagina_pdfium(pg) -> str:
+    """Texto da página na ordem do conteúdo, com as quebras de linha do pdfplumber ('\\n')."""
+    textpage = pg.get_textpage()
+    try:
+        texto = textpage.get_text_range()
+        if not texto.strip() and pagina_pdfium_digitalizada(pg):
+            texto = texto_ocr(pg)
+    finally:
+        textpage.close()
+        pg.close()
+    return texto.replace("\r\n", "\n").replace("\r", "\n")
+
+def liberar_pagina(pg) -> None:
+    """Solta o que a biblioteca guardou da página lida: o pdfplumber mantém o layout (cada caractere
+    posicionado) de toda página já lida até o documento ser fechado."""
+    pg.close()
+
+def versao_extrator(extrator: str) -> str:
+    """Entra na chave do cache de textos: textos de bibliotecas (ou versões) diferentes não se misturam."""
+    if extrator == "pdfium":
+        return f"pdfium-{pdfium.version.PDFIUM_INFO}+ocr-{VERSAO_OCR_PAGINAS}"
+    return f"pdfplumber-{pdfplumber.__version__}+ocr-{VERSAO_OCR_PAGINAS}"
+
+# ---------------------- PÁGINAS DIGITALIZADAS ----------------------------
+# As páginas com texto nem chegam aqui: só a página vazia e com imagem paga a renderização e o OCR.
+# OpenCV, pytesseract e o Tesseract só são carregados quando aparece a primeira página digitalizada.
+VERSAO_OCR_PAGINAS = "1"    # incrementar quando a leitura das páginas digitalizadas mudar
+PONTOS_POR_POLEGADA = 72
+
+class OcrIndisponivel(ValueError):
+    """Página digitalizada sem o OCR instalado: sem ele os beneficiários da página sumiriam da planilha."""
+
+def pagina_pdfium_digitalizada(pg) -> bool:
+    """Página do PDFium com alguma imagem; quem chama já viu que ela não tem texto."""
+    return next(pg.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]), None) is not None
+
+def renderizar_pagina(pg, dpi: int):
+    """Imagem (PIL) da página já aberta, pelo PDFium nas duas bibliotecas, sem o Poppler."""
+    if isinstance(pg, pdfium.PdfPage):
+        return pg.render(scale=dpi / PONTOS_POR_POLEGADA).to_pil()
+    return pg.to_image(resolution=dpi).original
+
+def texto_ocr(pg) -> str:
+    """Texto de uma página digitalizada pelo OCR adaptativo dos documentos de RH (motor_ocr)."""
+    try:
+        import motor_ocr
+        texto = motor_ocr.ocr_renderizado(lambda dpi: renderizar_pagina(pg, dpi))
+    except (ImportError, OSError) as e:
+        # OSError inclui o TesseractNotFoundError do pytesseract
+        raise OcrIndisponivel(f"Página digitalizada (sem texto) e o OCR não está disponível: {str(e).rstrip('.')}. "
+                              f"Instale o Tesseract (idioma 'por') e os pacotes opencv-python e pytesseract.") from e
+    contar("ocr.paginas")
+    return texto
@@ -0,0 +1,787 @@
+"""
+Processamento em lote (sem interface gráfica) das faturas Porto Seguro Saúde/Odonto.
+
+Exemplos:
+    python lote_faturas.py faturas/2025-06/ --saida planilhas/
+    python lote_faturas.py "faturas/**/*.pdf" --consolidado fechamento_06.xlsx --relatorio resumo.json
+    python lote_faturas.py faturas/2025-06/ --formato parquet --dataset dados/faturas/
+    python lote_faturas.py faturas/2025-07/ --delta --saida planilhas/
+    python lote_faturas.py faturas/2025-06/ --base fechamento.sqlite3
+    python lote_faturas.py faturas/2025-06/ --fidelidade pdfium
+    python lote_faturas.py faturas/2025-06/ --extrator odonto=pdfium
+    python lote_faturas.py faturas/contrato_grande.pdf --memoria-mb 400
+    python lote_faturas.py faturas/2025-06/ --esteira --extrator pdfium
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+
+from extrator_faturas import (processar_fatura, extrair_tabela_seguro, versoes_textos, conferir_fidelidade,
+                            assinatura_df, iterar_paginas, iterar_paginas_em_trechos, TetoMemoria,
+                            processar_limitado, processar_saude_em_fluxo, processar_saude_palavras,
+                            processar_odonto_textos, processar_odonto_registros,
+                            LEITURA_PAGINA, LEITURA_SAUDE, LEITURA_TEXTO, LEITURA_TEXTO_SAUDE, PROCESSOS_PADRAO,
+                            MOTORES, MOTOR_PADRAO, EXTRATOR_PADRAO, PAGINAS_FIDELIDADE)
+from motor_palavras import iterar_odonto_palavras
+from leitores_pdf import EXTRATORES, EXTRATOR_REFERENCIA, abrir_pdf
+from cache_extracao import CacheExtracao, abrir_cache, PASTA_CACHE_PADRAO
+from escritores import FORMATOS, salvar, anexar_dataset, formato_por_extensao
+from instrumentacao import PERFIS, Medicao, medir, etapa, contar, anotar, pico_rss_mb
+from consolidacao import BaseConsolidada
+from delta_mensal import PASTA_ESTADO_PADRAO, calcular_delta, contar_delta, guardar_competencia, carregar_anterior
+ABAS_CONSOLIDADO = {"saude": "Saude", "odonto": "Odonto"}
+
+RE_CPF = re.compile(r"\d{3}\.\d{3}\.\d{3}-\d{2}")
+# competência no nome do arquivo ou da pasta: 2025-06, 2025_06, 06-2025, 06_2025
+RE_COMPETENCIA_AAAA_MM = re.compile(r"(?<!\d)(20\d{2})[-_.](0[1-9]|1[0-2])(?!\d)")
+RE_COMPETENCIA_MM_AAAA = re.compile(r"(?<!\d)(0[1-9]|1[0-2])[-_.](20\d{2})(?!\d)")
+
+# ---------------------- DESCOBERTA DE ARQUIVOS ----------------------------
+def listar_pdfs(entradas: list[str]) -> list[str]:
+    """Expande diretórios, globs e arquivos em uma lista ordenada de PDFs sem repetição."""
+    encontrados = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatos = glob.glob(os.path.join(entrada, "**", "*"), recursive=True)
+        elif glob.has_magic(entrada):
+            candidatos = glob.glob(entrada, recursive=True)
+        else:
+            candidatos = [entrada]
+        encontrados.extend(c for c in candidatos if c.lower().endswith(".pdf") and os.path.isfile(c))
+    return sorted(set(os.path.abspath(c) for c in encontrados))
+
+# ---------------------- DETECÇÃO DO TIPO ----------------------------
+MAX_PAGINAS_DETECCAO = 3
+
+def detectar_tipo_textos(textos: list[str], pdf_path: str) -> str | None:
+    """Identifica se a fatura é de saúde ou odonto pelo texto das primeiras páginas (ou pelo nome do arquivo)."""
+    indicio_odonto = False
+    for txt in textos[:MAX_PAGINAS_DETECCAO]:
+        if extrair_tabela_seguro(txt):
+            return "saude"
+        indicio_odonto = indicio_odonto or bool(RE_CPF.search(txt)) or "odonto" in txt.lower()
+    if indicio_odonto:
+        return "odonto"
+
+    nome = os.path.basename(pdf_path).lower()
+    if "odonto" in nome:
+        return "odonto"
+    if "saude" in nome or "saúde" in nome:
+        return "saude"
+    return None
+
+def detectar_tipo(pdf_path: str, extrator: str = EXTRATOR_REFERENCIA) -> str | None:
+    with abrir_pdf(pdf_path, extrator) as pdf:
+        textos = [LEITURA_TEXTO[extrator](pdf.pages[i]) for i in range(min(MAX_PAGINAS_DETECCAO, len(pdf.pages)))]
+    return detectar_tipo_textos(textos, pdf_path)
+
+def contar_paginas(pdf_path: str, extrator: str = EXTRATOR_REFERENCIA) -> int:
+    with abrir_pdf(pdf_path, extrator) as pdf:
+        return len(pdf.pages)
+
+def extrator_deteccao(extratores: dict[str, str]) -> str:
+    """Antes de saber o tipo, o PDF é aberto pelo extrator comum aos dois layouts (ou pela referência)."""
+    escolhidos = set(extratores.values())
+    return escolhidos.pop() if len(escolhidos) == 1 else EXTRATOR_REFERENCIA
+
+def identificar_arquivo(pdf_path: str, tipo: str, cache: CacheExtracao | None, extratores: dict[str, str],
+                        resultado: dict) -> None:
+    """Preenche páginas e tipo do resultado. Com o PDF já no cache, os dois saem do texto guardado,
+    sem abrir o PDF."""
+    textos = None
+    if cache:
+        hash_pdf = cache.hash_pdf(pdf_path)
+        # só a saúde grava o texto com triagem, e a página da tabela continua lá para a detecção
+        versoes = [v for e in dict.fromkeys([EXTRATOR_REFERENCIA, *extratores.values()]) for v in versoes_textos(e)]
+        for versao in versoes:
+            textos = cache.obter_textos(hash_pdf, versao)
+            if textos is not None:
+                break
+    extrator = extrator_deteccao(extratores)
+    if textos is not None:
+        resultado["paginas"] = len(textos)
+        resultado["tipo"] = detectar_tipo_textos(textos, pdf_path) if tipo == "auto" else tipo
+    else:
+        resultado["paginas"] = contar_paginas(pdf_path, extrator)
+        resultado["tipo"] = detectar_tipo(pdf_path, extrator) if tipo == "auto" else tipo
+    if resultado["tipo"] is None:
+        raise ValueError("Não foi possível identificar se a fatura é de saúde ou odonto.")
+
+# ---------------------- EXECUÇÃO ----------------------------
+def processar_arquivo(pdf_path: str, tipo: str = "auto", processos: int = 1, pasta_cache: str | None = None,
+                      motores: dict[str, str] | None = None, progresso=None,
+                      extratores: dict[str, str] | None = None,
+                      memoria_mb: float | None = None) -> tuple[dict, pd.DataFrame | None]:
+    """Processa um PDF e devolve (resultado para o resumo, DataFrame ou None em caso de falha).
+    O resultado traz em 'instrumentacao' os tempos por etapa e os contadores da extração e em
+    'pico_memoria_mb' o pico de memória do processo até o fim deste arquivo."""
+    inicio = time.perf_counter()
+    resultado = {"arquivo": pdf_path, "tipo": None, "paginas": 0, "registros": 0,
+                 "segundos": 0.0, "erro": None}
+    with medir() as medicao:
+        df = _processar_arquivo(pdf_path, tipo, processos, pasta_cache, motores or MOTOR_PADRAO, resultado,
+                                progresso, extratores or EXTRATOR_PADRAO, memoria_mb)
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    resultado["pico_memoria_mb"] = pico_rss_mb()
+    resultado["instrumentacao"] = medicao.para_dict()
+    return resultado, df
+
+def _processar_arquivo(pdf_path: str, tipo: str, processos: int, pasta_cache: str | None,
+                       motores: dict[str, str], resultado: dict, progresso=None,
+                       extratores: dict[str, str] = EXTRATOR_PADRAO,
+                       memoria_mb: float | None = None) -> pd.DataFrame | None:
+    df = None
+    cache = abrir_cache(pasta_cache) if pasta_cache else None
+    try:
+        identificar_arquivo(pdf_path, tipo, cache, extratores, resultado)
+        df = processar_fatura(pdf_path, resultado["tipo"], processos, cache, progresso,
+                              motor=motores[resultado["tipo"]], contrato=nome_contrato(pdf_path),
+                              extrator=extratores[resultado["tipo"]], memoria_mb=memoria_mb)
+        if df.empty:
+            raise ValueError("Nenhum dado encontrado no PDF.")
+        resultado["registros"] = len(df)
+    except Exception as e:
+        resultado["erro"] = str(e)
+        df = None
+    finally:
+        if cache:
+            cache.fechar()
+    return df
+
+# ---------------------- GRAVAÇÃO ----------------------------
+def detectar_competencia(pdf_path: str) -> str | None:
+    """Competência (AAAA-MM) pelo nome do PDF ou, se não houver, pelo nome da pasta."""
+    for nome in (os.path.basename(pdf_path), os.path.basename(os.path.dirname(os.path.abspath(pdf_path)))):
+        m = RE_COMPETENCIA_AAAA_MM.search(nome)
+        if m:
+            return f"{m.group(1)}-{m.group(2)}"
+        m = RE_COMPETENCIA_MM_AAAA.search(nome)
+        if m:
+            return f"{m.group(2)}-{m.group(1)}"
+    return None
+
+def salvar_individual(df: pd.DataFrame, pdf_path: str, tipo: str, pasta_saida: str | None,
+                      formato: str = "xlsx") -> str:
+    pasta = pasta_saida or os.path.dirname(pdf_path)
+    nome = os.path.splitext(os.path.basename(pdf_path))[0] + f"_{tipo}" + FORMATOS[formato]
+    save_path = os.path.join(pasta, nome)
+    salvar(df, save_path, formato)
+    return save_path
+
+def salvar_dataset(df: pd.DataFrame, pdf_path: str, tipo: str, pasta_dataset: str,
+                   competencia: str | None = None, formato: str = "parquet") -> str:
+    competencia = competencia or detectar_competencia(pdf_path)
+    if competencia is None:
+        raise ValueError("Competência não identificada pelo nome do arquivo/pasta; informe --competencia AAAA-MM.")
+    nome = os.path.splitext(os.path.basename(pdf_path))[0]
+    return anexar_dataset(df, pasta_dataset, tipo, competencia, nome, formato)
+
+def nome_contrato(pdf_path: str) -> str:
+    """Contrato de uma fatura recorrente: o nome do PDF sem a competência (fatura_2025-06 -> fatura);
+    se sobrar só a competência, o nome da pasta."""
+    for nome in (os.path.splitext(os.path.basename(pdf_path))[0],
+                 os.path.basename(os.path.dirname(os.path.abspath(pdf_path)))):
+        limpo = RE_COMPETENCIA_MM_AAAA.sub("", RE_COMPETENCIA_AAAA_MM.sub("", nome)).strip(" -_.")
+        if limpo:
+            return limpo
+    return "contrato"
+
+def salvar_delta(df: pd.DataFrame, pdf_path: str, tipo: str, pasta_estado: str, pasta_saida: str | None,
+                 formato: str = "xlsx", competencia: str | None = None, contrato: str | None = None) -> dict:
+    """Guarda a competência e grava o delta em relação à anterior do mesmo contrato (<nome>_<tipo>_delta)."""
+    competencia = competencia or detectar_competencia(pdf_path)
+    if competencia is None:
+        raise ValueError("Competência não identificada pelo nome do arquivo/pasta; informe --competencia AAAA-MM.")
+    contrato = contrato or nome_contrato(pdf_path)
+    anterior = carregar_anterior(pasta_estado, contrato, tipo, competencia)
+    guardar_competencia(df, pasta_estado, contrato, tipo, competencia)
+    if anterior is None:
+        return {"contrato": contrato, "anterior": None}     # primeira competência guardada: nada a comparar
+    competencia_anterior, df_anterior = anterior
+    delta = calcular_delta(df_anterior, df, tipo)
+    pasta = pasta_saida or os.path.dirname(pdf_path)
+    save_path = os.path.join(pasta, os.path.splitext(os.path.basename(pdf_path))[0] + f"_{tipo}_delta"
+                             + FORMATOS[formato])
+    salvar(delta, save_path, formato)
+    return {"contrato": contrato, "anterior": competencia_anterior, "arquivo": save_path, **contar_delta(delta)}
+
+def salvar_consolidado(frames: dict[str, list[pd.DataFrame]], save_path: str, formato: str = "xlsx") -> list[str]:
+    """Grava uma planilha com uma aba por tipo de fatura e a coluna 'Arquivo' de origem.
+    Nos formatos colunares, que não têm abas, sai um arquivo por tipo (<nome>_saude.parquet, ...)."""
+    pasta = os.path.dirname(save_path)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    if formato == "xlsx":
+        with pd.ExcelWriter(save_path) as writer:
+            for tipo, dfs in frames.items():
+                if dfs:
+                    pd.concat(dfs, ignore_index=True).to_excel(writer, sheet_name=ABAS_CONSOLIDADO[tipo], index=False)
+        return [save_path]
+
+    base = os.path.splitext(save_path)[0]
+    gravados = []
+    for tipo, dfs in frames.items():
+        if dfs:
+            caminho = f"{base}_{tipo}{FORMATOS[formato]}"
+            salvar(pd.concat(dfs, ignore_index=True), caminho, formato)
+            gravados.append(caminho)
+    return gravados
+
+def executar_arquivos(pdfs: list[str], tipo: str, processos: int, paralelo: str, pasta_cache: str | None,
+                      motores: dict[str, str] | None = None, extratores: dict[str, str] | None = None,
+                      memoria_mb: float | None = None):
+    """Gera (resultado, df) de cada PDF. Em modo 'arquivos' cada PDF vai inteiro para um processo
+    do pool; em modo 'paginas' os PDFs seguem um a um, com as páginas de cada um divididas no pool."""
+    if processos <= 1 or paralelo == "paginas" or len(pdfs) == 1:
+        processos_paginas = processos if paralelo == "paginas" or len(pdfs) == 1 else 1
+        for pdf_path in pdfs:
+            yield processar_arquivo(pdf_path, tipo, processos_paginas, pasta_cache, motores, extratores=extratores,
+                                    memoria_mb=memoria_mb)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(processos, len(pdfs))) as executor:
+        futuros = [executor.submit(processar_arquivo, pdf_path, tipo, 1, pasta_cache, motores, extratores=extratores,
+                                   memoria_mb=memoria_mb)
+                   for pdf_path in pdfs]
+        for futuro in as_completed(futuros):
+            yield futuro.result()
+
+# ---------------------- ESTEIRA ----------------------------
+# Com --esteira o lote roda em três estágios sobrepostos: um processo lê as páginas dos PDFs, um atrás
+# do outro; uma thread casa os regex e monta o DataFrame de cada fatura à medida que as páginas chegam;
+# e o laço de processar_lote grava a fatura pronta enquanto as seguintes já estão sendo lidas e casadas.
+# As filas entre os estágios são limitadas, então o estágio adiantado espera pelo seguinte: no máximo
+# PAGINAS_NA_FILA páginas lidas e ARQUIVOS_NA_FILA faturas montadas ficam aguardando. A planilha de cada
+# fatura é ordenada sobre o documento inteiro, por isso a gravação dela começa quando o casamento termina.
+PAGINAS_NA_FILA = 64
+ARQUIVOS_NA_FILA = 2
+ESPERA_FILA = 1.0       # segundos entre as conferências de que o outro estágio continua vivo
+
+def executar_esteira(pdfs: list[str], tipo: str, pasta_cache: str | None, motores: dict[str, str] | None = None,
+                     extratores: dict[str, str] | None = None, memoria_mb: float | None = None):
+    """Gera (resultado, df) de cada PDF, na ordem de entrada, como executar_arquivos, mas com leitura,
+    casamento e gravação sobrepostos. O cache vale para o DataFrame e o texto do documento inteiro; as
+    páginas repetidas de outra competência (extrair_textos_incremental) são lidas de novo."""
+    fila = multiprocessing.Queue(PAGINAS_NA_FILA)
+    saida = queue.Queue(ARQUIVOS_NA_FILA)
+    parar = threading.Event()
+    processo = multiprocessing.Process(target=_ler_para_esteira, daemon=True,
+                                       args=(pdfs, tipo, pasta_cache, motores or MOTOR_PADRAO,
+                                             extratores or EXTRATOR_PADRAO, memoria_mb, fila))
+    processo.start()
+    threading.Thread(target=_casar_para_esteira, daemon=True,
+                     args=(fila, processo, saida, parar, pasta_cache, memoria_mb)).start()
+    try:
+        while True:
+            item = saida.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        processo.join()
+    finally:
+        parar.set()
+        if processo.is_alive():
+            processo.terminate()
+
+def _ler_para_esteira(pdfs: list[str], tipo: str, pasta_cache: str | None, motores: dict[str, str],
+                      extratores: dict[str, str], memoria_mb: float | None, fila) -> None:
+    """Estágio de leitura, em processo próprio. Para cada PDF vão à fila ("inicio", caminho, tipo, motor,
+    hash, chave do cache), as páginas ("pagina", texto) ou o DataFrame já em cache ("df", df) e sempre
+    ("fim", resultado, medição, início); None encerra o lote."""
+    cache = abrir_cache(pasta_cache) if pasta_cache else None
+    try:
+        for pdf_path in pdfs:
+            inicio = time.time()
+            resultado = {"arquivo": pdf_path, "tipo": None, "paginas": 0, "registros": 0,
+                         "segundos": 0.0, "erro": None}
+            with medir() as medicao:
+                try:
+                    _ler_arquivo_esteira(pdf_path, tipo, cache, motores, extratores, memoria_mb, fila, resultado)
+                except Exception as e:
+                    resultado["erro"] = str(e)
+            resultado["pico_memoria_mb"] = pico_rss_mb()
+            fila.put(("fim", resultado, medicao.para_dict(), inicio))
+    finally:
+        if cache:
+            cache.fechar()
+        fila.put(None)
+
+def _ler_arquivo_esteira(pdf_path: str, tipo: str, cache: CacheExtracao | None, motores: dict[str, str],
+                         extratores: dict[str, str], memoria_mb: float | None, fila, resultado: dict) -> None:
+    identificar_arquivo(pdf_path, tipo, cache, extratores, resultado)
+    tipo = resultado["tipo"]
+    motor = motores[tipo]
+    extrator = EXTRATOR_REFERENCIA if motor == "palavras" else extratores[tipo]
+    anotar("tipo", tipo)
+    anotar("motor", motor)
+    anotar("extrator", extrator)
+    hash_pdf = chave_df = textos = versao = None
+    if cache:
+        chave_df = assinatura_df(tipo, motor, extrator)
+        with etapa("cache"):
+            hash_pdf = cache.hash_pdf(pdf_path)
+            df = cache.obter_df(hash_pdf, tipo, chave_df)
+        if df is not None:
+            anotar("cache", "dataframe")
+            fila.put(("inicio", pdf_path, tipo, motor, None, None))
+            fila.put(("df", df))
+            return
+        if motor == "texto":
+            # o mesmo critério de processar_fatura: o texto completo serve aos dois tipos
+            completo, triagem = versoes_textos(extrator)
+            versao = triagem if tipo == "saude" else completo
+            with etapa("cache"):
+                textos = cache.obter_textos(hash_pdf, completo)
+                if textos is None and versao != completo:
+                    textos = cache.obter_textos(hash_pdf, versao)
+    anotar("cache", "desativado" if cache is None else "texto" if textos is not None else "nenhum")
+    fila.put(("inicio", pdf_path, tipo, motor, hash_pdf, chave_df))
+
+    if textos is not None:
+        contar("paginas", len(textos))
+        paginas = textos
+    else:
+        paginas = _paginas_esteira(pdf_path, tipo, motor, extrator, memoria_mb)
+    # com teto de memória o texto do documento inteiro não é guardado, como em processar_fatura
+    guardados = [] if versao and textos is None and not memoria_mb else None
+    for pagina in paginas:
+        with etapa("espera.casamento"):
+            fila.put(("pagina", pagina))
+        if guardados is not None:
+            guardados.append(pagina)
+    if guardados is not None:
+        with etapa("cache"):
+            cache.guardar_textos(hash_pdf, versao, [t or "" for t in guardados])
+
+def _paginas_esteira(pdf_path: str, tipo: str, motor: str, extrator: str, memoria_mb: float | None):
+    if motor == "palavras":
+        ler_pagina = (LEITURA_SAUDE if tipo == "saude" else LEITURA_PAGINA)[motor]
+    else:
+        ler_pagina = (LEITURA_TEXTO_SAUDE if tipo == "saude" else LEITURA_TEXTO)[extrator]
+    if memoria_mb:
+        return iterar_paginas_em_trechos(pdf_path, ler_pagina, None, extrator, TetoMemoria(memoria_mb))
+    return iterar_paginas(pdf_path, ler_pagina, extrator=extrator)
+
+def _casar_para_esteira(fila, processo, saida: queue.Queue, parar: threading.Event, pasta_cache: str | None,
+                        memoria_mb: float | None) -> None:
+    """Estágio de casamento, em uma thread do processo principal: entrega (resultado, df) de cada fatura,
+    ou a exceção que parou a esteira, e None no fim."""
+    cache = abrir_cache(pasta_cache) if pasta_cache else None
+    try:
+        while True:
+            mensagem = _receber(fila, processo)
+            if mensagem is None:
+                break
+            with medir() as medicao:
+                df, fim = _casar_arquivo_esteira(mensagem, fila, processo, cache, memoria_mb)
+            _, resultado, medicao_leitura, inicio = fim
+            medicao.incorporar(medicao_leitura)
+            if df is not None:
+                resultado["registros"] = len(df)
+            resultado["segundos"] = round(time.time() - inicio, 3)
+            picos = [p for p in (resultado["pico_memoria_mb"], pico_rss_mb()) if p is not None]
+            resultado["pico_memoria_mb"] = max(picos) if picos else None
+            resultado["instrumentacao"] = medicao.para_dict()
+            _entregar(saida, (resultado, df), parar)
+    except Exception as e:
+        _entregar(saida, e, parar)
+    finally:
+        if cache:
+            cache.fechar()
+        _entregar(saida, None, parar)
+
+def _casar_arquivo_esteira(mensagem: tuple, fila, processo, cache: CacheExtracao | None,
+                           memoria_mb: float | None) -> tuple[pd.DataFrame | None, tuple]:
+    """Consome as mensagens de um PDF até o "fim"; o DataFrame é None se a leitura ou o casamento falhou."""
+    if mensagem[0] == "fim":
+        return None, mensagem       # falhou antes das páginas (tipo não identificado, PDF ilegível)
+    _, pdf_path, tipo, motor, hash_pdf, chave_df = mensagem
+    primeira = _receber(fila, processo)
+    if primeira[0] == "df":
+        return primeira[1], _receber(fila, processo)
+
+    fim = [primeira] if primeira[0] == "fim" else []
+    def paginas():
+        if fim:
+            return
+        yield primeira[1]
+        while True:
+            with etapa("espera.leitura"):
+                mensagem = _receber(fila, processo)
+            if mensagem[0] == "fim":
+                fim.append(mensagem)
+                return
+            yield mensagem[1]
+
+    df, erro = None, None
+    try:
+        df = _casar_paginas(paginas(), pdf_path, tipo, motor, memoria_mb)
+        if df.empty:
+            raise ValueError("Nenhum dado encontrado no PDF.")
+    except Exception as e:
+        df, erro = None, str(e)
+    while not fim:
+        # casamento interrompido: o resto das páginas deste PDF é descartado
+        mensagem = _receber(fila, processo)
+        if mensagem[0] == "fim":
+            fim.append(mensagem)
+    resultado = fim[0][1]
+    if resultado["erro"]:
+        return None, fim[0]     # a leitura parou no meio: o casamento viu só parte do documento
+    if erro:
+        resultado["erro"] = erro
+        return None, fim[0]
+    if hash_pdf:
+        with etapa("cache"):
+            cache.guardar_df(hash_pdf, tipo, chave_df, df)
+    return df, fim[0]
+
+def _casar_paginas(paginas, pdf_path: str, tipo: str, motor: str, memoria_mb: float | None) -> pd.DataFrame:
+    if motor == "palavras":
+        if tipo == "saude":
+            return processar_saude_palavras(paginas)
+        return processar_odonto_registros(iterar_odonto_palavras(paginas))
+    if memoria_mb:
+        return processar_limitado(pdf_path, tipo, memoria_mb, textos=paginas)
+    if tipo == "saude":
+        return processar_saude_em_fluxo(paginas)
+    return processar_odonto_textos(paginas)
+
+def _receber(fila, processo):
+    while True:
+        try:
+            return fila.get(timeout=ESPERA_FILA)
+        except queue.Empty:
+            if not processo.is_alive():
+                raise RuntimeError("O processo de leitura da esteira terminou antes do fim do lote.")
+
+def _entregar(saida: queue.Queue, item, parar: threading.Event) -> None:
+    while not parar.is_set():
+        try:
+            saida.put(item, timeout=ESPERA_FILA)
+            return
+        except queue.Full:
+            pass
+
+def processar_lote(pdfs: list[str], tipo: str = "auto", pasta_saida: str | None = None,
+                   consolidado: str | None = None, processos: int = 1, paralelo: str = "arquivos",
+                   pasta_cache: str | None = None, formato: str = "xlsx", pasta_dataset: str | None = None,
+                   competencia: str | None = None, motores: dict[str, str] | None = None,
+                   pasta_estado: str | None = None, contrato: str | None = None, base: str | None = None,
+                   extratores: dict[str, str] | None = None, memoria_mb: float | None = None,
+                   esteira: bool = False) -> dict:
+    """Com `pasta_estado` cada fatura também é comparada com a competência anterior do mesmo contrato;
+    com `base` é carregada na base consolidada (SQLite) de todos os contratos. Com `memoria_mb`, cada
+    processo lê as faturas em trechos, dentro desse teto (processar_limitado). Com `esteira`, leitura,
+    casamento e gravação se sobrepõem (executar_esteira) e `processos` não é usado."""
+    inicio = time.perf_counter()
+    base_consolidada = BaseConsolidada(base) if base else None
+    arquivos = []
+    frames = {"saude": [], "odonto": []}
+    total = Medicao()
+
+    if esteira:
+        execucao = executar_esteira(pdfs, tipo, pasta_cache, motores, extratores, memoria_mb)
+    else:
+        execucao = executar_arquivos(pdfs, tipo, processos, paralelo, pasta_cache, motores, extratores, memoria_mb)
+    for resultado, df in execucao:
+        pdf_path = resultado["arquivo"]
+        if df is not None:
+            # a gravação roda aqui no processo principal: a medição dela soma na do arquivo
+            with medir() as medicao:
+                medicao.incorporar(resultado["instrumentacao"])
+                _gravar_arquivo(resultado, df, pasta_saida, consolidado, formato, pasta_dataset, competencia,
+                                frames, pasta_estado, contrato, base_consolidada)
+            resultado["instrumentacao"] = medicao.para_dict()
+        total.incorporar(resultado["instrumentacao"])
+        arquivos.append(resultado)
+        status = "OK " if resultado["erro"] is None else "ERRO"
+        print(f"[{status}] {os.path.basename(pdf_path)} ({resultado['tipo'] or '?'}) "
+              f"{resultado['registros']} registros em {resultado['segundos']:.2f}s"
+              + _descrever_delta(resultado.get("delta"))
+              + (f" – {resultado['erro']}" if resultado["erro"] else ""), flush=True)
+
+    # com o pool os arquivos terminam fora de ordem; o resumo e o consolidado seguem a ordem de entrada
+    ordem = {pdf_path: i for i, pdf_path in enumerate(pdfs)}
+    arquivos.sort(key=lambda a: ordem[a["arquivo"]])
+    for dfs in frames.values():
+        dfs.sort(key=lambda df: ordem[df.attrs["arquivo"]])
+
+    if base_consolidada:
+        base_consolidada.fechar()
+    if consolidado and any(frames.values()):
+        with medir() as medicao:
+            salvar_consolidado(frames, consolidado, formato)
+        total.incorporar(medicao.para_dict())
+
+    instrumentacao = total.para_dict()
+    del instrumentacao["anotacoes"]     # anotações valem por arquivo (tipo, cache), não para o lote
+    return montar_resumo(arquivos, time.perf_counter() - inicio, consolidado, instrumentacao, memoria_mb)
+
+def _gravar_arquivo(resultado: dict, df: pd.DataFrame, pasta_saida: str | None, consolidado: str | None,
+                    formato: str, pasta_dataset: str | None, competencia: str | None,
+                    frames: dict[str, list[pd.DataFrame]], pasta_estado: str | None = None,
+                    contrato: str | None = None, base: BaseConsolidada | None = None) -> None:
+    pdf_path = resultado["arquivo"]
+    try:
+        if base:
+            with etapa("consolidacao"):
+                competencia_base = competencia or detectar_competencia(pdf_path)
+                if competencia_base is None:
+                    raise ValueError("Competência não identificada pelo nome do arquivo/pasta; "
+                                     "informe --competencia AAAA-MM.")
+                base.carregar(df, resultado["tipo"], competencia_base, contrato or nome_contrato(pdf_path),
+                              os.path.basename(pdf_path))
+        if pasta_estado:
+            with etapa("delta"):
+                resultado["delta"] = salvar_delta(df, pdf_path, resultado["tipo"], pasta_estado, pasta_saida,
+                                                  formato, competencia, contrato)
+        if pasta_dataset:
+            resultado["dataset"] = salvar_dataset(df, pdf_path, resultado["tipo"], pasta_dataset,
+                                                  competencia, "parquet" if formato == "xlsx" else formato)
+        if consolidado:
+            df.insert(0, "Arquivo", os.path.basename(pdf_path))
+            df.attrs["arquivo"] = pdf_path
+            frames[resultado["tipo"]].append(df)
+        elif not pasta_dataset or pasta_saida:
+            resultado["saida"] = salvar_individual(df, pdf_path, resultado["tipo"], pasta_saida, formato)
+    except Exception as e:
+        resultado["erro"] = f"Falha ao salvar: {e}"
+
+def _descrever_delta(delta: dict | None) -> str:
+    if not delta:
+        return ""
+    if delta["anterior"] is None:
+        return " | delta: primeira competência do contrato"
+    return (f" | delta vs {delta['anterior']}: +{delta['inclusão']} inclusões, -{delta['exclusão']} exclusões, "
+            f"{delta['alteração']} alterações")
+
+# ---------------------- RESUMO ----------------------------
+def montar_resumo(arquivos: list[dict], segundos: float, consolidado: str | None = None,
+                  instrumentacao: dict | None = None, teto_memoria_mb: float | None = None) -> dict:
+    ok = [a for a in arquivos if a["erro"] is None]
+    paginas = sum(a["paginas"] for a in ok)
+    registros = sum(a["registros"] for a in ok)
+    picos = [a["pico_memoria_mb"] for a in arquivos if a.get("pico_memoria_mb") is not None]
+    return {
+        "arquivos": len(arquivos),
+        "sucesso": len(ok),
+        "falhas": len(arquivos) - len(ok),
+        "paginas": paginas,
+        "registros": registros,
+        "segundos": round(segundos, 3),
+        "paginas_por_segundo": round(paginas / segundos, 2) if segundos else 0.0,
+        "registros_por_segundo": round(registros / segundos, 2) if segundos else 0.0,
+        "pico_memoria_mb": max(picos) if picos else None,
+        "teto_memoria_mb": teto_memoria_mb,
+        "consolidado": consolidado,
+        "instrumentacao": instrumentacao,
+        "detalhes": arquivos,
+    }
+
+def imprimir_resumo(resumo: dict) -> None:
+    print("\n---------------------- RESUMO ----------------------")
+    print(f"Arquivos: {resumo['arquivos']}  Sucesso: {resumo['sucesso']}  Falhas: {resumo['falhas']}")
+    contadores = (resumo.get("instrumentacao") or {}).get("contadores", {})
+    ignoradas, ocr = contadores.get("paginas_ignoradas"), contadores.get("ocr.paginas")
+    notas = ([f"{ignoradas} ignoradas pela triagem"] if ignoradas else []) + ([f"{ocr} lidas por OCR"] if ocr else [])
+    print(f"Páginas: {resumo['paginas']}" + (f" ({', '.join(notas)})" if notas else "")
+          + f"  Registros: {resumo['registros']}  Tempo total: {resumo['segundos']:.2f}s")
+    print(f"Vazão: {resumo['paginas_por_segundo']} páginas/s | {resumo['registros_por_segundo']} registros/s")
+    pico, teto = resumo.get("pico_memoria_mb"), resumo.get("teto_memoria_mb")
+    if pico is not None:
+        limite = f" (teto {teto:.0f} MB{', ultrapassado' if pico > teto else ''})" if teto else ""
+        print(f"Memória: pico de {pico:.0f} MB por processo{limite}")
+    etapas = (resumo.get("instrumentacao") or {}).get("etapas")
+    if etapas:
+        print("Etapas: " + " | ".join(f"{nome} {e['segundos']:.2f}s" for nome, e in etapas.items()))
+    lentos = sorted(resumo["detalhes"], key=lambda a: a["segundos"], reverse=True)[:5]
+    if lentos:
+        print("Mais lentos:")
+        for a in lentos:
+            print(f"  {a['segundos']:>8.2f}s  {a['paginas']:>5} pág.  {os.path.basename(a['arquivo'])}")
+    falhas = [a for a in resumo["detalhes"] if a["erro"]]
+    if falhas:
+        print("Falhas:")
+        for a in falhas:
+            print(f"  {os.path.basename(a['arquivo'])}: {a['erro']}")
+
+# ---------------------- FIDELIDADE DOS EXTRATORES ----------------------------
+def conferir_lote(pdfs: list[str], tipo: str = "auto", extrator: str = "pdfium",
+                  paginas: int = PAGINAS_FIDELIDADE) -> dict:
+    """conferir_fidelidade de cada PDF e o veredito por tipo: o extrator só pode ser trocado em um layout
+    em que todos os PDFs conferidos deram os mesmos registros."""
+    arquivos = []
+    for pdf_path in pdfs:
+        try:
+            tipo_pdf = detectar_tipo(pdf_path) if tipo == "auto" else tipo
+            if tipo_pdf is None:
+                raise ValueError("Não foi possível identificar se a fatura é de saúde ou odonto.")
+            resultado = {**conferir_fidelidade(pdf_path, tipo_pdf, extrator, paginas), "erro": None}
+        except Exception as e:
+            resultado = {"arquivo": os.path.basename(pdf_path), "tipo": None, "fiel": False, "erro": str(e)}
+        arquivos.append(resultado)
+        print(_descrever_fidelidade(resultado, extrator), flush=True)
+
+    tipos = {}
+    for resultado in arquivos:
+        if resultado["tipo"]:
+            tipos[resultado["tipo"]] = tipos.get(resultado["tipo"], True) and resultado["fiel"]
+    return {"extrator": extrator, "tipos": tipos, "detalhes": arquivos}
+
+def _descrever_fidelidade(resultado: dict, extrator: str) -> str:
+    if resultado["erro"]:
+        return f"[ERRO] {resultado['arquivo']} – {resultado['erro']}"
+    segundos = resultado["segundos"]
+    velocidade = (f", {segundos[EXTRATOR_REFERENCIA] / segundos[extrator]:.0f}x mais rápido"
+                  if segundos[extrator] else "")
+    registros = resultado["registros"][EXTRATOR_REFERENCIA]
+    linha = (f"[{'OK ' if resultado['fiel'] else 'DIF'}] {resultado['arquivo']} ({resultado['tipo']}, "
+             f"{resultado['layout'] or 'sem layout'}): {registros} registros em {resultado['paginas']} pág."
+             + velocidade)
+    if not resultado["fiel"]:
+        sobras = resultado["so_no_extrator"]
+        linha += (f" – {sobras[EXTRATOR_REFERENCIA]} só no {EXTRATOR_REFERENCIA}, {sobras[extrator]} só no "
+                  f"{extrator}" if registros else " – nenhum registro na amostra")
+        for nome, exemplos in resultado["exemplos"].items():
+            linha += "".join(f"\n      só no {nome}: {exemplo}" for exemplo in exemplos)
+    return linha
+
+def imprimir_fidelidade(conferencia: dict) -> None:
+    extrator = conferencia["extrator"]
+    print("\n---------------------- FIDELIDADE ----------------------")
+    for tipo, fiel in conferencia["tipos"].items():
+        print(f"{tipo}: " + (f"registros iguais aos do {EXTRATOR_REFERENCIA}; pode usar --extrator {tipo}={extrator}"
+                             if fiel else f"registros diferentes; mantenha o {EXTRATOR_REFERENCIA}"))
+
+# ---------------------- LINHA DE COMANDO ----------------------------
+def ler_escolhas(itens: list[str] | None, opcoes: list[str], padrao: dict[str, str], nome: str) -> dict[str, str]:
+    """['palavras'] vale para os dois layouts; ['odonto=palavras'] troca só o do odonto."""
+    escolhas = dict(padrao)
+    for item in itens or []:
+        tipo, _, escolha = item.rpartition("=")
+        if escolha not in opcoes or (tipo and tipo not in escolhas):
+            raise ValueError(f"{nome.capitalize()} inválido '{item}': use {'/'.join(opcoes)} ou tipo={nome} "
+                             f"(ex.: odonto={opcoes[-1]}).")
+        for t in ([tipo] if tipo else escolhas):
+            escolhas[t] = escolha
+    return escolhas
+
+def ler_motores(itens: list[str] | None) -> dict[str, str]:
+    return ler_escolhas(itens, MOTORES, MOTOR_PADRAO, "motor")
+
+def ler_extratores(itens: list[str] | None) -> dict[str, str]:
+    return ler_escolhas(itens, EXTRATORES, EXTRATOR_PADRAO, "extrator")
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Extrai faturas Porto Seguro Saúde/Odonto (PDF) para Excel em lote.")
+    parser.add_argument("entradas", nargs="+", help="Arquivos PDF, diretórios ou padrões glob (ex.: 'faturas/**/*.pdf').")
+    parser.add_argument("--tipo", choices=["auto", "saude", "odonto"], default="auto",
+                        help="Tipo de fatura; 'auto' detecta pelo conteúdo (padrão).")
+    parser.add_argument("--saida", help="Pasta das planilhas individuais (padrão: a pasta de cada PDF).")
+    parser.add_argument("--consolidado", help="Grava uma única planilha com abas Saude/Odonto em vez de uma por PDF.")
+    parser.add_argument("--formato", choices=list(FORMATOS),
+                        help="Formato de saída: xlsx (padrão), csv, parquet ou arrow (Arrow IPC). "
+                             "Com --consolidado, o padrão é o da extensão do arquivo.")
+    parser.add_argument("--dataset", help="Anexa cada fatura a um dataset particionado por tipo e competência "
+                                          "(tipo=.../competencia=AAAA-MM/); usa Parquet se o formato for xlsx.")
+    parser.add_argument("--competencia", help="Competência AAAA-MM do dataset (padrão: detectada pelo nome do arquivo/pasta).")
+    parser.add_argument("--delta", action="store_true",
+                        help="Compara cada fatura com a competência anterior do mesmo contrato e grava só as "
+                             "inclusões, exclusões e alterações de valor (<nome>_<tipo>_delta).")
+    parser.add_argument("--estado-dir", default=PASTA_ESTADO_PADRAO,
+                        help="Pasta onde --delta guarda o resultado de cada competência.")
+    parser.add_argument("--contrato", help="Nome do contrato para --delta (padrão: nome do PDF sem a competência).")
+    parser.add_argument("--base", help="Carrega cada fatura na base consolidada (SQLite) de todos os contratos, "
+                                       "consultada com consolidacao.py.")
+    parser.add_argument("--motor", nargs="+", metavar="[TIPO=]MOTOR",
+                        help="Leitura dos PDFs: 'texto' (padrão, texto corrido + regex) ou 'palavras' (posição de "
+                             "cada palavra); 'odonto=palavras' escolhe só para um layout.")
+    parser.add_argument("--extrator", nargs="+", metavar="[TIPO=]EXTRATOR",
+                        help="Biblioteca que lê o texto no motor 'texto': 'pdfplumber' (padrão, referência) ou "
+                             "'pdfium' (bem mais rápido); 'odonto=pdfium' escolhe só para um layout. "
+                             "Confira antes com --fidelidade.")
+    parser.add_argument("--fidelidade", metavar="EXTRATOR", choices=[e for e in EXTRATORES if e != EXTRATOR_REFERENCIA],
+                        help="Não extrai: lê uma amostra de páginas de cada PDF com EXTRATOR e com o pdfplumber, "
+                             "compara os registros e diz em quais layouts a troca é segura.")
+    parser.add_argument("--paginas-fidelidade", type=int, default=PAGINAS_FIDELIDADE,
+                        help=f"Páginas da amostra de --fidelidade por PDF (padrão: {PAGINAS_FIDELIDADE}).")
+    parser.add_argument("--memoria-mb", type=float,
+                        help="Teto de memória por processo, para faturas muito grandes: cada página é liberada "
+                             "logo após a leitura, o PDF é reaberto em trechos e os registros vão para o disco "
+                             "em blocos até o fim. A leitura de cada fatura fica serial e usa o motor 'texto'.")
+    parser.add_argument("--processos", type=int, default=1,
+                        help=f"Tamanho do pool de processos (padrão: 1, serial; esta máquina: {PROCESSOS_PADRAO}).")
+    parser.add_argument("--paralelo", choices=["arquivos", "paginas"], default="arquivos",
+                        help="Distribui PDFs inteiros ('arquivos') ou as páginas de cada PDF ('paginas') no pool.")
+    parser.add_argument("--esteira", action="store_true",
+                        help="Sobrepõe as etapas: um processo lê as páginas enquanto as faturas já lidas são "
+                             "casadas e gravadas, com filas limitadas entre elas. Não combina com --processos.")
+    parser.add_argument("--cache-dir", default=PASTA_CACHE_PADRAO,
+                        help="Pasta do cache de extração; PDFs já lidos não passam de novo pelo pdfplumber.")
+    parser.add_argument("--sem-cache", action="store_true", help="Ignora o cache de extração.")
+    parser.add_argument("--relatorio", help="Grava o resumo da execução (tempos por etapa, contadores, falhas, "
+                                            "vazão) em JSON.")
+    parser.add_argument("--perfil", choices=PERFIS,
+                        help="Perfila a execução com cProfile ou pyinstrument; força o modo serial (--processos 1).")
+    parser.add_argument("--perfil-saida", help="Arquivo do perfil (.prof para cprofile, .html para pyinstrument); "
+                                               "sem ele o resumo do perfil vai para a tela.")
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    try:
+        motores = ler_motores(args.motor)
+        extratores = ler_extratores(args.extrator)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.memoria_mb and "palavras" in motores.values():
+        parser.error("--memoria-mb usa o motor 'texto'; não combine com --motor palavras.")
+    if args.esteira and args.processos > 1:
+        parser.error("--esteira já separa leitura e casamento em um processo próprio; não combine com --processos.")
+    pdfs = listar_pdfs(args.entradas)
+    if not pdfs:
+        print("Nenhum PDF encontrado nas entradas informadas.", file=sys.stderr)
+        return 2
+
+    if args.fidelidade:
+        conferencia = conferir_lote(pdfs, args.tipo, args.fidelidade, args.paginas_fidelidade)
+        imprimir_fidelidade(conferencia)
+        if args.relatorio:
+            with open(args.relatorio, "w", encoding="utf-8") as f:
+                json.dump(conferencia, f, ensure_ascii=False, indent=2, default=str)
+        return 0 if all(r["fiel"] for r in conferencia["detalhes"]) else 1
+
+    formato = args.formato or (formato_por_extensao(args.consolidado) if args.consolidado else "xlsx")
+    processos = args.processos
+    if args.perfil and processos > 1:
+        # o perfilador só enxerga o processo principal; no pool ele mediria apenas a espera
+        print("--perfil: executando em modo serial.", file=sys.stderr)
+        processos = 1
+    with medir(perfil=args.perfil, saida_perfil=args.perfil_saida):
+        resumo = processar_lote(pdfs, args.tipo, args.saida, args.consolidado, processos, args.paralelo,
+                                None if args.sem_cache else args.cache_dir, formato, args.dataset,
+                                args.competencia, motores, args.estado_dir if args.delta else None, args.contrato,
+                                args.base, extratores, args.memoria_mb, args.esteira)
+    imprimir_resumo(resumo)
+
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, ensure_ascii=False, indent=2)
+
+    return 1 if resumo["falhas"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Motor de OCR dos documentos de RH: renderização das páginas (pdf2image), pré-processamento (OpenCV) e
+Tesseract, com cache do texto por imagem e pool de processos. A interface fica em OCR_Documentos_RH.
+
+Há dois modos. O 'fixo' renderiza a 400 dpi, sempre remove ruído (fastNlMeansDenoising, a etapa mais
+cara) e lê a página inteira. O 'adaptativo' (padrão) mede ruído e inclinação da página, só remove
+ruído de digitalizações sujas, endireita páginas tortas, lê só as regiões com texto, começa a 200 dpi
+e só sobe para 400 dpi (e, no fim, para o pipeline fixo) quando a confiança do Tesseract fica baixa.
+"""
+import cv2
+import pytesseract
+import os
+import hashlib
+import itertools
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
+from cache_extracao import CacheExtracao, abrir_cache, assinatura
+from instrumentacao import etapa, contar
+
+pytesseract.pytesseract.tesseract_cmd = r"/usr/bin/tesseract"
+
+PROCESSOS_PADRAO = max(1, (os.cpu_count() or 1) - 1)
+PAGINAS_POR_PROCESSO = 2        # páginas em voo por processo: limita a memória a poucas imagens de 400 dpi
+DPI_OCR = 400
+IDIOMA_OCR = "por"
+CONFIG_OCR = "--psm 3"
+VERSAO_OCR = "1"                # incrementar quando o pré-processamento mudar
+ASSINATURA_OCR = assinatura(VERSAO_OCR, IDIOMA_OCR, CONFIG_OCR)
+
+MODOS_OCR = ["adaptativo", "fixo"]
+MODO_PADRAO = "adaptativo"
+DPI_INICIAL = 200               # primeira tentativa do modo adaptativo; sobe para DPI_OCR se preciso
+CONFIANCA_MINIMA = 75           # confiança média das palavras (0-100) abaixo da qual a página é relida
+RUIDO_LIMITE = 4.0              # estimativa de ruído (medir_ruido) acima da qual vale o denoise
+CONTRASTE_MINIMO = 60           # níveis de cinza entre o fundo e a tinta do texto
+MANCHAS_MINIMAS = 3             # manchas de tinta (na cópia reduzida) abaixo das quais a página está em branco
+INCLINACAO_MAXIMA = 5.0         # graus testados na correção de inclinação
+INCLINACAO_MINIMA = 0.3         # abaixo disso a página fica como está
+LADO_ANALISE = 800              # ruído/inclinação/regiões são medidos numa cópia reduzida da página
+VERSAO_ADAPTATIVO = "2"
+ASSINATURA_ADAPTATIVO = assinatura(VERSAO_OCR, VERSAO_ADAPTATIVO, IDIOMA_OCR, DPI_INICIAL, DPI_OCR,
+                                   CONFIANCA_MINIMA, RUIDO_LIMITE, INCLINACAO_MINIMA)
+
+def preprocessar_imagem(img: Image.Image) -> np.ndarray:
+    gray = cv2.cvtColor(np.array(img.convert("RGB")), cv2.COLOR_RGB2GRAY)
+    denoised = cv2.fastNlMeansDenoising(gray, h=10)
+    _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+def contar_paginas(caminho: str) -> int:
+    if os.path.splitext(caminho)[1].lower() == ".pdf":
+        return pdfinfo_from_path(caminho)["Pages"]
+    return 1
+
+def renderizar_pagina(caminho: str, pagina: int, dpi: int = DPI_OCR) -> Image.Image:
+    """Só a página pedida (1 = primeira) é convertida, em vez do PDF inteiro de uma vez."""
+    if os.path.splitext(caminho)[1].lower() == ".pdf":
+        return convert_from_path(caminho, dpi=dpi, first_page=pagina, last_page=pagina)[0]
+    return Image.open(caminho)
+
+def hash_imagem(img: Image.Image) -> str:
+    h = hashlib.sha1(f"{img.mode}|{img.size}".encode("utf-8"))
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+def ocr_imagem(img: Image.Image, cache: CacheExtracao | None = None) -> str:
+    """Pré-processa e roda o Tesseract; com cache, uma imagem já lida não passa de novo pelo OCR."""
+    chave = hash_imagem(img) if cache else None
+    if cache:
+        texto = cache.obter_ocr(chave, ASSINATURA_OCR)
+        if texto is not None:
+            contar("ocr.cache")
+            return texto
+    with etapa("preprocessamento"):
+        binaria = preprocessar_imagem(img)
+    with etapa("tesseract"):
+        texto = pytesseract.image_to_string(binaria, lang=IDIOMA_OCR, config=CONFIG_OCR)
+    if cache:
+        cache.guardar_ocr(chave, ASSINATURA_OCR, texto)
+    return texto
+
+# ---------------------- OCR ADAPTATIVO ----------------------------
+def _reduzir(gray: np.ndarray) -> tuple[np.ndarray, float]:
+    escala = min(1.0, LADO_ANALISE / max(gray.shape))
+    if escala == 1.0:
+        return gray, 1.0
+    return cv2.resize(gray, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA), escala
+
+def medir_ruido(gray: np.ndarray) -> float:
+    """Estimativa do ruído pelo método de Immerkær, fora das bordas do texto: o filtro anula regiões
+    lisas e deixa só a variação de pixel a pixel. Usa um pixel a cada dois (reduzir com média
+    esconderia o ruído). Página limpa fica perto de 0; ruído gaussiano de desvio 8 dá cerca de 4,7."""
+    amostra = gray[::2, ::2]
+    nucleo = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    resposta = np.abs(cv2.filter2D(amostra.astype(np.float32), -1, nucleo))
+    bordas = cv2.dilate(cv2.Canny(amostra, 100, 200), np.ones((3, 3), np.uint8)) > 0
+    lisos = resposta[~bordas]
+    if lisos.size == 0:
+        return 0.0
+    return float(np.sqrt(np.pi / 2) * lisos.mean() / 6)
+
+def medir_inclinacao(binaria_invertida: np.ndarray) -> float:
+    """Ângulo (graus) que deixa as linhas de texto horizontais: o que mais concentra a soma das linhas
+    (perfil de projeção), buscado na imagem reduzida de 0,5 em 0,5 grau e refinado de 0,1 em 0,1."""
+    reduzida, _ = _reduzir(binaria_invertida)
+    altura, largura = reduzida.shape
+    centro = (largura / 2, altura / 2)
+
+    def nitidez(angulo: float) -> float:
+        matriz = cv2.getRotationMatrix2D(centro, angulo, 1.0)
+        girada = cv2.warpAffine(reduzida, matriz, (largura, altura), flags=cv2.INTER_NEAREST)
+        return float(np.var(girada.sum(axis=1, dtype=np.float64)))
+
+    melhor = max(np.arange(-INCLINACAO_MAXIMA, INCLINACAO_MAXIMA + 0.01, 0.5), key=nitidez)
+    return float(max(np.arange(melhor - 0.4, melhor + 0.41, 0.1), key=nitidez))
+
+def regioes_texto(binaria_invertida: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """Retângulos (x, y, largura, altura) com texto: caracteres vizinhos são unidos em blocos e
+    manchas pequenas (poeira, ruído que sobrou) são descartadas."""
+    reduzida, escala = _reduzir(binaria_invertida)
+    blocos = cv2.dilate(reduzida, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 5)))
+    contornos, _ = cv2.findContours(blocos, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    area_minima = 0.00005 * reduzida.size
+    regioes = []
+    for contorno in contornos:
+        x, y, w, h = cv2.boundingRect(contorno)
+        if w * h >= area_minima and h >= 4:
+            regioes.append(tuple(int(round(v / escala)) for v in (x, y, w, h)))
+    return regioes
+
+def pagina_em_branco(gray: np.ndarray) -> bool:
+    """Se a página não tem tinta: conta as manchas (componentes conexos) que se afastam do fundo na cópia
+    reduzida, sem filtro de mediana — o filtro e os percentis apagavam os traços finos de uma página com
+    uma linha só. Manchas de um pixel (ruído) não contam."""
+    reduzida = _reduzir(gray)[0]
+    fundo = float(np.median(reduzida))
+    tinta = (np.abs(reduzida.astype(np.int16) - fundo) >= CONTRASTE_MINIMO).astype(np.uint8)
+    _, _, estatisticas, _ = cv2.connectedComponentsWithStats(tinta, connectivity=8)
+    return int((estatisticas[1:, cv2.CC_STAT_AREA] >= 2).sum()) < MANCHAS_MINIMAS
+
+def preprocessar_adaptativo(img: Image.Image, denoise: bool | None = None) -> tuple[np.ndarray | None, dict]:
+    """Imagem binária pronta para o Tesseract — endireitada, recortada nas regiões com texto e com o
+    resto em branco — e o diagnóstico da página. None quando a página não tem texto algum.
+    `denoise` None decide pelo ruído medido."""
+    gray = cv2.cvtColor(np.array(img.convert("RGB")), cv2.COLOR_RGB2GRAY)
+    ruido = medir_ruido(gray)
+    if denoise is None:
+        denoise = ruido > RUIDO_LIMITE
+    diagnostico = {"ruido": round(ruido, 2), "denoise": denoise, "inclinacao": 0.0, "regioes": 0}
+    if pagina_em_branco(gray):
+        # página em branco (ou só ruído): nem denoise nem Tesseract
+        return None, diagnostico
+    if denoise:
+        gray = cv2.fastNlMeansDenoising(gray, h=10)
+    _, binaria = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    invertida = cv2.bitwise_not(binaria)
+
+    angulo = medir_inclinacao(invertida)
+    if abs(angulo) >= INCLINACAO_MINIMA:
+        altura, largura = binaria.shape
+        matriz = cv2.getRotationMatrix2D((largura / 2, altura / 2), angulo, 1.0)
+        binaria = cv2.warpAffine(binaria, matriz, (largura, altura), flags=cv2.INTER_NEAREST, borderValue=255)
+        invertida = cv2.bitwise_not(binaria)
+
+    diagnostico["inclinacao"] = round(angulo, 1)
+    regioes = regioes_texto(invertida)
+    diagnostico["regioes"] = len(regioes)
+    if not regioes:
+        return None, diagnostico
+    # só as regiões com texto vão para o Tesseract: o resto da página fica em branco e as margens saem
+    margem = 10
+    x0 = max(0, min(x for x, _, _, _ in regioes) - margem)
+    y0 = max(0, min(y for _, y, _, _ in regioes) - margem)
+    x1 = min(binaria.shape[1], max(x + w for x, _, w, _ in regioes) + margem)
+    y1 = min(binaria.shape[0], max(y + h for _, y, _, h in regioes) + margem)
+    limpa = np.full((y1 - y0, x1 - x0), 255, dtype=np.uint8)
+    for x, y, w, h in regioes:
+        xa, ya = max(x - margem, x0), max(y - margem, y0)
+        xb, yb = min(x + w + margem, x1), min(y + h + margem, y1)
+        limpa[ya - y0:yb - y0, xa - x0:xb - x0] = binaria[ya:yb, xa:xb]
+    return limpa, diagnostico
+
+def _texto_e_confianca(binaria: np.ndarray) -> tuple[str, float]:
+    """Uma chamada ao Tesseract (image_to_data) dá o texto, remontado por bloco/linha, e a confiança
+    média das palavras."""
+    dados = pytesseract.image_to_data(binaria, lang=IDIOMA_OCR, config=CONFIG_OCR,
+                                      output_type=pytesseract.Output.DICT)
+    linhas, confiancas = {}, []
+    for i, palavra in enumerate(dados["text"]):
+        palavra = palavra.strip()
+        confianca = float(dados["conf"][i])
+        if not palavra or confianca < 0:
+            continue
+        confiancas.append(confianca)
+        chave = (dados["block_num"][i], dados["par_num"][i], dados["line_num"][i])
+        linhas.setdefault(chave, []).append(palavra)
+    texto, bloco_anterior = [], None
+    for (bloco, paragrafo, _), palavras in linhas.items():
+        if bloco_anterior is not None and (bloco, paragrafo) != bloco_anterior:
+            texto.append("")
+        texto.append(" ".join(palavras))
+        bloco_anterior = (bloco, paragrafo)
+    return "\n".join(texto), (sum(confiancas) / len(confiancas) if confiancas else 0.0)
+
+def ocr_adaptativo(caminho: str, pagina: int, cache: CacheExtracao | None = None,
+                   dpi_maximo: int = DPI_OCR) -> str:
+    """OCR da página com o menor esforço que dá confiança suficiente: DPI_INICIAL com pré-processamento
+    adaptativo, depois `dpi_maximo`, e por fim o pipeline fixo. Fica o texto de maior confiança."""
+    pdf = os.path.splitext(caminho)[1].lower() == ".pdf"
+    return ocr_renderizado(lambda dpi: renderizar_pagina(caminho, pagina, dpi), cache, dpi_maximo, pdf)
+
+def ocr_renderizado(renderizar: Callable[[int], Image.Image], cache: CacheExtracao | None = None,
+                    dpi_maximo: int = DPI_OCR, escalar: bool = True) -> str:
+    """ocr_adaptativo de uma página desenhada por `renderizar(dpi)` (ex.: a página digitalizada de uma
+    fatura, já aberta pelo leitor do PDF). Sem `escalar` (imagem com resolução fixa) a página é
+    desenhada uma vez só."""
+    with etapa("renderizacao"):
+        img = renderizar(min(DPI_INICIAL, dpi_maximo))
+    chave = hash_imagem(img) if cache else None
+    if cache:
+        texto = cache.obter_ocr(chave, ASSINATURA_ADAPTATIVO)
+        if texto is not None:
+            contar("ocr.cache")
+            return texto
+
+    melhor = ("", -1.0)
+    tentativas = [img, dpi_maximo] if escalar and dpi_maximo > DPI_INICIAL else [img]
+    for n, tentativa in enumerate(tentativas):
+        if n:
+            contar("ocr.escalonadas")
+            with etapa("renderizacao"):
+                tentativa = renderizar(tentativa)
+        with etapa("preprocessamento"):
+            binaria, diagnostico = preprocessar_adaptativo(tentativa)
+        contar("ocr.sem_denoise", not diagnostico["denoise"])
+        contar("ocr.endireitadas", abs(diagnostico["inclinacao"]) >= INCLINACAO_MINIMA)
+        if binaria is None:
+            if n + 1 < len(tentativas):
+                continue    # pouco texto pode sumir na resolução menor: confere na maior antes de desistir
+            contar("ocr.em_branco")
+            if melhor[1] < 0:
+                melhor = ("", 100.0)
+            break
+        with etapa("tesseract"):
+            texto, confianca = _texto_e_confianca(binaria)
+        if confianca > melhor[1]:
+            melhor = (texto, confianca)
+        if confianca >= CONFIANCA_MINIMA:
+            break
+    else:
+        # nem a maior resolução deu confiança: última chance com o pipeline fixo (denoise + página inteira)
+        contar("ocr.pipeline_fixo")
+        with etapa("renderizacao"):
+            img_fixo = renderizar(dpi_maximo) if escalar else img
+        with etapa("preprocessamento"):
+            binaria = preprocessar_imagem(img_fixo)
+        with etapa("tesseract"):
+            texto, confianca = _texto_e_confianca(binaria)
+        if confianca > melhor[1]:
+            melhor = (texto, confianca)
+
+    if cache:
+        cache.guardar_ocr(chave, ASSINATURA_ADAPTATIVO, melhor[0])
+    return melhor[0]
+
+def ler_pagina(caminho: str, pagina: int, cache: CacheExtracao | None = None, dpi: int = DPI_OCR,
+               modo: str = MODO_PADRAO) -> str:
+    if modo == "adaptativo":
+        return ocr_adaptativo(caminho, pagina, cache, dpi)
+    with etapa("renderizacao"):
+        img = renderizar_pagina(caminho, pagina, dpi)
+    return ocr_imagem(img, cache)
+
+# ---------------------- PÁGINAS EM PARALELO ----------------------------
+_cache_processo = None
+
+def _iniciar_processo(pasta_cache: str | None):
+    global _cache_processo
+    # um Tesseract por processo: sem isso cada um abre threads OpenMP e os processos disputam os núcleos
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    _cache_processo = abrir_cache(pasta_cache) if pasta_cache else None
+
+def _ocr_pagina(caminho: str, pagina: int, dpi: int, modo: str) -> str:
+    return ler_pagina(caminho, pagina, _cache_processo, dpi, modo)
+
+def iterar_ocr(caminho: str, processos: int = 1, cache: CacheExtracao | None = None,
+               dpi: int = DPI_OCR, modo: str = MODO_PADRAO) -> Iterator[str]:
+    """Texto de cada página, em ordem. Com processos > 1 cada processo renderiza, pré-processa e lê
+    as suas páginas; no máximo PAGINAS_POR_PROCESSO páginas por processo ficam em andamento.
+    No modo adaptativo `dpi` é a resolução máxima a que uma página difícil pode chegar."""
+    total = contar_paginas(caminho)
+    if processos <= 1 or total == 1:
+        for pagina in range(1, total + 1):
+            texto = ler_pagina(caminho, pagina, cache, dpi, modo)
+            contar("paginas")
+            yield texto
+        return
+
+    paginas = iter(range(1, total + 1))
+    with ProcessPoolExecutor(max_workers=min(processos, total), initializer=_iniciar_processo,
+                             initargs=(cache.pasta if cache else None,)) as executor:
+        pendentes = deque(executor.submit(_ocr_pagina, caminho, pagina, dpi, modo)
+                          for pagina in itertools.islice(paginas, processos * PAGINAS_POR_PROCESSO))
+        try:
+            while pendentes:
+                # no pool, renderização e OCR acontecem nos processos; aqui só se mede a espera
+                with etapa("ocr"):
+                    texto = pendentes.popleft().result()
+                contar("paginas")
+                pagina = next(paginas, None)
+                if pagina is not None:
+                    pendentes.append(executor.submit(_ocr_pagina, caminho, pagina, dpi, modo))
+                yield texto
+        finally:
+            for futuro in pendentes:
+                futuro.cancel()
@@ -0,0 +1,302 @@
+"""
+Motor de extração por coordenadas: lê as palavras de cada página (pdfplumber.extract_words) uma
+única vez, agrupa-as em linhas pela posição vertical e reconhece os campos pela posição/tipo de
+cada palavra, sem os regex permissivos do motor de texto.
+
+Saúde: se a página tem o cabeçalho 'Seguro Dep Nome Reg.Func. Idade Parentesco', as posições dos
+rótulos definem as faixas de coluna e cada palavra do beneficiário cai na faixa onde começa; se a
+linha não fecha com as faixas (fatura sem colunas alinhadas), os campos são lidos pelas pontas da
+linha: parentesco, idade e matrícula a partir do fim, seguro e dependente a partir do início.
+Odonto: cada registro é ancorado no CPF; o nome quebrado antes dele (inclusive na virada de página)
+é juntado à linha seguinte pela ordem das linhas, não por re.sub no texto.
+
+Os dois produzem as mesmas estruturas intermediárias do motor de texto (colunas em texto de
+casar_saude e registros de iterar_odonto), e a montagem dos DataFrames é a mesma.
+"""
+import re
+from operator import itemgetter
+from collections.abc import Iterable, Iterator
+
+from instrumentacao import etapa, contar
+
+VERSAO_MOTOR = "1"      # incrementar quando o reconhecimento mudar (invalida os DataFrames em cache)
+TOLERANCIA_LINHA = 3    # pontos de diferença no topo ainda considerados a mesma linha (como no extract_text)
+
+# (texto, x0, x1) de cada palavra, linhas de cima para baixo e palavras da esquerda para a direita
+Palavra = tuple[str, float, float]
+Linha = list[Palavra]
+
+RE_VALOR = re.compile(r"\d[\d\.]*,\d{2}")
+RE_CPF = re.compile(r"\d{3}\.\d{3}\.\d{3}-\d{2}")
+RE_DATA = re.compile(r"\d{2}/\d{2}/\d{4}")
+
+def linhas_pagina(pg) -> list[Linha]:
+    """Palavras de uma página do pdfplumber agrupadas em linhas."""
+    linhas, topo = [], None
+    for p in sorted(pg.extract_words(), key=itemgetter("top")):
+        if topo is None or p["top"] - topo > TOLERANCIA_LINHA:
+            linhas.append([])
+            topo = p["top"]
+        linhas[-1].append((p["text"], p["x0"], p["x1"]))
+    for linha in linhas:
+        linha.sort(key=itemgetter(1))
+    return linhas
+
+def _valor(palavra: str) -> str | None:
+    m = RE_VALOR.match(palavra)
+    return m.group() if m else None
+
+def _tem_digito(palavra: str) -> bool:
+    return any(c.isdigit() for c in palavra)
+
+def _digitos(palavra: str, minimo: int, maximo: int) -> bool:
+    return palavra.isdigit() and minimo <= len(palavra) <= maximo
+
+# ---------------------- SAÚDE ----------------------------
+PARENTESCOS = frozenset({"Titular", "Conjuge", "Filho", "Filha", "filho", "filha"})
+
+# rótulo do cabeçalho da tabela -> campo; a faixa de cada coluna vai do meio do espaço antes do
+# rótulo até o meio do espaço antes do próximo
+ROTULOS_COLUNAS_SAUDE = {"Seguro": "seguro", "Dep": "dep", "Nome": "nome", "Reg": "reg_func",
+                         "Idade": "idade", "Parentesco": "parentesco"}
+
+# campo -> (sequências de palavras do rótulo, se pode haver palavras sem dígitos antes do valor)
+ROTULOS_VALORES_SAUDE = {
+    "premio_base": ([("Prêmio", "Base")], False),
+    "total_copart": ([("Total", "Co-Part."), ("Total", "CoPart."), ("Total", "Co", "Part.")], True),
+    "consultas": ([("CONSULTAS",)], True),
+    "exames": ([("EXAMES",)], True),
+    "pronto_socorro": ([("PRONTO-SOCORRO",), ("PRONTOSOCORRO",), ("PRONTO", "SOCORRO")], True),
+    "pro_rata": ([("Pro-Rata",), ("ProRata",), ("Pro", "Rata")], True),
+    "iof": ([("IOF",)], False),
+    "total_dep": ([("TOTAL", "DO", "DEP.")], False),
+}
+# primeira palavra do rótulo -> [(campo, sequência, texto entre)]: só as palavras que abrem um rótulo
+# são examinadas no corpo
+ROTULOS_POR_PALAVRA_SAUDE = {}
+for _campo, (_sequencias, _texto_entre) in ROTULOS_VALORES_SAUDE.items():
+    for _seq in _sequencias:
+        ROTULOS_POR_PALAVRA_SAUDE.setdefault(_seq[0], []).append((_campo, _seq, _texto_entre))
+CAMPOS_SAUDE = ["seguro", "dep", "nome", "reg_func", "idade", "parentesco", "plano", *ROTULOS_VALORES_SAUDE]
+
+def _inicio_tabela_seguro(linhas: list[Linha]) -> tuple[int, int] | None:
+    """(linha, palavra) de 'Dep' no cabeçalho 'Seguro Dep' (ou 'Seguro: Dep', 'Nº Seguro Dep')."""
+    for i, linha in enumerate(linhas):
+        textos = [p[0] for p in linha]
+        for j, texto in enumerate(textos[:-1]):
+            if texto in ("Seguro", "Seguro:"):
+                k = j + 2 if textos[j + 1] == ":" and j + 2 < len(textos) else j + 1
+                if textos[k].startswith("Dep"):
+                    return i, k
+    return None
+
+def faixas_colunas(cabecalho: Linha) -> list[tuple[float, str]] | None:
+    """(início da faixa, campo) de cada coluna do cabeçalho; None se faltar algum rótulo."""
+    rotulos = []
+    for texto, x0, x1 in cabecalho:
+        campo = next((c for r, c in ROTULOS_COLUNAS_SAUDE.items() if texto.startswith(r)), None)
+        if campo and all(campo != c for _, _, c in rotulos):
+            rotulos.append((x0, x1, campo))
+    if len(rotulos) != len(ROTULOS_COLUNAS_SAUDE):
+        return None
+    faixas = [(float("-inf"), rotulos[0][2])]
+    for (_, x1_ant, _), (x0, _, campo) in zip(rotulos, rotulos[1:]):
+        faixas.append(((x1_ant + x0) / 2, campo))
+    return faixas
+
+def _beneficiario_por_faixas(linha: Linha, faixas: list[tuple[float, str]]) -> tuple[dict, int] | None:
+    campos = {campo: [] for _, campo in faixas}
+    ultima = -1
+    for i, (texto, x0, _) in enumerate(linha):
+        campo = next(c for inicio, c in reversed(faixas) if x0 >= inicio)
+        if campo == "parentesco" and campos["parentesco"]:
+            break       # o que vem depois do parentesco é o início do corpo (plano)
+        campos[campo].append(texto)
+        ultima = i
+    d = {campo: " ".join(v) if v else None for campo, v in campos.items()}
+    valido = (
+        (d["seguro"] is None or _digitos(d["seguro"], 7, 9))
+        and d["dep"] is not None and _digitos(d["dep"], 1, 2)
+        and d["nome"] is not None and not _tem_digito(d["nome"])
+        and (d["reg_func"] is None or _digitos(d["reg_func"], 4, 8))
+        and d["idade"] is not None and _digitos(d["idade"], 1, 3)
+        and d["parentesco"] in PARENTESCOS
+    )
+    return (d, ultima + 1) if valido else None
+
+def _beneficiario_pelas_pontas(textos: list[str]) -> tuple[dict, int] | None:
+    for k in range(3, len(textos)):
+        if textos[k] not in PARENTESCOS or not _digitos(textos[k - 1], 1, 3):
+            continue
+        fim_nome = k - 1
+        reg_func = None
+        if _digitos(textos[k - 2], 4, 8):
+            reg_func, fim_nome = textos[k - 2], k - 2
+        i, seguro = 0, None
+        if _digitos(textos[0], 7, 9) and _digitos(textos[1], 1, 2):
+            seguro, i = textos[0], 1
+        if not _digitos(textos[i], 1, 2) or fim_nome <= i + 1:
+            continue
+        nome = textos[i + 1:fim_nome]
+        if any(_tem_digito(t) for t in nome):
+            continue
+        return {"seguro": seguro, "dep": textos[i], "nome": " ".join(nome), "reg_func": reg_func,
+                "idade": textos[k - 1], "parentesco": textos[k]}, k + 1
+    return None
+
+def _valores_saude(palavras: list[str]) -> dict[str, str | None]:
+    """Primeira ocorrência de cada rótulo seguido de valor no corpo do beneficiário."""
+    vals = dict.fromkeys(ROTULOS_VALORES_SAUDE)
+    for i, palavra in enumerate(palavras):
+        for campo, seq, texto_entre in ROTULOS_POR_PALAVRA_SAUDE.get(palavra, ()):
+            if vals[campo] is not None or (len(seq) > 1 and tuple(palavras[i:i + len(seq)]) != seq):
+                continue
+            j = i + len(seq)
+            while texto_entre and j < len(palavras) and not _tem_digito(palavras[j]):
+                j += 1
+            if j < len(palavras):
+                vals[campo] = _valor(palavras[j])
+            break
+    return vals
+
+def casar_saude_palavras(paginas: Iterable[list[Linha]]) -> tuple[dict[str, list], dict[int, str]]:
+    """Mesma saída de casar_saude (colunas em texto e TOTAL. por titular), a partir das linhas."""
+    cols = {c: [] for c in CAMPOS_SAUDE}
+    totais = {}
+    titular = None
+    seguro = None
+    por_faixas = 0
+    for linhas in paginas:
+        if not linhas:
+            continue        # página vazia ou descartada pela triagem
+        with etapa("casamento"):
+            inicio = _inicio_tabela_seguro(linhas)
+            if inicio is None:
+                continue
+            i_cab, j_dep = inicio
+            faixas = faixas_colunas(linhas[i_cab])
+            # resto da linha do cabeçalho depois de 'Dep' conta como primeira linha da tabela
+            tabela = [linhas[i_cab][j_dep + 1:], *linhas[i_cab + 1:]]
+
+            corpo = None        # palavras do beneficiário atual, até o próximo (ou o fim da página)
+            for linha in tabela:
+                textos = [p[0] for p in linha]
+                achado = None
+                if not PARENTESCOS.isdisjoint(textos):
+                    achado = _beneficiario_por_faixas(linha, faixas) if faixas else None
+                    if achado:
+                        por_faixas += 1
+                    else:
+                        achado = _beneficiario_pelas_pontas(textos)
+                if achado:
+                    if corpo is not None:
+                        _fechar_beneficiario(cols, corpo)
+                    d, fim = achado
+                    seguro = d["seguro"] or seguro
+                    d["seguro"] = seguro
+                    for campo in CAMPOS_SAUDE[:6]:
+                        cols[campo].append(d[campo])
+                    if d["parentesco"] == "Titular":
+                        titular = len(cols["dep"]) - 1
+                    corpo = [textos[fim:]]
+                    continue
+
+                if "TOTAL." in textos and titular is not None:
+                    for k, texto in enumerate(textos[:-1]):
+                        if texto == "TOTAL." and _valor(textos[k + 1]):
+                            totais[titular] = _valor(textos[k + 1])
+                if corpo is not None:
+                    corpo.append(textos)
+            if corpo is not None:
+                _fechar_beneficiario(cols, corpo)
+    contar("saude.beneficiarios", len(cols["dep"]))
+    contar("saude.palavras.faixas", por_faixas)
+    contar("saude.RE_TOTAL_FAMILIA", len(totais))
+    return cols, totais
+
+def _fechar_beneficiario(cols: dict[str, list], corpo: list[list[str]]) -> None:
+    cols["plano"].append(next((" ".join(l) for l in corpo if l), None))
+    for campo, val in _valores_saude([p for l in corpo for p in l]).items():
+        cols[campo].append(val)
+
+# ---------------------- ODONTO ----------------------------
+DEPENDENCIAS = ("Conjuge", "Filho", "Filha", "Enteada", "Enteado")
+
+def _prefixo_nome(textos: list[str]) -> bool:
+    """Linha 'Nº NOME [MATRÍCULA]' sem o CPF: o registro foi quebrado e continua numa linha adiante."""
+    return (len(textos) >= 2 and _digitos(textos[0], 1, 6) and textos[1][:1].isalpha()
+            and not any(_tem_digito(t) for t in textos[2:-1])
+            and (not _tem_digito(textos[-1]) or textos[-1].isdigit()))
+
+def _registro_odonto(textos: list[str], c: int) -> dict | None:
+    """Campos de uma linha de registro com o CPF na posição c."""
+    if c < 3 or not _digitos(textos[0], 1, 6) or not textos[c - 1].isdigit():
+        return None
+    nome = textos[1:c - 1]
+    if not nome[0][:1].isalpha() or any(_tem_digito(t) for t in nome):
+        return None
+
+    t = next((k for k in range(c + 2, len(textos) - 1) if textos[k] in ("T", "D") and textos[k + 1].isdigit()),
+             None)
+    if t is None:
+        return None
+    k = t + 2
+    dependencia = None
+    if k < len(textos) and textos[k].startswith(DEPENDENCIAS):
+        dependencia, k = textos[k], k + 1
+    if k >= len(textos) or not RE_DATA.fullmatch(textos[k]):
+        return None
+
+    resto = textos[k + 1:]
+    valores = []
+    while resto and len(valores) < 2 and _valor(resto[-1]) == resto[-1]:
+        valores.insert(0, resto.pop())
+    if not valores or not resto:
+        return None
+    return {
+        "num": textos[0], "nome": " ".join(nome), "matricula": textos[c - 1], "cpf": textos[c],
+        "plano": " ".join(textos[c + 1:t]), "tp": textos[t], "id": textos[t + 1], "dependencia": dependencia,
+        "dt_inclusao": textos[k], "rubrica": " ".join(resto), "valor": valores[0],
+        "valor_total": valores[1] if len(valores) > 1 else None, "iof": None,
+    }
+
+def _iof(textos: list[str]) -> str | None:
+    for i in range(len(textos) - 2):
+        if textos[i] in ("Cobrança", "Cobranca") and textos[i + 1] == "de" and textos[i + 2] == "IOF":
+            for t in textos[i + 3:]:
+                if _tem_digito(t):
+                    return _valor(t)
+    return None
+
+def iterar_odonto_palavras(paginas: Iterable[list[Linha]]) -> Iterator[dict]:
+    """Mesmos registros de iterar_odonto, ancorados no CPF de cada linha. O registro fica em aberto
+    até o próximo começar, pois a 'Cobrança de IOF' dele pode vir nas linhas (ou página) seguintes."""
+    aberto = None
+    prefixo = None      # 'Nº NOME' de um registro cujo restante está numa linha adiante
+    for linhas in paginas:
+        with etapa("casamento"):
+            registros = []
+            for linha in linhas:
+                textos = [p[0] for p in linha]
+                c = next((i for i, t in enumerate(textos) if RE_CPF.fullmatch(t)), None)
+                if c is None:
+                    if _prefixo_nome(textos):
+                        prefixo = textos
+                    elif aberto is not None and aberto["iof"] is None:
+                        aberto["iof"] = _iof(textos)
+                    continue
+
+                d = _registro_odonto(textos, c)
+                if d is None and prefixo is not None:
+                    d = _registro_odonto(prefixo + textos, c + len(prefixo))
+                if d is None:
+                    continue
+                prefixo = None
+                if aberto is not None:
+                    registros.append(aberto)
+                aberto = d
+        contar("odonto.palavras.registros", len(registros))
+        yield from registros
+    if aberto is not None:
+        contar("odonto.palavras.registros")
+        yield aberto
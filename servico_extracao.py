@@ -0,0 +1,432 @@
+"""
+Serviço local de extração: um processo só, com o pool de trabalhadores já aquecido, atendendo
+várias estações (ou a própria interface) por HTTP.
+
+Cada trabalhador importa o pdfplumber/pandas e abre o cache uma única vez, ao subir; as tarefas
+chegam por uma fila (o pool) e o resultado é devolvido como arquivo, lido em blocos.
+
+    POST   /tarefas?tipo=saude|odonto|auto|ocr&formato=xlsx&nome=fatura.pdf   (corpo: o PDF)
+           -> 202 {"id": ..., "estado": "na_fila"}
+    GET    /tarefas/<id>              -> estado, registros, erro
+    GET    /tarefas/<id>/resultado    -> o arquivo gerado
+    DELETE /tarefas/<id>              -> cancela (se ainda na fila) e apaga os arquivos
+    GET    /estado                    -> trabalhadores, tarefas por estado
+
+Exemplos:
+    python servico_extracao.py servir --processos 4
+    python servico_extracao.py enviar fatura_06.pdf --tipo saude --saida fatura_06.xlsx
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import tempfile
+import argparse
+import threading
+import urllib.parse
+import urllib.request
+import urllib.error
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cache_extracao import PASTA_CACHE_PADRAO
+
+ENDERECO_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8765
+URL_PADRAO = os.environ.get("IGARAPE_SERVICO_URL", f"http://{ENDERECO_PADRAO}:{PORTA_PADRAO}")
+PROCESSOS_PADRAO = max(1, (os.cpu_count() or 1) - 1)
+TIPOS = ["auto", "saude", "odonto", "ocr"]
+TAMANHO_MAXIMO = 512 * 1024 * 1024
+TAMANHO_BLOCO = 64 * 1024
+RETENCAO_SEGUNDOS = 3600        # tarefas terminadas e não apagadas somem depois de 1 hora
+TIPOS_CONTEUDO = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".csv": "text/csv",
+    ".parquet": "application/vnd.apache.parquet", ".arrow": "application/vnd.apache.arrow.file",
+}
+
+# ---------------------- TRABALHADORES ----------------------------
+_pasta_cache = None
+_ocr_indisponivel = None
+
+def _iniciar_trabalhador(pasta_cache: str | None):
+    """Roda uma vez em cada processo do pool: as importações pesadas ficam prontas para todas as tarefas."""
+    global _pasta_cache, _ocr_indisponivel
+    _pasta_cache = pasta_cache
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    import lote_faturas  # noqa: F401  (pdfplumber, pandas e os regex compilados)
+    try:
+        import motor_ocr  # noqa: F401
+    except ImportError as e:
+        _ocr_indisponivel = f"OCR indisponível neste servidor: {e}"
+
+def _aquecer() -> int:
+    return os.getpid()
+
+def _gravador_progresso(pasta: str, intervalo: float = 0.2):
+    """progresso(feitas, total) que o processo do pool deixa em um arquivo da tarefa, lido pelo serviço."""
+    ultimo = 0.0
+
+    def progresso(feitas: int, total: int):
+        nonlocal ultimo
+        agora = time.monotonic()
+        if agora - ultimo < intervalo and feitas < total:
+            return
+        ultimo = agora
+        caminho = os.path.join(pasta, "progresso.json")
+        with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+            json.dump([feitas, total], f)
+        os.replace(caminho + ".tmp", caminho)
+    return progresso
+
+def _ler_progresso(pasta: str) -> list[int] | None:
+    try:
+        with open(os.path.join(pasta, "progresso.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def executar_tarefa(entrada: str, tipo: str, formato: str) -> dict:
+    """Processa o arquivo da tarefa e grava o resultado ao lado dele; roda dentro do pool."""
+    import pandas as pd
+    from escritores import FORMATOS, salvar
+    from lote_faturas import processar_arquivo
+    inicio = time.perf_counter()
+    progresso = _gravador_progresso(os.path.dirname(entrada))
+    if tipo == "ocr":
+        if _ocr_indisponivel:
+            raise RuntimeError(_ocr_indisponivel)
+        from cache_extracao import abrir_cache
+        from motor_ocr import contar_paginas, iterar_ocr
+        cache = abrir_cache(_pasta_cache) if _pasta_cache else None
+        try:
+            total, textos = contar_paginas(entrada), []
+            for texto in iterar_ocr(entrada, 1, cache):
+                textos.append(texto)
+                progresso(len(textos), total)
+        finally:
+            if cache:
+                cache.fechar()
+        df = pd.DataFrame({"Página": range(1, len(textos) + 1), "Texto": textos})
+        resultado = {"tipo": "ocr", "paginas": len(textos)}
+    else:
+        resultado, df = processar_arquivo(entrada, tipo, 1, _pasta_cache, progresso=progresso)
+        if resultado["erro"]:
+            raise RuntimeError(resultado["erro"])
+    saida = os.path.splitext(entrada)[0] + f"_{resultado['tipo']}" + FORMATOS[formato]
+    salvar(df, saida, formato)
+    return {"tipo": resultado["tipo"], "paginas": resultado["paginas"], "registros": len(df),
+            "saida": saida, "segundos": round(time.perf_counter() - inicio, 3)}
+
+# ---------------------- FILA DE TAREFAS ----------------------------
+class Servico:
+    def __init__(self, processos: int = PROCESSOS_PADRAO, pasta_cache: str | None = PASTA_CACHE_PADRAO,
+                 pasta_trabalho: str | None = None):
+        self.processos = processos
+        self.pasta_trabalho = pasta_trabalho or tempfile.mkdtemp(prefix="igarape_servico_")
+        self.tarefas = {}
+        self.trava = threading.Lock()
+        self.pool = ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_trabalhador,
+                                        initargs=(pasta_cache,))
+        # sobe todos os trabalhadores agora: a primeira fatura não paga a importação
+        for futuro in [self.pool.submit(_aquecer) for _ in range(processos)]:
+            futuro.result()
+
+    def fechar(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(self.pasta_trabalho, ignore_errors=True)
+
+    def enviar(self, corpo, tamanho: int, nome: str, tipo: str, formato: str) -> dict:
+        self._descartar_antigas()
+        id_tarefa = uuid.uuid4().hex
+        pasta = os.path.join(self.pasta_trabalho, id_tarefa)
+        os.makedirs(pasta)
+        # o nome original vai junto: a detecção do tipo também olha o nome do arquivo
+        entrada = os.path.join(pasta, os.path.basename(nome) or "fatura.pdf")
+        try:
+            with open(entrada, "wb") as f:
+                restante = tamanho
+                while restante > 0:
+                    bloco = corpo.read(min(TAMANHO_BLOCO, restante))
+                    if not bloco:
+                        raise ValueError("Envio interrompido antes do fim do arquivo.")
+                    f.write(bloco)
+                    restante -= len(bloco)
+        except BaseException:
+            shutil.rmtree(pasta, ignore_errors=True)
+            raise
+
+        tarefa = {"id": id_tarefa, "arquivo": os.path.basename(entrada), "tipo": tipo, "formato": formato,
+                  "estado": "na_fila", "criada": time.time(), "concluida": None, "progresso": None,
+                  "resultado": None, "erro": None}
+        with self.trava:
+            tarefa["futuro"] = self.pool.submit(executar_tarefa, entrada, tipo, formato)
+            self.tarefas[id_tarefa] = tarefa
+        # fora da trava: se a tarefa já terminou, o callback roda aqui mesmo e pega a trava
+        tarefa["futuro"].add_done_callback(lambda futuro: self._concluir(id_tarefa, futuro))
+        return self.descrever(id_tarefa)
+
+    def _concluir(self, id_tarefa: str, futuro):
+        with self.trava:
+            tarefa = self.tarefas.get(id_tarefa)
+            if tarefa is None:
+                return
+            tarefa["concluida"] = time.time()
+            if futuro.cancelled():
+                tarefa["estado"] = "cancelada"
+            elif futuro.exception() is not None:
+                tarefa["estado"], tarefa["erro"] = "erro", str(futuro.exception())
+            else:
+                tarefa["estado"], tarefa["resultado"] = "concluida", futuro.result()
+
+    def descrever(self, id_tarefa: str) -> dict | None:
+        with self.trava:
+            tarefa = self.tarefas.get(id_tarefa)
+            if tarefa is None:
+                return None
+            if tarefa["estado"] == "na_fila" and tarefa["futuro"].running():
+                tarefa["estado"] = "em_execucao"
+            descricao = {k: v for k, v in tarefa.items() if k != "futuro"}
+        if descricao["estado"] == "em_execucao":
+            descricao["progresso"] = _ler_progresso(os.path.join(self.pasta_trabalho, id_tarefa))
+        if descricao["resultado"]:
+            descricao["resultado"] = {k: v for k, v in descricao["resultado"].items() if k != "saida"}
+        return descricao
+
+    def caminho_resultado(self, id_tarefa: str) -> str | None:
+        with self.trava:
+            tarefa = self.tarefas.get(id_tarefa)
+            return tarefa["resultado"]["saida"] if tarefa and tarefa["resultado"] else None
+
+    def apagar(self, id_tarefa: str) -> bool:
+        with self.trava:
+            tarefa = self.tarefas.pop(id_tarefa, None)
+        if tarefa is None:
+            return False
+        tarefa["futuro"].cancel()
+        shutil.rmtree(os.path.join(self.pasta_trabalho, id_tarefa), ignore_errors=True)
+        return True
+
+    def _descartar_antigas(self):
+        limite = time.time() - RETENCAO_SEGUNDOS
+        with self.trava:
+            antigas = [i for i, t in self.tarefas.items() if t["concluida"] and t["concluida"] < limite]
+        for id_tarefa in antigas:
+            self.apagar(id_tarefa)
+
+    def estado(self) -> dict:
+        with self.trava:
+            ids = list(self.tarefas)
+        contagem = {}
+        for id_tarefa in ids:
+            descricao = self.descrever(id_tarefa)
+            if descricao:
+                contagem[descricao["estado"]] = contagem.get(descricao["estado"], 0) + 1
+        return {"trabalhadores": self.processos, "tarefas": contagem}
+
+# ---------------------- HTTP ----------------------------
+class _Requisicao(BaseHTTPRequestHandler):
+    servico: Servico = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass        # o servidor fica em segundo plano; erros voltam no JSON de cada tarefa
+
+    def _json(self, status: int, dados: dict):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _rota(self) -> tuple[list[str], dict]:
+        url = urllib.parse.urlsplit(self.path)
+        return [p for p in url.path.split("/") if p], dict(urllib.parse.parse_qsl(url.query))
+
+    def do_GET(self):
+        partes, _ = self._rota()
+        if partes == ["estado"]:
+            return self._json(200, self.servico.estado())
+        if len(partes) == 2 and partes[0] == "tarefas":
+            descricao = self.servico.descrever(partes[1])
+            return self._json(200, descricao) if descricao else self._json(404, {"erro": "Tarefa não encontrada."})
+        if len(partes) == 3 and partes[0] == "tarefas" and partes[2] == "resultado":
+            return self._enviar_resultado(partes[1])
+        self._json(404, {"erro": "Rota não encontrada."})
+
+    def _enviar_resultado(self, id_tarefa: str):
+        descricao = self.servico.descrever(id_tarefa)
+        if descricao is None:
+            return self._json(404, {"erro": "Tarefa não encontrada."})
+        caminho = self.servico.caminho_resultado(id_tarefa)
+        if caminho is None or not os.path.exists(caminho):
+            return self._json(409, {"erro": f"Resultado indisponível (tarefa {descricao['estado']}).",
+                                    "estado": descricao["estado"]})
+        self.send_response(200)
+        self.send_header("Content-Type", TIPOS_CONTEUDO.get(os.path.splitext(caminho)[1], "application/octet-stream"))
+        self.send_header("Content-Length", str(os.path.getsize(caminho)))
+        self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(caminho)}"')
+        self.end_headers()
+        with open(caminho, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, TAMANHO_BLOCO)
+
+    def do_POST(self):
+        from escritores import FORMATOS
+        partes, parametros = self._rota()
+        if partes != ["tarefas"]:
+            return self._json(404, {"erro": "Rota não encontrada."})
+        tipo = parametros.get("tipo", "auto")
+        formato = parametros.get("formato", "xlsx")
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tipo not in TIPOS or formato not in FORMATOS:
+            erro = f"Use tipo {'/'.join(TIPOS)} e formato {'/'.join(FORMATOS)}."
+        elif not 0 < tamanho <= TAMANHO_MAXIMO:
+            erro = f"Envie o arquivo no corpo (até {TAMANHO_MAXIMO // 1024 // 1024} MB)."
+        else:
+            try:
+                return self._json(202, self.servico.enviar(self.rfile, tamanho, parametros.get("nome", ""),
+                                                           tipo, formato))
+            except (OSError, ValueError) as e:
+                erro = str(e)
+        # corpo não lido: a conexão não pode ser reaproveitada
+        self.close_connection = True
+        self._json(400, {"erro": erro})
+
+    def do_DELETE(self):
+        partes, _ = self._rota()
+        if len(partes) == 2 and partes[0] == "tarefas" and self.servico.apagar(partes[1]):
+            return self._json(200, {"id": partes[1], "apagada": True})
+        self._json(404, {"erro": "Tarefa não encontrada."})
+
+def criar_servidor(servico: Servico, endereco: str = ENDERECO_PADRAO, porta: int = PORTA_PADRAO) -> ThreadingHTTPServer:
+    """Servidor HTTP ligado ao serviço; porta 0 escolhe uma porta livre (ex.: em testes)."""
+    requisicao = type("Requisicao", (_Requisicao,), {"servico": servico})
+    servidor = ThreadingHTTPServer((endereco, porta), requisicao)
+    servidor.daemon_threads = True
+    return servidor
+
+# ---------------------- CLIENTE ----------------------------
+class ClienteServico:
+    """Cliente do serviço; usado pela interface quando o serviço está no ar."""
+    def __init__(self, url: str = URL_PADRAO, tempo_limite: float = 30):
+        self.url = url.rstrip("/")
+        self.tempo_limite = tempo_limite
+
+    def _pedir(self, metodo: str, caminho: str, corpo=None, cabecalhos: dict | None = None):
+        requisicao = urllib.request.Request(self.url + caminho, data=corpo, method=metodo,
+                                            headers=cabecalhos or {})
+        try:
+            return urllib.request.urlopen(requisicao, timeout=self.tempo_limite)
+        except urllib.error.HTTPError as e:
+            try:
+                mensagem = json.load(e).get("erro", e.reason)
+            except ValueError:
+                mensagem = e.reason
+            raise RuntimeError(f"Serviço de extração: {mensagem}") from None
+
+    def _json(self, metodo: str, caminho: str, **kwargs) -> dict:
+        with self._pedir(metodo, caminho, **kwargs) as resposta:
+            return json.load(resposta)
+
+    def disponivel(self) -> bool:
+        try:
+            with urllib.request.urlopen(self.url + "/estado", timeout=0.5):
+                return True
+        except (OSError, ValueError):
+            return False
+
+    def enviar(self, pdf_path: str, tipo: str = "auto", formato: str = "xlsx") -> str:
+        consulta = urllib.parse.urlencode({"tipo": tipo, "formato": formato, "nome": os.path.basename(pdf_path)})
+        with open(pdf_path, "rb") as f:
+            cabecalhos = {"Content-Type": "application/pdf", "Content-Length": str(os.path.getsize(pdf_path))}
+            return self._json("POST", f"/tarefas?{consulta}", corpo=f, cabecalhos=cabecalhos)["id"]
+
+    def consultar(self, id_tarefa: str) -> dict:
+        return self._json("GET", f"/tarefas/{id_tarefa}")
+
+    def aguardar(self, id_tarefa: str, intervalo: float = 0.25, ao_consultar=None) -> dict:
+        """Espera a tarefa terminar. `ao_consultar(descricao)` é chamado a cada consulta e pode levantar
+        uma exceção para desistir (ex.: Cancelado), caso em que a tarefa é apagada no serviço."""
+        try:
+            while True:
+                descricao = self.consultar(id_tarefa)
+                if ao_consultar:
+                    ao_consultar(descricao)
+                if descricao["estado"] in ("concluida", "erro", "cancelada"):
+                    return descricao
+                time.sleep(intervalo)
+        except BaseException:
+            self.apagar(id_tarefa)
+            raise
+
+    def baixar(self, id_tarefa: str, destino: str) -> str:
+        with self._pedir("GET", f"/tarefas/{id_tarefa}/resultado") as resposta, open(destino, "wb") as f:
+            shutil.copyfileobj(resposta, f, TAMANHO_BLOCO)
+        return destino
+
+    def apagar(self, id_tarefa: str) -> None:
+        try:
+            self._json("DELETE", f"/tarefas/{id_tarefa}")
+        except (OSError, RuntimeError):
+            pass        # já apagada ou serviço fora do ar: nada a limpar
+
+    def extrair(self, pdf_path: str, destino: str, tipo: str = "auto", formato: str | None = None,
+                ao_consultar=None) -> dict:
+        """Envia, espera e baixa o resultado em `destino`; apaga a tarefa no serviço no fim."""
+        from escritores import formato_por_extensao
+        id_tarefa = self.enviar(pdf_path, tipo, formato or formato_por_extensao(destino))
+        descricao = self.aguardar(id_tarefa, ao_consultar=ao_consultar)
+        try:
+            if descricao["estado"] != "concluida":
+                raise RuntimeError(descricao["erro"] or f"Tarefa {descricao['estado']}.")
+            self.baixar(id_tarefa, destino)
+        finally:
+            self.apagar(id_tarefa)
+        return descricao
+
+# ---------------------- LINHA DE COMANDO ----------------------------
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Serviço local de extração das faturas Saúde/Odonto e do OCR.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    servir = comandos.add_parser("servir", help="Sobe o serviço com o pool de trabalhadores.")
+    servir.add_argument("--endereco", default=ENDERECO_PADRAO,
+                        help="Endereço de escuta (padrão: só esta máquina, 127.0.0.1).")
+    servir.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    servir.add_argument("--processos", type=int, default=PROCESSOS_PADRAO, help="Trabalhadores no pool.")
+    servir.add_argument("--cache-dir", default=PASTA_CACHE_PADRAO)
+    servir.add_argument("--sem-cache", action="store_true")
+    enviar = comandos.add_parser("enviar", help="Envia um arquivo ao serviço e baixa o resultado.")
+    enviar.add_argument("arquivo")
+    enviar.add_argument("--tipo", choices=TIPOS, default="auto")
+    enviar.add_argument("--saida", help="Destino do resultado (padrão: <arquivo>_<tipo>.xlsx).")
+    enviar.add_argument("--url", default=URL_PADRAO)
+    args = parser.parse_args(argv)
+
+    if args.comando == "enviar":
+        destino = args.saida or os.path.splitext(args.arquivo)[0] + f"_{args.tipo}.xlsx"
+        try:
+            descricao = ClienteServico(args.url).extrair(args.arquivo, destino, args.tipo)
+        except (OSError, RuntimeError) as e:
+            print(f"Falha: {e}", file=sys.stderr)
+            return 1
+        resultado = descricao["resultado"]
+        print(f"{resultado['tipo']}: {resultado['registros']} registros em {resultado['segundos']:.2f}s -> {destino}")
+        return 0
+
+    print(f"Aquecendo {args.processos} trabalhador(es)...", flush=True)
+    servico = Servico(args.processos, None if args.sem_cache else args.cache_dir)
+    servidor = criar_servidor(servico, args.endereco, args.porta)
+    print(f"Serviço de extração em http://{args.endereco}:{servidor.server_port} (Ctrl+C encerra)", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servico.fechar()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
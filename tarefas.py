@@ -0,0 +1,93 @@
+"""
+Execução das importações fora da thread da interface.
+
+As tarefas entram em uma fila e rodam uma por vez em uma thread de trabalho; progresso, conclusão
+e erros voltam para a interface por uma fila de mensagens lida com after(), já que o Tk só pode
+ser tocado pela thread principal. Cancelar interrompe a tarefa atual na próxima página lida.
+"""
+import time
+import queue
+import threading
+
+class Cancelado(Exception):
+    """Tarefa interrompida pelo usuário."""
+
+def formatar_eta(segundos: float | None) -> str:
+    if segundos is None:
+        return "--:--"
+    minutos, seg = divmod(int(segundos + 0.5), 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas}:{minutos:02d}:{seg:02d}" if horas else f"{minutos:02d}:{seg:02d}"
+
+class FilaTarefas:
+    """Fila de tarefas com uma thread de trabalho.
+
+    Cada tarefa é uma função que recebe `progresso` como argumento nomeado; progresso(feitas, total)
+    publica o avanço e levanta Cancelado se o usuário pediu para parar. `ao_evento(evento, descricao,
+    dados)` é chamado na thread da interface com os eventos "inicio", "progresso" (feitas, total,
+    eta em segundos), "ok" (retorno da função), "erro" (a exceção) e "cancelado".
+    """
+    def __init__(self, widget, ao_evento, intervalo_ms: int = 100):
+        self.widget = widget
+        self.ao_evento = ao_evento
+        self.intervalo_ms = intervalo_ms
+        self.tarefas = queue.Queue()
+        self.mensagens = queue.Queue()
+        self.cancelar = threading.Event()
+        self.em_execucao = None
+        threading.Thread(target=self._trabalhar, daemon=True).start()
+        self.widget.after(self.intervalo_ms, self._entregar)
+
+    @property
+    def pendentes(self) -> int:
+        """Tarefas aguardando, sem contar a que está em execução."""
+        return self.tarefas.qsize()
+
+    def adicionar(self, descricao: str, funcao, *args) -> None:
+        self.tarefas.put((descricao, funcao, args))
+
+    def cancelar_atual(self) -> None:
+        if self.em_execucao is not None:
+            self.cancelar.set()
+
+    def _trabalhar(self):
+        while True:
+            descricao, funcao, args = self.tarefas.get()
+            self.cancelar.clear()
+            self.em_execucao = descricao
+            inicio = time.perf_counter()
+
+            def progresso(feitas: int, total: int):
+                if self.cancelar.is_set():
+                    raise Cancelado()
+                decorrido = time.perf_counter() - inicio
+                eta = decorrido / feitas * (total - feitas) if feitas else None
+                self.mensagens.put(("progresso", descricao, (feitas, total, eta)))
+
+            self.mensagens.put(("inicio", descricao, None))
+            try:
+                fim = ("ok", descricao, funcao(*args, progresso=progresso))
+            except Cancelado:
+                fim = ("cancelado", descricao, None)
+            except Exception as e:
+                fim = ("erro", descricao, e)
+            # liberada antes de avisar a interface, que consulta em_execucao ao receber o fim
+            self.em_execucao = None
+            self.mensagens.put(fim)
+
+    def _entregar(self):
+        # só a última mensagem de progresso de cada leva importa; as outras seriam redesenhadas à toa
+        mensagens = []
+        while True:
+            try:
+                mensagens.append(self.mensagens.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            for i, (evento, descricao, dados) in enumerate(mensagens):
+                if evento == "progresso" and i + 1 < len(mensagens) and mensagens[i + 1][0] == "progresso":
+                    continue
+                self.ao_evento(evento, descricao, dados)
+        finally:
+            # reagendado só no fim: um messagebox aberto em ao_evento não faz a entrega rodar de novo por dentro
+            self.widget.after(self.intervalo_ms, self._entregar)
@@ -0,0 +1,69 @@
+"""
+Total familiar da saúde com famílias divididas entre páginas: o TOTAL. de cada família vai para o seu
+titular, mesmo quando titular, dependentes e TOTAL. caem em páginas diferentes.
+
+As faturas vêm do gerador_faturas. As quebras de página ficam entre beneficiários (ou antes do TOTAL.),
+nunca no meio das linhas de um beneficiário: os valores de cada um são lidos no trecho da sua página.
+"""
+import re
+
+import pytest
+
+import extrator_faturas as ef
+import gerador_faturas as gf
+
+RE_BENEFICIARIO = re.compile(r"^(?:(\d{8}) )?(\d{2}) \D")
+
+def br_para_float(s: str) -> float:
+    return float(s.replace(".", "").replace(",", "."))
+
+def esperados(linhas: list[str]) -> tuple[dict[str, float], dict[tuple[str, int], float]]:
+    """TOTAL. de cada seguro e TOTAL DO DEP. de cada (seguro, dep), direto das linhas geradas."""
+    familias, dependentes, seguro, dep = {}, {}, None, None
+    for linha in linhas:
+        m = RE_BENEFICIARIO.match(linha)
+        if m:
+            seguro = m[1] or seguro
+            dep = int(m[2])
+        elif linha.startswith("TOTAL DO DEP. "):
+            dependentes[(seguro, dep)] = br_para_float(linha.rsplit(" ", 1)[1])
+        elif linha.startswith("TOTAL. "):
+            familias[seguro] = br_para_float(linha.rsplit(" ", 1)[1])
+    return familias, dependentes
+
+def paginar(linhas: list[str], por_pagina: int) -> list[str]:
+    """Completa as páginas com linhas vazias para que a quebra caia no início de um beneficiário ou de
+    um TOTAL.; devolve as linhas prontas para o escrever_pdf com `por_pagina` linhas por página."""
+    inicios = [i for i, l in enumerate(linhas) if RE_BENEFICIARIO.match(l) or l.startswith("TOTAL. ")]
+    trechos = [linhas[a:b] for a, b in zip(inicios, inicios[1:] + [len(linhas)])]
+    saida, usadas = [], 0
+    for trecho in trechos:
+        assert len(trecho) <= por_pagina
+        if usadas + len(trecho) > por_pagina:
+            saida.extend([""] * (por_pagina - usadas))
+            usadas = 0
+        saida.extend(trecho)
+        usadas += len(trecho)
+    return saida
+
+@pytest.mark.parametrize("beneficiarios,por_pagina,semente", [(40, 12, 1), (40, 17, 7), (300, 45, 3)])
+def test_total_familiar_com_familias_entre_paginas(tmp_path, beneficiarios, por_pagina, semente):
+    linhas = gf.linhas_saude(beneficiarios, dependentes=4, semente=semente)
+    paginadas = paginar(linhas, por_pagina)
+    # a fixture só serve se alguma família tem titular e TOTAL. em páginas diferentes
+    titulares = [i for i, l in enumerate(paginadas) if RE_BENEFICIARIO.match(l) and RE_BENEFICIARIO.match(l)[1]]
+    totais = [i for i, l in enumerate(paginadas) if l.startswith("TOTAL. ")]
+    assert any(t // por_pagina != f // por_pagina for t, f in zip(titulares, totais))
+
+    pdf = tmp_path / "saude.pdf"
+    gf.escrever_pdf(str(pdf), paginadas, gf.CABECALHO_SAUDE, por_pagina)
+    df = ef.processar_fatura(str(pdf), "saude", motor="texto")
+
+    familias, dependentes = esperados(linhas)
+    assert len(df) == len(dependentes) == beneficiarios
+    colunas = ["Seguro", "Dep", "Parentesco", "Total dep", "Total familiar"]
+    for seguro, dep, parentesco, total_dep, total_familiar in df[colunas].itertuples(index=False, name=None):
+        chave = (seguro, int(dep))
+        assert total_dep == pytest.approx(dependentes[chave]), chave
+        esperado = familias[seguro] if parentesco == "Titular" else 0.0
+        assert total_familiar == pytest.approx(esperado), chave
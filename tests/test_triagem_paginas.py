@@ -0,0 +1,53 @@
+"""
+Triagem da saúde: a página com o cabeçalho 'Seguro Dep' nunca é descartada, mesmo quando o conteúdo
+desenha as palavras fora da ordem de leitura.
+"""
+import pdfplumber
+import pytest
+
+import triagem_paginas as tp
+
+def escrever_pdf(caminho, trechos: list[tuple[int, int, str]]) -> None:
+    """PDF de uma página com cada (x, y, texto) desenhado na ordem da lista (Helvetica, sem compressão)."""
+    conteudo = b"BT /F1 10 Tf " + b" ".join(b"1 0 0 1 %d %d Tm (%s) Tj" % (x, y, t.encode("cp1252"))
+                                             for x, y, t in trechos) + b" ET"
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 4 0 R >> >> "
+        b"/Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n" % len(conteudo) + conteudo + b"\nendstream",
+    ]
+    dados, offsets = b"%PDF-1.4\n", []
+    for n, corpo in enumerate(objetos, 1):
+        offsets.append(len(dados))
+        dados += b"%d 0 obj\n" % n + corpo + b"\nendobj\n"
+    xref = len(dados)
+    dados += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    dados += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    dados += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    caminho.write_bytes(dados)
+
+LINHA = (30, 780, "10000000 00 MARIA DA SILVA 123456 40 Titular")
+
+@pytest.mark.parametrize("trechos,esperado", [
+    ([(30, 800, "Seguro"), (70, 800, "Dep"), LINHA], True),
+    # 'Dep' desenhado antes de 'Seguro': as strings do conteúdo ficam 'DepSeguro'
+    ([(70, 800, "Dep"), (30, 800, "Seguro"), LINHA], True),
+    ([(30, 800, "Seguro de vida em grupo"), (30, 780, "Dependentes sem cobertura")], False),
+    ([(30, 800, "FATURA PORTO SEGURO - CAPA")], False),
+])
+def test_tem_tabela_saude(tmp_path, trechos, esperado):
+    caminho = tmp_path / "pagina.pdf"
+    escrever_pdf(caminho, trechos)
+    with pdfplumber.open(caminho) as pdf:
+        assert tp.tem_tabela_saude(pdf.pages[0]) is esperado
+
+def test_cabecalho_fora_de_ordem_precisa_da_ordem_de_leitura(tmp_path):
+    """Fixa a premissa: só as strings do conteúdo não acham o cabeçalho desenhado fora de ordem."""
+    caminho = tmp_path / "pagina.pdf"
+    escrever_pdf(caminho, [(70, 800, "Dep"), (30, 800, "Seguro"), LINHA])
+    with pdfplumber.open(caminho) as pdf:
+        bruto = "".join(tp.texto_bruto(pdf.pages[0]).split())
+    assert not any(m in bruto for m in tp.MARCADORES_SAUDE)
@@ -0,0 +1,176 @@
+"""
+Triagem barata das páginas antes da extração de texto.
+
+Quase todo o custo do pdfplumber está em interpretar o conteúdo da página (posição de cada
+caractere). A triagem lê direto os operadores de texto do conteúdo da página — as strings dos
+operadores Tj/TJ, sem posicionar nada — e procura o cabeçalho da tabela de beneficiários.
+Isso só é confiável com fontes simples (Type1/TrueType) em codificação padrão, em que o byte da
+string é o próprio caractere; com fontes compostas (CID) ou codificações redefinidas a triagem
+usa os caracteres já interpretados, que a extração de texto reaproveita em seguida.
+
+As strings saem na ordem em que o conteúdo as desenha, que nem sempre é a de leitura: quando 'Seguro'
+e 'Dep' estão na página, mas não em sequência, a página é conferida no texto do extract_text(). Assim
+só fica de fora a página em que uma das palavras do cabeçalho é desenhada em pedaços fora de ordem.
+A triagem pode deixar passar uma página sem tabela (ex.: 'SeguroDependente'); as páginas aprovadas
+continuam passando pelos regex do motor de leitura.
+
+Pelo mesmo caminho sai a impressão digital do conteúdo de cada página (hash_conteudo): páginas com
+o mesmo hash produzem o mesmo texto, então a fatura do mês seguinte só extrai as páginas que mudaram.
+"""
+import re
+import hashlib
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+from pdfminer.psparser import PSLiteral, literal_name
+
+VERSAO_TRIAGEM = "2"
+MARCADORES_SAUDE = ("SeguroDep", "Seguro:Dep")     # 'Seguro Dep', 'Seguro: Dep', 'Nº Seguro Dep' sem espaços
+PALAVRAS_SAUDE = ("Seguro", "Dep")                  # as do cabeçalho, em qualquer ordem no conteúdo
+FONTES_SIMPLES = {"Type1", "MMType1", "TrueType"}
+CODIFICACOES_PADRAO = {"WinAnsiEncoding", "MacRomanEncoding", "StandardEncoding", "PDFDocEncoding"}
+PROFUNDIDADE_MAXIMA = 4     # formulários (XObject) dentro de formulários
+
+RE_IMAGEM_EMBUTIDA = re.compile(rb"\bBI\b.*?\bEI\b", re.DOTALL)
+RE_STRING_PDF = re.compile(rb"\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>")
+RE_ESCAPE_PDF = re.compile(rb"\\([0-7]{1,3}|.)", re.DOTALL)
+ESCAPES_PDF = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f", b"\n": b""}
+
+def _desescapar(m: re.Match) -> bytes:
+    seq = m.group(1)
+    if seq[:1].isdigit():
+        return bytes([int(seq, 8) & 0xFF])
+    return ESCAPES_PDF.get(seq, seq)
+
+def _fonte_simples(fonte) -> bool:
+    fonte = resolve1(fonte)
+    if not isinstance(fonte, dict) or literal_name(fonte.get("Subtype")) not in FONTES_SIMPLES:
+        return False
+    codificacao = resolve1(fonte.get("Encoding"))
+    if codificacao is None:
+        # sem /Encoding só as 14 fontes padrão têm codificação conhecida; as embutidas usam a própria
+        return not isinstance(resolve1(fonte.get("FontDescriptor")), dict)
+    return not isinstance(codificacao, dict) and literal_name(codificacao) in CODIFICACOES_PADRAO
+
+def _strings(conteudos: list, recursos, profundidade: int = 0) -> list[bytes] | None:
+    recursos = resolve1(recursos) or {}
+    if not all(_fonte_simples(f) for f in (resolve1(recursos.get("Font")) or {}).values()):
+        return None
+    partes = []
+    for conteudo in conteudos:
+        conteudo = resolve1(conteudo)
+        if not isinstance(conteudo, PDFStream):
+            continue
+        dados = RE_IMAGEM_EMBUTIDA.sub(b"", conteudo.get_data())
+        for s in RE_STRING_PDF.findall(dados):
+            if s[:1] == b"(":
+                partes.append(RE_ESCAPE_PDF.sub(_desescapar, s[1:-1]))
+            else:
+                hexa = re.sub(rb"\s", b"", s[1:-1])
+                partes.append(bytes.fromhex((hexa + b"0" * (len(hexa) % 2)).decode("ascii")))
+
+    for xobjeto in (resolve1(recursos.get("XObject")) or {}).values():
+        xobjeto = resolve1(xobjeto)
+        if isinstance(xobjeto, PDFStream) and literal_name(xobjeto.attrs.get("Subtype")) == "Form":
+            if profundidade >= PROFUNDIDADE_MAXIMA:
+                return None
+            internas = _strings([xobjeto], xobjeto.attrs.get("Resources"), profundidade + 1)
+            if internas is None:
+                return None
+            partes.extend(internas)
+    return partes
+
+def texto_bruto(pg) -> str | None:
+    """Texto dos operadores da página (sem espaços confiáveis nem ordem de leitura), ou None quando as
+    fontes não permitem ler os bytes como caracteres."""
+    try:
+        partes = _strings(pg.page_obj.contents, pg.page_obj.resources)
+    except Exception:
+        return None     # conteúdo que o leitor simplificado não entende: decide pela interpretação completa
+    return None if partes is None else b"".join(partes).decode("latin-1")
+
+def tem_tabela_saude(pg) -> bool:
+    """Se a página pode ter a tabela 'Seguro Dep' de beneficiários."""
+    texto = texto_bruto(pg)
+    if texto is None:
+        texto = "".join(c["text"] for c in pg.chars)
+    compacto = "".join(texto.split())
+    if any(m in compacto for m in MARCADORES_SAUDE):
+        return True
+    if not all(p in compacto for p in PALAVRAS_SAUDE):
+        return False
+    # as palavras estão na página, mas o conteúdo não as desenha em sequência: confere na ordem de leitura
+    compacto = "".join((pg.extract_text() or "").split())
+    return any(m in compacto for m in MARCADORES_SAUDE)
+
+def _tem_imagem(conteudos: list, recursos, profundidade: int = 0) -> bool:
+    recursos = resolve1(recursos) or {}
+    for xobjeto in (resolve1(recursos.get("XObject")) or {}).values():
+        xobjeto = resolve1(xobjeto)
+        if not isinstance(xobjeto, PDFStream):
+            continue
+        subtipo = literal_name(xobjeto.attrs.get("Subtype"))
+        if subtipo == "Image":
+            return True
+        if (subtipo == "Form" and profundidade < PROFUNDIDADE_MAXIMA
+                and _tem_imagem([xobjeto], xobjeto.attrs.get("Resources"), profundidade + 1)):
+            return True
+    for conteudo in conteudos:
+        conteudo = resolve1(conteudo)
+        if isinstance(conteudo, PDFStream) and RE_IMAGEM_EMBUTIDA.search(conteudo.get_data()):
+            return True
+    return False
+
+def pagina_digitalizada(pg) -> bool:
+    """Se a página é só imagem, sem nenhum operador de texto: uma digitalização, que só o OCR lê. Pelo
+    mesmo leitor simplificado da triagem; página com fontes que ele não lê é tratada como página com texto."""
+    if texto_bruto(pg) != "":
+        return False
+    try:
+        return _tem_imagem(pg.page_obj.contents, pg.page_obj.resources)
+    except Exception:
+        return False
+
+# ---------------------- IMPRESSÃO DIGITAL DO CONTEÚDO ----------------------------
+def _serializar(obj, h, vistos: dict, profundidade: int = 0) -> None:
+    """Alimenta o hash com o objeto PDF resolvido; fluxos entram pelo hash dos bytes brutos."""
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in vistos:
+            h.update(vistos[obj.objid])
+            return
+        sub = hashlib.sha1()
+        _serializar(resolve1(obj), sub, vistos, profundidade + 1)
+        vistos[obj.objid] = sub.digest()
+        h.update(vistos[obj.objid])
+    elif profundidade > 32:
+        h.update(b"...")
+    elif isinstance(obj, PDFStream):
+        _serializar(obj.attrs, h, vistos, profundidade + 1)
+        h.update(hashlib.sha1(obj.get_rawdata() or obj.get_data()).digest())
+    elif isinstance(obj, dict):
+        for chave in sorted(obj):
+            # /Parent aponta para a árvore de páginas: mudaria o hash sem mudar a página
+            if chave != "Parent":
+                h.update(f"/{chave}".encode())
+                _serializar(obj[chave], h, vistos, profundidade + 1)
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for item in obj:
+            _serializar(item, h, vistos, profundidade + 1)
+        h.update(b"]")
+    elif isinstance(obj, PSLiteral):
+        h.update(f"/{obj.name}".encode())
+    else:
+        h.update(repr(obj).encode())
+
+def hash_conteudo(pg, vistos: dict | None = None) -> str | None:
+    """SHA-1 do que define o texto da página: conteúdo, recursos (fontes, formulários) e caixas.
+    `vistos` guarda o hash de objetos compartilhados entre páginas do mesmo documento (fontes)."""
+    vistos = {} if vistos is None else vistos
+    pagina = pg.page_obj
+    h = hashlib.sha1()
+    try:
+        for chave in ("contents", "resources", "mediabox", "cropbox", "rotate"):
+            h.update(chave.encode())
+            _serializar(getattr(pagina, chave), h, vistos)
+    except Exception:
+        return None     # sem hash a página simplesmente é extraída de novo
+    return h.hexdigest()